@@ -0,0 +1,234 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import warnings
+
+import numpy as np
+import scipy
+
+from src.analyze import time_descriptors as td
+from src.analyze import freq_descriptors as fd
+from src.analyze import filters
+from src.analyze.bursts import getBursts
+from src.analyze.emg_processing import analyzeEMG
+from src.analyze.rolling_descriptors import getRollingFeatures
+from src.analyze.segmentation import getSteadySegments
+from src.analyze.spectrogram import getSpectrogram
+from src.recordings.catalog import discover_recordings
+from src.recordings.loaders import load_recording
+
+"""
+    Benchmarks of the descriptors, the filters, phasicFilter, getPSD and analyzeEMG, on synthetic
+    signals and on a real trial of openbci-data, for several signal lengths and channel counts.
+    Run from the signal-processing folder:
+
+        python -m benchmarks.bench_analyze run --output benchmarks/results/current.json
+        python -m benchmarks.bench_analyze compare benchmarks/results/baseline.json benchmarks/results/current.json
+
+    compare exits with status 1 when a benchmark is slower than the baseline by more than --threshold.
+    Timings are the best of several calls; run both files on the same idle machine, or use --normalize.
+"""
+
+SAMPLERATE = 250
+SIZES = [250, 2500, 25000, 250000, 1000000]
+QUICK_SIZES = [250, 2500, 25000]
+CHANNELS = [1, 8]
+THRESHOLD = 0.01
+
+# name -> (function of (signal, psd, frequencies), works on (n_channels, n_samples) arrays)
+BENCHMARKS = {
+    'getIEMG': (lambda x, p, f: td.getIEMG(x), True),
+    'getMAV': (lambda x, p, f: td.getMAV(x), True),
+    'getMAV1': (lambda x, p, f: td.getMAV1(x), True),
+    'getMAV2': (lambda x, p, f: td.getMAV2(x), True),
+    'getSSI': (lambda x, p, f: td.getSSI(x), True),
+    'getVAR': (lambda x, p, f: td.getVAR(x), True),
+    'getTM3': (lambda x, p, f: td.getTM(x, 3), True),
+    'getRMS': (lambda x, p, f: td.getRMS(x), True),
+    'getLOG': (lambda x, p, f: td.getLOG(x), True),
+    'getWL': (lambda x, p, f: td.getWL(x), True),
+    'getAAC': (lambda x, p, f: td.getAAC(x), True),
+    'getDASDV': (lambda x, p, f: td.getDASDV(x), True),
+    'getAFB': (lambda x, p, f: td.getAFB(x, SAMPLERATE), True),
+    'getBursts': (lambda x, p, f: getBursts(x, SAMPLERATE), True),
+    'getSteadySegments': (lambda x, p, f: getSteadySegments(x, SAMPLERATE), True),
+    'getZC': (lambda x, p, f: td.getZC(x, THRESHOLD), True),
+    'getMYOP': (lambda x, p, f: td.getMYOP(x, THRESHOLD), True),
+    'getWAMP': (lambda x, p, f: td.getWAMP(x, THRESHOLD), True),
+    'getSSC': (lambda x, p, f: td.getSSC(x, THRESHOLD), True),
+    'getMAVSLPk': (lambda x, p, f: td.getMAVSLPk(x, 3), False),
+    'getHIST': (lambda x, p, f: td.getHIST(x, threshold=50), False),
+    'getTimeFeatures': (lambda x, p, f: td.getTimeFeatures(x, SAMPLERATE, THRESHOLD), True),
+    'getRollingFeatures': (lambda x, p, f: getRollingFeatures(x, SAMPLERATE, hop=SAMPLERATE // 10), True),
+    'getMNF': (lambda x, p, f: fd.getMNF(p, f), True),
+    'getMDF': (lambda x, p, f: fd.getMDF(p, f), True),
+    'getPeakFrequency': (lambda x, p, f: fd.getPeakFrequency(p, f), True),
+    'getSM2': (lambda x, p, f: fd.getSM(p, f, 2), True),
+    'getFR': (lambda x, p, f: fd.getFR(p, f), True),
+    'getPSR': (lambda x, p, f: fd.getPSR(p, f), True),
+    'getFrequencyFeatures': (lambda x, p, f: fd.getFrequencyFeatures(p, SAMPLERATE, min(256, x.shape[-1])), True),
+    'getPSD': (lambda x, p, f: fd.getPSD(x, SAMPLERATE), True),
+    'getSpectrogram': (lambda x, p, f: getSpectrogram(x, SAMPLERATE, min(1250, x.shape[-1]), 125, nperseg=250), True),
+    'phasicFilter': (lambda x, p, f: fd.phasicFilter(x, SAMPLERATE), True),
+    'butter_lowpass_filter': (lambda x, p, f: filters.butter_lowpass_filter(x, 50, SAMPLERATE, 2), True),
+    'cascade_filter': (lambda x, p, f: filters.cascade_filter(x, SAMPLERATE, highpass=20, lowpass=50, notch=60), True),
+    'cascade_filter_zero_phase': (lambda x, p, f: filters.cascade_filter(x, SAMPLERATE, highpass=1, notch=60,
+                                                                         zero_phase=True), True),
+    'analyzeEMG': (lambda x, p, f: analyzeEMG(x, SAMPLERATE), True),
+    'analyzeEMG_no_preprocessing': (lambda x, p, f: analyzeEMG(x, SAMPLERATE, preprocessing=False), True),
+}
+
+
+def synthetic_signal(n_channels, n_samples, seed=0):
+    """ Gaussian noise modulated by slow contractions, in microvolts """
+    rng = np.random.default_rng(seed)
+    t = np.arange(n_samples) / SAMPLERATE
+    envelope = 20 + 80 * (np.sin(2 * np.pi * 0.2 * t) > 0)
+    return rng.normal(size=(n_channels, n_samples)) * envelope
+
+
+def recorded_signal(n_channels, n_samples, roots=('openbci-data/g20', 'openbci-data/g50')):
+    """ The EXG channels of the first recording of openbci-data, repeated to n_samples """
+    recordings = discover_recordings(roots, formats=('brainflow',))
+    if not recordings:
+        return None
+    exg = load_recording(recordings[0]['path'], channels=range(n_channels), timestamps=False).exg
+    exg = filters.cascade_filter(exg, SAMPLERATE, highpass=1, notch=60, zero_phase=True)
+    return np.tile(exg, int(np.ceil(n_samples / exg.shape[1])))[:, :n_samples]
+
+
+def time_call(function, min_time=0.2, max_repeats=20):
+    """ Best and median wall time of function(), called at least 3 times (once if it takes more than 1 s),
+        until min_time seconds or max_repeats calls """
+    times = []
+    total = 0
+    while len(times) < max_repeats and (total < min_time or len(times) < 3):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        times.append(elapsed)
+        total += elapsed
+        if elapsed > 1.0:  # slow benchmarks are timed once
+            break
+    return min(times), float(np.median(times)), len(times)
+
+
+def run_benchmarks(sizes=SIZES, channels=CHANNELS, sources=('synthetic', 'openbci'), names=None):
+    """ Time every benchmark for every source, signal length and channel count
+
+        :return: one result per benchmark: name, source, n_samples, n_channels, best, median, repeats
+        :rtype: list
+    """
+    results = []
+    for source in sources:
+        for n_channels in channels:
+            for n_samples in sizes:
+                if source == 'synthetic':
+                    signal = synthetic_signal(n_channels, n_samples)
+                else:
+                    signal = recorded_signal(n_channels, n_samples)
+                    if signal is None:
+                        continue
+                psd, frequencies = fd.getPSD(signal, SAMPLERATE)
+                for name, (function, multichannel) in BENCHMARKS.items():
+                    if names is not None and name not in names:
+                        continue
+                    x = signal
+                    if not multichannel:
+                        if n_channels > 1:
+                            continue
+                        x = signal[0]
+                    with warnings.catch_warnings():
+                        warnings.simplefilter('ignore', RuntimeWarning)
+                        best, median, repeats = time_call(lambda: function(x, psd, frequencies))
+                    results.append({'name': name, 'source': source, 'n_samples': n_samples,
+                                    'n_channels': n_channels, 'best': best, 'median': median, 'repeats': repeats})
+                    print('%-28s %-9s %8d x %d  %10.3f ms' % (name, source, n_samples, n_channels, best * 1000))
+    return results
+
+
+def calibration():
+    """ Best time of a fixed numpy workload, to compare runs made on machines of different speeds """
+    x = np.random.default_rng(0).normal(size=(8, 25000))
+    return time_call(lambda: np.sort(np.abs(np.fft.rfft(x)), axis=-1), min_time=0.5)[0]
+
+
+def environment():
+    return {'python': sys.version.split()[0], 'numpy': np.__version__, 'scipy': scipy.__version__,
+            'platform': platform.platform(), 'processor': platform.processor(),
+            'date': time.strftime('%Y-%m-%d %H:%M:%S'), 'calibration': calibration()}
+
+
+def _key(result):
+    return (result['name'], result['source'], result['n_samples'], result['n_channels'])
+
+
+def compare(baseline, current, threshold=0.25, min_seconds=1e-3, normalize=False):
+    """ Benchmarks slower than the baseline by more than threshold (relative to the best times)
+
+        Benchmarks faster than min_seconds in both runs are ignored, they are dominated by noise.
+        With normalize, the times are divided by the calibration time of their run first.
+
+        :return: (key, baseline best, current best, ratio) of every regression, and of every benchmark
+        :rtype: tuple
+    """
+    baseline_results = {_key(result): result for result in baseline['results']}
+    scale = current['environment']['calibration'] / baseline['environment']['calibration'] if normalize else 1
+    rows = []
+    for result in current['results']:
+        previous = baseline_results.get(_key(result))
+        if previous is None:
+            continue
+        rows.append((_key(result), previous['best'], result['best'], result['best'] / previous['best'] / scale))
+    regressions = [row for row in rows if row[3] > 1 + threshold and max(row[1], row[2]) >= min_seconds]
+    return regressions, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks of the analyze package')
+    commands = parser.add_subparsers(dest='command', required=True)
+    run = commands.add_parser('run', help='run the benchmarks and write the results as json')
+    run.add_argument('--output', type=str, default='benchmarks/results/current.json', help='results file')
+    run.add_argument('--quick', action='store_true', help='signals of at most %d samples' % QUICK_SIZES[-1])
+    run.add_argument('--sizes', type=int, nargs='+', default=None, help='signal lengths in samples')
+    run.add_argument('--channels', type=int, nargs='+', default=CHANNELS, help='channel counts')
+    run.add_argument('--sources', type=str, nargs='+', default=['synthetic', 'openbci'],
+                     choices=['synthetic', 'openbci'], help='signals to use')
+    run.add_argument('--only', type=str, nargs='+', default=None, choices=sorted(BENCHMARKS),
+                     help='benchmarks to run (default: all)')
+    cmp = commands.add_parser('compare', help='flag the regressions of a results file against a baseline')
+    cmp.add_argument('baseline', type=str, help='baseline results file')
+    cmp.add_argument('current', type=str, help='results file to check')
+    cmp.add_argument('--threshold', type=float, default=0.25, help='relative slowdown flagged as a regression')
+    cmp.add_argument('--min-ms', type=float, default=1.0, help='benchmarks faster than this in both runs are ignored')
+    cmp.add_argument('--normalize', action='store_true',
+                     help='scale by the calibration times, when the two runs come from different machines')
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        sizes = args.sizes or (QUICK_SIZES if args.quick else SIZES)
+        results = run_benchmarks(sizes, args.channels, args.sources, args.only)
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump({'environment': environment(), 'results': results}, f, indent=1)
+        print('%d benchmarks -> %s' % (len(results), args.output))
+    else:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            current = json.load(f)
+        regressions, rows = compare(baseline, current, args.threshold, args.min_ms / 1000, args.normalize)
+        for key, before, after, ratio in rows:
+            flag = 'REGRESSION' if (key, before, after, ratio) in regressions else ''
+            print('%-28s %-9s %8d x %d  %10.3f -> %10.3f ms  x%.2f %s'
+                  % (key + (before * 1000, after * 1000, ratio, flag)))
+        print('%d benchmarks compared, %d regressions (threshold %d%%)'
+              % (len(rows), len(regressions), args.threshold * 100))
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+"""
+    Import time of the analyze package: every statement runs in a fresh interpreter, timed from
+    inside the process, and the heavy modules it left in sys.modules are listed.
+    Run from the signal-processing folder:
+
+        python -m benchmarks.bench_import
+        python -m benchmarks.bench_import --repeats 10 --output benchmarks/results/import.json
+
+    The run exits with status 1 when a bare import loads one of the modules it must not load
+    (scipy, matplotlib, peakutils): they are only imported by the functions that need them.
+    python -X importtime -c "import src.analyze.emg_processing" shows the breakdown per module.
+"""
+
+HEAVY_MODULES = ['scipy', 'scipy.signal', 'matplotlib', 'matplotlib.pyplot', 'peakutils', 'pandas']
+DEFERRED = ['scipy', 'matplotlib', 'peakutils']
+
+# name -> (statement, modules it must not load)
+TARGETS = {
+    'import src.analyze': ('import src.analyze', DEFERRED),
+    'import emg_processing': ('import src.analyze.emg_processing', DEFERRED),
+    'from src.analyze import analyzeEMG': ('from src.analyze import analyzeEMG', DEFERRED),
+    'import descriptors and filters': ('import src.analyze.time_descriptors, src.analyze.freq_descriptors, '
+                                       'src.analyze.filters, src.analyze.rolling_descriptors', DEFERRED),
+    'import spectrogram and fatigue': ('import src.analyze.spectrogram, src.analyze.fatigue', DEFERRED),
+    'first analyzeEMG call': ('from src.analyze import analyzeEMG; import numpy; '
+                              'analyzeEMG(numpy.random.default_rng(0).normal(size=(8, 2500)), 250)', []),
+    'import batch_analysis': ('import src.analyze.batch_analysis', []),
+}
+
+_CHILD = """
+import json, sys, time
+start = time.perf_counter()
+exec(sys.argv[1])
+seconds = time.perf_counter() - start
+print(json.dumps({'seconds': seconds, 'modules': [m for m in json.loads(sys.argv[2]) if m in sys.modules]}))
+"""
+
+
+def time_import(statement, repeats=5):
+    """ Best and median time of statement in fresh interpreters, and the heavy modules it loaded
+
+        :return: best, median (seconds) and loaded modules
+        :rtype: tuple
+    """
+    times = []
+    for _ in range(repeats):
+        output = subprocess.run([sys.executable, '-c', _CHILD, statement, json.dumps(HEAVY_MODULES)],
+                                capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        times.append(result['seconds'])
+    return min(times), float(np.median(times)), result['modules']
+
+
+def run_targets(repeats=5, names=None):
+    """ Time every target, print a line per target and flag the ones loading deferred modules
+
+        :return: one result per target: name, statement, best, median, modules, violations
+        :rtype: list
+    """
+    results = []
+    for name, (statement, forbidden) in TARGETS.items():
+        if names is not None and name not in names:
+            continue
+        best, median, modules = time_import(statement, repeats)
+        violations = [m for m in modules if m.split('.')[0] in forbidden]
+        results.append({'name': name, 'statement': statement, 'best': best, 'median': median,
+                        'modules': modules, 'violations': violations})
+        print('%-36s %9.1f ms  %s%s' % (name, best * 1000, ', '.join(modules) or '-',
+                                        '  LOADS ' + ', '.join(violations) if violations else ''))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Import time of the analyze package')
+    parser.add_argument('--repeats', type=int, default=5, help='fresh interpreters per target')
+    parser.add_argument('--only', type=str, nargs='+', default=None, choices=sorted(TARGETS),
+                        help='targets to run (default: all)')
+    parser.add_argument('--output', type=str, default=None, help='write the results as json')
+    args = parser.parse_args()
+
+    results = run_targets(args.repeats, args.only)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump({'python': sys.version.split()[0], 'results': results}, f, indent=1)
+    violations = [result['name'] for result in results if result['violations']]
+    if violations:
+        print('deferred modules loaded by: %s' % ', '.join(violations))
+    sys.exit(1 if violations else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""
+    EMG analysis: time and frequency domain features, filters, streaming features and tools.
+
+        from src.analyze import analyzeEMG
+        results = analyzeEMG(signal, 250)
+
+    The names below are loaded from their module on first access, so importing the package
+    (or one of its modules) only loads NumPy; scipy.signal is imported by the first function
+    that filters or computes a spectrum. benchmarks/bench_import.py measures the import time.
+"""
+
+import importlib
+
+_EXPORTS = {
+    'emg_processing': ['analyzeEMG'],
+    'feature_graph': ['FeatureGraph', 'TIME_FEATURES', 'FREQUENCY_FEATURES'],
+    'time_descriptors': ['getIEMG', 'getMAV', 'getMAV1', 'getMAV2', 'getSSI', 'getVAR', 'getTM', 'getRMS',
+                         'getLOG', 'getWL', 'getAAC', 'getDASDV', 'getAFB', 'getZC', 'getMYOP', 'getWAMP',
+                         'getSSC', 'getMAVSLPk', 'getHIST', 'getTimeFeatures'],
+    'freq_descriptors': ['getMNF', 'getMDF', 'getPeakFrequency', 'getMNP', 'getTTP', 'getSM', 'getFR',
+                         'getPSR', 'getVCF', 'getSpectralBands', 'getFrequencyFeatures', 'getPSD',
+                         'PhasicFilter', 'phasicFilter'],
+    'filters': ['design_filter', 'cascade_sos', 'cascade_filter', 'butter_lowpass', 'butter_highpass',
+                'butter_lowpass_filter', 'butter_highpass_filter', 'StreamingFilter', 'LowpassFilter',
+                'HighpassFilter', 'BandpassFilter', 'NotchFilter', 'FilterCascade'],
+    'bursts': ['Bursts', 'getEnergyEnvelope', 'detectBursts', 'getBursts'],
+    'rolling_descriptors': ['ROLLING_FEATURES', 'getRollingFeatures', 'IncrementalMAV'],
+    'segmentation': ['SteadySegments', 'getSteadySegments', 'centeredWindow'],
+    'spectrogram': ['getSegmentSpectra', 'getWelchWindows', 'getSpectrogram'],
+    'fatigue': ['FATIGUE_FEATURES', 'FatigueTracker', 'trackFatigue'],
+    'profiling': ['Profiler', 'log_sink', 'CSVSink', 'StageStats'],
+    'result_cache': ['ResultCache', 'cache_key'],
+}
+
+_MODULES = {name: module for module, names in _EXPORTS.items() for name in names}
+
+__all__ = sorted(_MODULES)
+
+
+def __getattr__(name):
+    if name not in _MODULES:
+        raise AttributeError('module %r has no attribute %r' % (__name__, name))
+    value = getattr(importlib.import_module('.' + _MODULES[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,192 @@
+import argparse
+import csv
+import os
+import time
+import warnings
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .emg_processing import analyzeEMG
+from .filters import design_filter
+from .profiling import Profiler, StageStats, CSVSink
+from .result_cache import ResultCache
+from .segmentation import getSteadySegments, centeredWindow
+from ..recordings.catalog import discover_recordings
+from ..recordings.loaders import load_recording
+
+"""
+    Batch analysis of the openbci-data tree, replacing the loop of openbci-processing_single_file.ipynb.
+    Every recording is filtered and analyzed in a process pool, and all the results go to one table
+    with the group, subject, MVC level and trial of each file.
+    With --cache-dir, the results of samples already analyzed are read from a ResultCache.
+    With --profile, the time of every stage of the analysis is recorded and summarized in percentiles.
+    With --segment auto, the analyzed window is taken in the steady contraction of each recording
+    (see segmentation.py) instead of around its midpoint.
+    Run from the signal-processing folder with: python -m src.analyze.batch_analysis
+"""
+
+METADATA_COLUMNS = ['group', 'subject', 'mvc', 'trial', 'format', 'file']
+
+
+def filter_data(data, fs=250, notch_f0=60, Q=100):
+    """ Remove the dc offset and the power line interference, as filter_data of the processing notebook
+
+        The notebook runs filtfilt(b, a) with a 2nd order 1 Hz highpass, then with the notch. The
+        same two passes are run with sosfiltfilt on the cached designs, padded by 9 samples as
+        filtfilt pads these filters, so the output is the notebook's within rounding. One
+        sosfiltfilt of the whole cascade would pad differently and change the edges of the window.
+    """
+    from scipy.signal import sosfiltfilt
+    y = sosfiltfilt(design_filter('highpass', 2, 1, fs), data, padlen=9)
+    return sosfiltfilt(design_filter('notch', None, notch_f0, fs, Q), y, padlen=9)
+
+
+def analyze_recording(info, channel=0, samplerate=250, trim=250, half_window=250, cache_dir=None, profile=False,
+                      segment='midpoint'):
+    """ Analyze the middle of one recording, like the processing notebook does
+
+        The first and last `trim` samples are dropped, then `half_window` samples on each side
+        of the midpoint are filtered and analyzed. With segment='auto', the remaining samples are
+        filtered and the window of 2 * half_window samples (or the whole plateau, if shorter) is
+        centered in the steady contraction found by getSteadySegments; the midpoint is used when
+        the recording has no plateau.
+
+        :return: metadata, features and processing time of the recording, the analyzed samples
+                 (segment_start, segment_stop, from the start of the recording) and, with
+                 segment='auto', 'steady' (a plateau was found), and 'cached'
+                 when the features were read from the cache in cache_dir, and 'profile', the
+                 report of the stages (see profiling.py) when profile is set
+        :rtype: dict
+    """
+    start = time.perf_counter()
+    profiler = Profiler() if profile else None
+    with profiler.stage('load') if profile else nullcontext():
+        data = load_recording(info['path'], channels=[channel], timestamps=False).exg[0][trim:-trim]
+    middle_ind = int((len(data) - 1) / 2)
+    first, stop = middle_ind - half_window, middle_ind + half_window
+    if segment == 'auto':
+        with profiler.stage('filter_data') if profile else nullcontext():
+            filtered = filter_data(data, fs=samplerate)
+        with profiler.stage('segment') if profile else nullcontext():
+            steady = getSteadySegments(filtered, samplerate)
+        if steady.found:
+            first, stop = centeredWindow(steady.start, steady.stop, 2 * half_window)
+        y = filtered[first:stop]
+    else:
+        with profiler.stage('filter_data') if profile else nullcontext():
+            y = filter_data(data[first:stop], fs=samplerate)
+    with warnings.catch_warnings():
+        # a flat window (e.g. a loose electrode) gives 0 / 0 in MNF, FR, PSR and VCF: NaN in the table
+        warnings.simplefilter('ignore', RuntimeWarning)
+        if cache_dir is None:
+            result_dict, cached = analyzeEMG(y, samplerate, False, profiler=profiler), False
+        else:
+            cache = ResultCache(cache_dir)
+            result_dict = cache.analyzeEMG(y, samplerate, preprocessing=False, profiler=profiler)
+            cached = cache.hits > 0
+
+    row = {column: info[column] for column in METADATA_COLUMNS}
+    for domain in ('TimeDomain', 'FrequencyDomain'):
+        for name, value in result_dict[domain].items():
+            row[name] = float(value)
+    row['segment_start'], row['segment_stop'] = trim + first, trim + stop
+    if segment == 'auto':
+        row['steady'] = bool(steady.found)
+    row['seconds'] = time.perf_counter() - start
+    row['cached'] = cached
+    if profile:
+        report = profiler.finish() if cached else profiler.last_report  # analyzeEMG finished the report
+        row['profile'] = dict(report, file=info['file'])
+    return row
+
+
+def run_batch(recordings, jobs=None, profile_sink=None, **kwargs):
+    """ Analyze recordings in a process pool, printing the progress
+
+        :param recordings: metadata of the recordings (see discover_recordings)
+        :type recordings: list
+        :param jobs: number of worker processes, None for one per core
+        :type jobs: int
+        :param profile_sink: sink of the profiling reports (e.g. a StageStats), None to not profile
+        :return: one row per recording, in the order of `recordings`, the failed recordings
+                 and the number of recordings read from the cache
+        :rtype: tuple
+    """
+    rows = [None] * len(recordings)
+    failed = []
+    cached = 0
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {executor.submit(analyze_recording, info, profile=profile_sink is not None, **kwargs): i
+                   for i, info in enumerate(recordings)}
+        for done, future in enumerate(as_completed(futures), 1):
+            i = futures[future]
+            try:
+                rows[i] = future.result()
+                hit = rows[i].pop('cached')
+                cached += hit
+                if profile_sink is not None:
+                    profile_sink(rows[i].pop('profile'))
+                print('[%d/%d] %s (%.3f s%s)' % (done, len(recordings), recordings[i]['path'], rows[i]['seconds'],
+                                                ', cached' if hit else ''))
+            except Exception as e:
+                failed.append((recordings[i], e))
+                print('[%d/%d] %s FAILED: %s' % (done, len(recordings), recordings[i]['path'], e))
+    return [row for row in rows if row is not None], failed, cached
+
+
+def write_results(rows, path):
+    """ Write the results table as csv """
+    if not rows:
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Analyze all the recordings of the openbci-data tree')
+    parser.add_argument('roots', nargs='*', default=['openbci-data/g20', 'openbci-data/g50'],
+                        help='folders to search for recordings')
+    parser.add_argument('--output', type=str, default='openbci-data/results/features.csv', help='results table')
+    parser.add_argument('--jobs', type=int, default=None, help='number of worker processes (default: one per core)')
+    parser.add_argument('--formats', type=str, nargs='+', default=['brainflow'], choices=['brainflow', 'openbci'],
+                        help='recording formats to analyze')
+    parser.add_argument('--channel', type=int, default=0, help='EXG channel to analyze (0 to 7)')
+    parser.add_argument('--samplerate', type=int, default=250, help='samplerate of the recordings in Hz')
+    parser.add_argument('--trim', type=int, default=250, help='samples dropped at the beginning and at the end')
+    parser.add_argument('--half-window', type=int, default=250, help='samples analyzed on each side of the midpoint')
+    parser.add_argument('--segment', type=str, default='midpoint', choices=['midpoint', 'auto'],
+                        help='window around the midpoint, or in the steady contraction found in each recording')
+    parser.add_argument('--cache-dir', type=str, default=None,
+                        help='folder of the results cache (e.g. openbci-data/cache), no cache by default')
+    parser.add_argument('--profile', action='store_true', help='print the percentiles of the time of every stage')
+    parser.add_argument('--profile-csv', type=str, default=None, help='also write the time of every stage to a csv')
+    args = parser.parse_args()
+
+    recordings = discover_recordings(args.roots, formats=tuple(args.formats))
+    print('%d recordings found' % len(recordings))
+    stage_stats = StageStats() if args.profile or args.profile_csv else None
+    profile_sink = stage_stats
+    if args.profile_csv:
+        csv_sink = CSVSink(args.profile_csv)
+        profile_sink = lambda report: (stage_stats(report), csv_sink(report))
+    start = time.perf_counter()
+    rows, failed, cached = run_batch(recordings, jobs=args.jobs, profile_sink=profile_sink, channel=args.channel,
+                                     samplerate=args.samplerate, trim=args.trim, half_window=args.half_window,
+                                     cache_dir=args.cache_dir, segment=args.segment)
+    write_results(rows, args.output)
+    elapsed = time.perf_counter() - start
+    print('%d recordings analyzed (%d from the cache), %d failed, in %.1f s -> %s'
+          % (len(rows), cached, len(failed), elapsed, args.output))
+    if args.cache_dir is not None:
+        stats = ResultCache(args.cache_dir).stats()
+        print('cache: %d entries, %d bytes' % (stats['entries'], stats['bytes']))
+    if stage_stats is not None:
+        print('stage times (ms, excluding inner stages):')
+        print(stage_stats.format())
+
+
+if __name__ == '__main__':
+    main()
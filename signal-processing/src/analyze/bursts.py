@@ -0,0 +1,146 @@
+import numpy as np #to handle datas
+import collections
+
+###############################################################################
+#                                                                             #
+#                       BURST / ONSET DETECTION                               #
+#                                                                             #
+###############################################################################
+""" Contractions of a whole recording, found on an energy envelope: the squared
+    signal smoothed by a Hamming window of windowSize ms. A burst is a run of
+    envelope values above a level placed between the noise floor and the contraction
+    level of each channel (percentiles of its envelope, so a filter transient or a
+    spike does not move it). Runs closer than minGap are merged and runs shorter than
+    minDuration are dropped. Every step is an array operation over all the channels,
+    so the cost is O(N) for any number of contractions. """
+
+Bursts = collections.namedtuple("Bursts", ["channel", "onset", "offset", "duration", "amplitude", "AFB"])
+
+def _windowSamples(samplerate, windowSize):
+    return(max(int(round(windowSize * samplerate / 1000)), 1))
+
+def _smoothEnergy(squaredSignal, samplerate, windowSize=32):
+    """ Hamming-weighted moving average of an already squared signal ('valid' part only). """
+    w = np.hamming(_windowSamples(samplerate, windowSize))
+    w = w[::-1] / w.sum()
+    if(squaredSignal.shape[-1] < len(w)): #shorter than one window: no envelope, hence no burst
+        return(np.zeros(squaredSignal.shape[:-1] + (0,)))
+    return(np.lib.stride_tricks.sliding_window_view(squaredSignal, len(w), axis=-1) @ w)
+
+def _runs(mask, minGap=0):
+    """ Runs of True on the last axis of a 2D mask, merged when closer than minGap.
+
+        :return: row, first index and index after the end of every run, sorted by row then start
+        :rtype: tuple
+    """
+    edges = np.zeros((mask.shape[0], mask.shape[1] + 2), dtype=np.int8)
+    edges[:, 1:-1] = mask
+    edges = np.diff(edges, axis=-1)
+    row, start = np.nonzero(edges == 1)
+    stop = np.nonzero(edges == -1)[1]
+    if(len(start) == 0):
+        return(row, start, stop)
+    first = np.ones(len(start), dtype=bool)
+    first[1:] = (row[1:] != row[:-1]) | ((start[1:] - stop[:-1]) >= minGap)
+    starts = np.flatnonzero(first)
+    stops = np.append(starts[1:] - 1, len(start) - 1)
+    return(row[starts], start[starts], stop[stops])
+
+def getEnergyEnvelope(rawEMGSignal, samplerate, windowSize=32):
+    """ Energy envelope of a signal: x**2 smoothed by a Hamming window of windowSize ms.
+
+        envelope[..., k] covers the samples k ... k + W - 1, with W = windowSize * samplerate / 1000
+        samples (8 samples for 32 ms at 250 Hz), so it has W - 1 values less than the signal.
+
+        :param rawEMGSignal: the EMG signal(s), samples on the last axis
+        :type rawEMGSignal: numpy.ndarray
+        :param samplerate: samplerate of the signal in Hz
+        :type samplerate: int
+        :param windowSize: window size in ms
+        :type windowSize: float
+        :return: the envelope
+        :rtype: numpy.ndarray
+    """
+    x = np.asarray(rawEMGSignal, dtype=np.float64)
+    return(_smoothEnergy(x * x, samplerate, windowSize))
+
+def detectBursts(envelope, samplerate, windowSize=32, threshold=0.3, minDuration=100, minGap=250, level=None, percentiles=(10, 90)):
+    """ Bursts of an energy envelope (see getEnergyEnvelope).
+
+        * Input:
+            * envelope = energy envelope(s), samples on the last axis
+            * samplerate = samplerate of the signal
+            * windowSize = window size (ms) of the envelope, to report the bursts in samples of the signal
+            * threshold = level of detection, as a fraction of the way from the noise floor to the
+              contraction level (the two percentiles of the envelope of each channel)
+            * minDuration = bursts shorter than this (ms) are dropped
+            * minGap = bursts separated by less than this (ms) are merged
+            * level = absolute level of detection (e.g. from a rest recording), instead of threshold
+        * Output:
+            * Bursts, sorted by channel then onset: channel (index in the flattened leading axes,
+              0 for a single signal), onset and offset (first sample and sample after the burst),
+              duration (s), amplitude (maximum of the envelope in the burst) and AFB, the amplitude
+              of the first burst of every channel (NaN without burst), with the leading shape of the input
+
+        :param envelope: the energy envelope
+        :type envelope: numpy.ndarray
+        :param samplerate: samplerate of the signal in Hz
+        :type samplerate: int
+        :param threshold: fraction of the range between the percentiles
+        :type threshold: float
+        :param minDuration: minimum duration of a burst in ms
+        :type minDuration: float
+        :param minGap: minimum gap between two bursts in ms
+        :type minGap: float
+        :return: the bursts
+        :rtype: Bursts
+    """
+    envelope = np.asarray(envelope, dtype=np.float64)
+    shape = envelope.shape[:-1]
+    rows = envelope.reshape(int(np.prod(shape)), envelope.shape[-1])
+    if(level is None and rows.shape[-1] == 0):
+        level = np.zeros(rows.shape[0])
+    elif(level is None):
+        floor, ceiling = np.percentile(rows, percentiles, axis=-1)
+        level = floor + threshold * (ceiling - floor)
+    else:
+        level = np.broadcast_to(np.asarray(level, dtype=np.float64), shape).ravel()
+    level = level.reshape(-1, 1)
+
+    channel, onset, offset = _runs(rows > level, minGap * samplerate / 1000)
+    keep = (offset - onset) >= minDuration * samplerate / 1000
+    channel, onset, offset = channel[keep], onset[keep], offset[keep]
+
+    #maximum of the envelope inside every burst, on the flattened envelope
+    if(len(onset)):
+        flat = np.append(rows.ravel(), -np.inf)
+        bounds = np.empty(2 * len(onset), dtype=np.intp)
+        bounds[0::2] = channel * rows.shape[1] + onset
+        bounds[1::2] = channel * rows.shape[1] + offset
+        amplitude = np.maximum.reduceat(flat, bounds)[0::2]
+    else:
+        amplitude = np.zeros(0)
+    AFB = np.full(rows.shape[0], np.nan)
+    firstOfChannel = np.ones(len(channel), dtype=bool)
+    firstOfChannel[1:] = channel[1:] != channel[:-1]
+    AFB[channel[firstOfChannel]] = amplitude[firstOfChannel]
+
+    shift = (_windowSamples(samplerate, windowSize) - 1) // 2 #envelope index -> center of its window
+    return(Bursts(channel, onset + shift, offset + shift, (offset - onset) / samplerate, amplitude, AFB.reshape(shape)[()]))
+
+def getBursts(rawEMGSignal, samplerate, windowSize=32, **kwargs):
+    """ Onsets, offsets, durations and amplitudes of all the bursts of a recording.
+
+        Computes the energy envelope once and passes it to detectBursts (see it for the
+        options and the output).
+
+        :param rawEMGSignal: the EMG signal(s), samples on the last axis
+        :type rawEMGSignal: numpy.ndarray
+        :param samplerate: samplerate of the signal in Hz
+        :type samplerate: int
+        :param windowSize: window size of the envelope in ms
+        :type windowSize: float
+        :return: the bursts
+        :rtype: Bursts
+    """
+    return(detectBursts(getEnergyEnvelope(rawEMGSignal, samplerate, windowSize), samplerate, windowSize, **kwargs))
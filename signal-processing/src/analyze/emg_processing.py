@@ -1,68 +1,51 @@
-from .freq_descriptors import * 
-from .time_descriptors import * 
-from .filters import * 
+from .freq_descriptors import phasicFilter
+from .filters import cascade_filter
+from .feature_graph import FeatureGraph
+from contextlib import nullcontext
 
+import numpy as np
 
-def analyzeEMG(rawEMGSignal, samplerate, preprocessing=True,lowpass=50,highpass=20,threshold = 0.01 ,nseg=3,phasic_seconds=4):
+
+def _noStage(name):
+    return(nullcontext())
+
+
+def analyzeEMG(rawEMGSignal, samplerate, preprocessing=True,lowpass=50,highpass=20,threshold = 0.01 ,nseg=3,phasic_seconds=4,features=None,profiler=None):
     
     """ This functions acts as entrypoint for the EMG Analysis.
     
         * Input:
-            * rawEMGSignal = raw signal as list
+            * rawEMGSignal = raw signal as list, or (n_channels, n_samples) array
             * samplerate = samplerate of the signal
             * lowpass = lowpass cutoff in Hz
             * highpass = highpass cutoff in Hz
             * threshold for the evaluation of ZC,MYOP,WAMP,SSC
             * nseg = number of segments for MAVSLPk, MHW,MTW
+            * features = names of the features to compute, None for all of them.
+              Only the requested features and the intermediates they need are evaluated.
+            * profiler = Profiler recording the time of the preprocessing stages and of every
+              feature and intermediate (see profiling.py); the report of the call is returned
+              by profiler.finish() and sent to its sink. None (the default) disables it.
         * Output:
-            * results dictionary
+            * results dictionary, with one value per channel for a 2D input
             
     """ 
-    resultsdict = {"TimeDomain":{},"FrequencyDomain":{}}
-    
+    stage = _noStage if profiler is None else profiler.stage
     if(preprocessing):
         #Preprocessing
-        filteredEMGSignal = butter_lowpass_filter(rawEMGSignal, lowpass, samplerate, 2)#filter the signal with a cutoff at 1Hz and a 2th order Butterworth filter
-        filteredEMGSignal = butter_highpass_filter(filteredEMGSignal, highpass, samplerate, 2)#filter the signal with a cutoff at 0.05Hz and a 2th order Butterworth filter
-        filteredEMGSignal = phasicFilter(filteredEMGSignal, samplerate,seconds=phasic_seconds)
+        with stage("filter"):
+            filteredEMGSignal = cascade_filter(rawEMGSignal, samplerate, highpass=highpass, lowpass=lowpass, order=2)#lowpass and highpass 2th order Butterworth filters in a single pass
+        with stage("phasicFilter"):
+            filteredEMGSignal = phasicFilter(filteredEMGSignal, samplerate,seconds=phasic_seconds)
     else:
         filteredEMGSignal = rawEMGSignal
     
-    #Time Domain Analysis
-    resultsdict["TimeDomain"]["IEMG"] = getIEMG(filteredEMGSignal)
-    resultsdict["TimeDomain"]["MAV"] = getMAV(filteredEMGSignal)
-    resultsdict["TimeDomain"]["MAV1"] = getMAV1(filteredEMGSignal)
-    resultsdict["TimeDomain"]["MAV2"] = getMAV2(filteredEMGSignal)
-    resultsdict["TimeDomain"]["SSI"] = getSSI(filteredEMGSignal)
-    resultsdict["TimeDomain"]["VAR"] = getVAR(filteredEMGSignal)
-    resultsdict["TimeDomain"]["TM3"] = getTM(filteredEMGSignal,3)
-    resultsdict["TimeDomain"]["TM4"] = getTM(filteredEMGSignal,4)
-    resultsdict["TimeDomain"]["TM5"] = getTM(filteredEMGSignal,5)
-    resultsdict["TimeDomain"]["LOG"] = getLOG(filteredEMGSignal)
-    resultsdict["TimeDomain"]["RMS"] = getRMS(filteredEMGSignal)
-    resultsdict["TimeDomain"]["WL"] = getWL(filteredEMGSignal)
-    resultsdict["TimeDomain"]["AAC"] = getAAC(filteredEMGSignal)
-    resultsdict["TimeDomain"]["DASDV"] = getDASDV(filteredEMGSignal)
-    resultsdict["TimeDomain"]["AFB"] = getAFB(filteredEMGSignal,samplerate)
-    resultsdict["TimeDomain"]["ZC"] = getZC(filteredEMGSignal,threshold)
-    resultsdict["TimeDomain"]["MYOP"] = getMYOP(filteredEMGSignal,threshold)
-    resultsdict["TimeDomain"]["WAMP"] = getWAMP(filteredEMGSignal,threshold)
-    resultsdict["TimeDomain"]["SSC"] = getSSC(filteredEMGSignal,threshold)
+    graph = FeatureGraph(filteredEMGSignal, samplerate, threshold, profiler)
+    with stage("features"):
+        resultsdict = graph.computeFeatures(features)
     # resultsdict["TimeDomain"]["MAVSLPk"] = getMAVSLPk(filteredEMGSignal,nseg)
     # resultsdict["TimeDomain"]["HIST"] = getHIST(filteredEMGSignal,threshold=threshold)
-    
-    #Frequency Domain Analysis
-    rawEMGPowerSpectrum, frequencies = getPSD(filteredEMGSignal,samplerate)
-    resultsdict["FrequencyDomain"]["MNF"] = getMNF(rawEMGPowerSpectrum, frequencies)
-    resultsdict["FrequencyDomain"]["MDF"] = getMDF(rawEMGPowerSpectrum, frequencies)
-    resultsdict["FrequencyDomain"]["PeakFrequency"] = getPeakFrequency(rawEMGPowerSpectrum, frequencies)
-    resultsdict["FrequencyDomain"]["MNP"] = getMNP(rawEMGPowerSpectrum)
-    resultsdict["FrequencyDomain"]["TTP"] = getTTP(rawEMGPowerSpectrum)
-    resultsdict["FrequencyDomain"]["SM1"] = getSM(rawEMGPowerSpectrum,frequencies,1)
-    resultsdict["FrequencyDomain"]["SM2"] = getSM(rawEMGPowerSpectrum,frequencies,2)
-    resultsdict["FrequencyDomain"]["SM3"] = getSM(rawEMGPowerSpectrum,frequencies,3)
-    resultsdict["FrequencyDomain"]["FR"] = getFR(rawEMGPowerSpectrum,frequencies)
-    resultsdict["FrequencyDomain"]["PSR"] = getPSR(rawEMGPowerSpectrum,frequencies)
-    resultsdict["FrequencyDomain"]["VCF"] = getVCF(resultsdict["FrequencyDomain"]["TTP"],resultsdict["FrequencyDomain"]["SM1"],resultsdict["FrequencyDomain"]["SM2"])
+    if(profiler is not None):
+        profiler.finish(n_samples=np.shape(rawEMGSignal)[-1])
     
     return(resultsdict)
\ No newline at end of file
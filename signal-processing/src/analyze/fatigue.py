@@ -0,0 +1,173 @@
+import numpy as np #to handle datas
+
+from .freq_descriptors import _cumulativePower, _batchMDF
+from .spectrogram import getSegmentSpectra
+
+###############################################################################
+#                                                                             #
+#                      STREAMING FATIGUE TRACKING                             #
+#                                                                             #
+###############################################################################
+""" Median and mean frequency over time, for the drift of the spectrum during a
+    sustained contraction. Every nperseg - noverlap new samples complete a segment;
+    its periodogram (welch scaling) is folded into an exponential average of the
+    spectrum of each channel, and MNF, MDF and peak frequency of the averaged
+    spectrum are emitted. Their slopes (Hz/s) are least-squares fits over the last
+    `horizon` seconds, kept up to date with running sums, so each update costs
+    O(nperseg) whatever the horizon. """
+
+FATIGUE_FEATURES = ["MNF","MDF","PeakFrequency"]
+
+class _RunningSlope:
+    """ Least-squares slope of the last `length` points (t, y), y on the last axis of the updates.
+
+        Points whose y is NaN (e.g. MNF of a flat segment) stay in the window but out of the
+        fit, so every channel keeps its own count and sums, and a flat start of the stream
+        does not leave NaN in them once its points are evicted. """
+
+    def __init__(self, length, shape):
+        self.length = length
+        self.t = np.zeros(length)
+        self.y = np.full(shape + (length,), np.nan)
+        self.count = 0
+        self.n = np.zeros(shape)
+        self.St = np.zeros(shape)
+        self.Stt = np.zeros(shape)
+        self.Sy = np.zeros(shape)
+        self.Sty = np.zeros(shape)
+
+    def _update(self, t, y, sign):
+        valid = np.isfinite(y)
+        y = np.where(valid, y, 0.0)
+        self.n = self.n + sign * valid
+        self.St = self.St + sign * valid * t
+        self.Stt = self.Stt + sign * valid * t * t
+        self.Sy = self.Sy + sign * y
+        self.Sty = self.Sty + sign * t * y
+
+    def add(self, t, y):
+        i = self.count % self.length
+        if(self.count >= self.length):
+            self._update(self.t[i], self.y[..., i], -1)
+        self.t[i] = t
+        self.y[..., i] = y
+        self._update(t, self.y[..., i], 1)
+        self.count += 1
+        denominator = self.n * self.Stt - self.St * self.St
+        fit = (self.n >= 2) & (denominator > 0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return(np.where(fit, (self.n * self.Sty - self.St * self.Sy) / denominator, np.nan))
+
+class FatigueTracker:
+    """ Streaming MNF, MDF and peak frequency of an exponentially averaged spectrum.
+
+        * Input:
+            * samplerate = samplerate of the signal
+            * nperseg = samples per segment (one periodogram per segment)
+            * noverlap = samples shared by two consecutive segments (nperseg // 2 by default)
+            * averaging = time constant (s) of the exponential average of the periodograms
+            * horizon = duration (s) of the fit of the slopes
+            * emitEvery = segments between two emitted values
+
+        The samples are on the last axis; leading axes (e.g. channels) are kept.
+        Between emissions, samples are only buffered; an update costs one rfft of
+        nperseg samples per channel. With the default settings a new value is
+        emitted every 0.5 s at 250 Hz.
+
+        :param samplerate: samplerate of the signal in Hz
+        :type samplerate: int
+        :param nperseg: samples per segment
+        :type nperseg: int
+        :param averaging: time constant of the spectrum average in seconds
+        :type averaging: float
+        :param horizon: duration of the slope fit in seconds
+        :type horizon: float
+    """
+
+    def __init__(self, samplerate, nperseg=256, noverlap=None, averaging=2.0, horizon=10.0, emitEvery=1):
+        self.samplerate = samplerate
+        self.nperseg = int(nperseg)
+        self.noverlap = self.nperseg // 2 if noverlap is None else int(noverlap)
+        self.step = self.nperseg - self.noverlap
+        if(self.step < 1):
+            raise ValueError("noverlap must be smaller than nperseg")
+        self.alpha = 1 - np.exp(-self.step / (averaging * samplerate))
+        self.horizonPoints = max(int(round(horizon * samplerate / (self.step * emitEvery))), 2)
+        self.emitEvery = int(emitEvery)
+        self.frequencies = np.fft.rfftfreq(self.nperseg, 1.0 / samplerate)
+        self.reset()
+
+    def reset(self):
+        """ Forget the stream, as if no sample had been seen yet. """
+        self.pending = None #samples not yet in a complete segment, plus the overlap
+        self.consumed = 0 #stream position of pending[..., 0]
+        self.segments = 0
+        self.spectrum = None
+        self.slopes = None
+
+    def process(self, chunk):
+        """ Add new samples and return the values emitted for the segments they complete.
+
+            :param chunk: new samples, on the last axis
+            :type chunk: numpy.ndarray
+            :return: "time" (end of each emitting segment, s from the start of the stream) and,
+                     with one value per emission on the last axis, MNF, MDF, PeakFrequency,
+                     MNFSlope and MDFSlope (Hz/s)
+            :rtype: dict
+        """
+        x = np.asarray(chunk, dtype=np.float64)
+        if(self.pending is None):
+            self.pending = x[..., :0]
+            self.slopes = {name: _RunningSlope(self.horizonPoints, x.shape[:-1]) for name in ("MNF", "MDF")}
+        elif(self.pending.shape[:-1] != x.shape[:-1]):
+            raise ValueError("chunk shape %s does not match the stream channels %s" % (x.shape, self.pending.shape[:-1]))
+        self.pending = np.concatenate([self.pending, x], axis=-1)
+
+        emitted = {name: [] for name in ["time"] + FATIGUE_FEATURES + ["MNFSlope", "MDFSlope"]}
+        if(self.pending.shape[-1] >= self.nperseg):
+            spectra, frequencies, starts = getSegmentSpectra(self.pending, self.samplerate, self.nperseg, self.noverlap)
+            for k in range(len(starts)):
+                self._addSegment(spectra[..., k, :], self.consumed + starts[k] + self.nperseg, emitted)
+            drop = len(starts) * self.step
+            self.pending = self.pending[..., drop:]
+            self.consumed += drop
+
+        shape = x.shape[:-1] + (len(emitted["time"]),)
+        results = {"time": np.asarray(emitted["time"], dtype=np.float64)}
+        for name, values in emitted.items():
+            if(name != "time"):
+                results[name] = np.moveaxis(np.asarray(values, dtype=np.float64), 0, -1) if values else np.zeros(shape)
+        return(results)
+
+    def _addSegment(self, periodogram, end, emitted):
+        if(self.spectrum is None):
+            self.spectrum = periodogram.copy()
+        else:
+            self.spectrum += self.alpha * (periodogram - self.spectrum)
+        self.segments += 1
+        if(self.segments % self.emitEvery):
+            return
+        f = self.frequencies
+        total = self.spectrum.sum(axis=-1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            MNF = (self.spectrum @ f) / total
+        MDF = np.asarray(_batchMDF(_cumulativePower(self.spectrum), f), dtype=np.float64)
+        t = end / self.samplerate
+        emitted["time"].append(t)
+        emitted["MNF"].append(MNF)
+        emitted["MDF"].append(MDF)
+        emitted["PeakFrequency"].append(f[np.argmax(self.spectrum, axis=-1)])
+        emitted["MNFSlope"].append(self.slopes["MNF"].add(t, MNF))
+        emitted["MDFSlope"].append(self.slopes["MDF"].add(t, MDF))
+
+def trackFatigue(rawEMGSignal, samplerate, **kwargs):
+    """ FatigueTracker over a whole recording (e.g. from src.recordings.loaders).
+
+        :param rawEMGSignal: the EMG signal(s), samples on the last axis
+        :type rawEMGSignal: numpy.ndarray
+        :param samplerate: samplerate of the signal in Hz
+        :type samplerate: int
+        :return: the values emitted for the whole signal (see FatigueTracker.process)
+        :rtype: dict
+    """
+    return(FatigueTracker(samplerate, **kwargs).process(rawEMGSignal))
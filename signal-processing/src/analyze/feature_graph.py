@@ -0,0 +1,139 @@
+import numpy as np #to handle datas
+
+from .time_descriptors import _mavWeights, _batchZC, _batchSSC
+from .bursts import _smoothEnergy, detectBursts
+from .freq_descriptors import getPSD, getVCF, getSpectralBands, _cumulativePower, _batchMDF, _batchFR, _batchPSR
+
+###############################################################################
+#                                                                             #
+#                           FEATURE GRAPH                                     #
+#                                                                             #
+###############################################################################
+""" Every feature and every shared intermediate (rectified signal, squared signal,
+    first difference, energy envelope and bursts, PSD, spectral moments) is a node
+    of the graph. A node is computed the first time it is requested and memoized,
+    so a call that asks only for MAV, RMS and MDF never evaluates the other features. """
+
+TIME_FEATURES = ["IEMG","MAV","MAV1","MAV2","SSI","VAR","TM3","TM4","TM5","LOG","RMS",
+                 "WL","AAC","DASDV","AFB","ZC","MYOP","WAMP","SSC"]
+FREQUENCY_FEATURES = ["MNF","MDF","PeakFrequency","MNP","TTP","SM1","SM2","SM3","FR","PSR","VCF"]
+
+_NODES = {
+    #shared intermediates
+    "abs": lambda g: np.abs(g.signal),
+    "square": lambda g: g.signal * g.signal,
+    "diff": lambda g: np.diff(g.signal, axis=-1),
+    "absDiff": lambda g: np.abs(g["diff"]),
+    "slopeSign": lambda g: np.sign(g["diff"]),
+    "energyEnvelope": lambda g: _smoothEnergy(g["square"], g.samplerate),
+    "bursts": lambda g: detectBursts(g["energyEnvelope"], g.samplerate),
+    "nperseg": lambda g: min(256, g.N),
+    "psd": lambda g: getPSD(g.signal, g.samplerate, g["nperseg"]),
+    "powerSpectrum": lambda g: g["psd"][0],
+    "spectralBands": lambda g: getSpectralBands(g.samplerate, g["nperseg"]),
+    "frequencies": lambda g: g["spectralBands"].frequencies,
+    "cumulativePower": lambda g: _cumulativePower(g["powerSpectrum"]),
+
+    #time domain
+    "IEMG": lambda g: g["abs"].sum(axis=-1),
+    "MAV": lambda g: g["IEMG"] / g.N,
+    "MAV1": lambda g: (g["abs"] @ _mavWeights(g.N, 1)) / g.N,
+    "MAV2": lambda g: (g["abs"] @ _mavWeights(g.N, 2)) / g.N,
+    "SSI": lambda g: g["square"].sum(axis=-1),
+    "VAR": lambda g: g["SSI"] / (g.N - 1),
+    "TM3": lambda g: np.abs((g["square"] * g.signal).mean(axis=-1)),
+    "TM4": lambda g: np.abs((g["square"] * g["square"]).mean(axis=-1)),
+    "TM5": lambda g: np.abs((g["square"] * g["square"] * g.signal).mean(axis=-1)),
+    "LOG": lambda g: np.exp(g["MAV"]),
+    "RMS": lambda g: np.sqrt(g["SSI"] / g.N),
+    "WL": lambda g: g["absDiff"].sum(axis=-1),
+    "AAC": lambda g: g["WL"] / g.N,
+    "DASDV": lambda g: (g["diff"] * g["diff"]).sum(axis=-1) / (g.N - 1),
+    "AFB": lambda g: g["bursts"].AFB,
+    "ZC": lambda g: _batchZC(g.signal, g.threshold),
+    "MYOP": lambda g: np.count_nonzero(g["abs"] >= g.threshold, axis=-1) / g.N,
+    "WAMP": lambda g: np.count_nonzero(-g["diff"] >= g.threshold, axis=-1),
+    "SSC": lambda g: _batchSSC(g.signal, g["slopeSign"], g.threshold),
+
+    #frequency domain
+    "MNF": lambda g: g["SM1"] / g["TTP"],
+    "MDF": lambda g: _batchMDF(g["cumulativePower"], g["frequencies"]),
+    "PeakFrequency": lambda g: g["frequencies"][np.argmax(g["powerSpectrum"], axis=-1)],
+    "MNP": lambda g: g["TTP"] / len(g["frequencies"]),
+    "TTP": lambda g: g["cumulativePower"][..., -1],
+    "SM1": lambda g: g["powerSpectrum"] @ g["frequencies"],
+    "SM2": lambda g: (g["powerSpectrum"] * g["powerSpectrum"]) @ g["frequencies"],
+    "SM3": lambda g: (g["powerSpectrum"] * g["powerSpectrum"] * g["powerSpectrum"]) @ g["frequencies"],
+    "FR": lambda g: _batchFR(g["cumulativePower"], g["spectralBands"]),
+    "PSR": lambda g: _batchPSR(g["cumulativePower"], g["powerSpectrum"], g["spectralBands"]),
+    "VCF": lambda g: getVCF(g["TTP"], g["SM1"], g["SM2"]),
+}
+
+class FeatureGraph:
+    """ Lazy evaluation of the EMG features of a signal, with memoized intermediates.
+
+        * Input:
+            * rawEMGSignal = EMG signal, samples on the last axis
+            * samplerate = samplerate of the signal
+            * threshold for the evaluation of ZC,MYOP,WAMP,SSC
+            * profiler = Profiler recording the evaluation of every node, None to disable it
+
+        Nodes are read with graph["MAV"]; the value is computed once per graph.
+
+        :param rawEMGSignal: the EMG signal
+        :type rawEMGSignal: list
+        :param samplerate: samplerate of the signal in Hz
+        :type samplerate: int
+        :param threshold: value to sum / substract to the zero when evaluating the crossing.
+        :type threshold: float
+        :param profiler: profiler of the evaluation
+        :type profiler: Profiler
+    """
+
+    def __init__(self, rawEMGSignal, samplerate, threshold=0.01, profiler=None):
+        self.signal = np.asarray(rawEMGSignal, dtype=np.float64)
+        self.N = self.signal.shape[-1]
+        self.samplerate = samplerate
+        self.threshold = threshold
+        self.profiler = profiler
+        self._values = {}
+
+    def __getitem__(self, name):
+        if(name not in self._values):
+            if(name not in _NODES):
+                raise KeyError("unknown feature or intermediate: %s" % name)
+            if(self.profiler is None):
+                self._values[name] = _NODES[name](self)
+            else:
+                with self.profiler.stage(name):
+                    self._values[name] = _NODES[name](self)
+        return(self._values[name])
+
+    def computeFeatures(self, features=None):
+        """ Evaluate the requested features and group them like analyzeEMG does.
+
+            * Input:
+                * features = iterable of feature names, None for all of them
+            * Output:
+                * results dictionary with a "TimeDomain" and a "FrequencyDomain" section
+
+            :param features: names of the features to evaluate
+            :type features: list
+            :return: results dictionary
+            :rtype: dict
+        """
+        if(features is None):
+            features = TIME_FEATURES + FREQUENCY_FEATURES
+        features = set(features)
+        unknown = features.difference(TIME_FEATURES + FREQUENCY_FEATURES)
+        if(unknown):
+            raise ValueError("unknown features: %s" % ", ".join(sorted(unknown)))
+
+        resultsdict = {"TimeDomain":{},"FrequencyDomain":{}}
+        for name in TIME_FEATURES:
+            if(name in features):
+                resultsdict["TimeDomain"][name] = self[name]
+        for name in FREQUENCY_FEATURES:
+            if(name in features):
+                resultsdict["FrequencyDomain"][name] = self[name]
+        return(resultsdict)
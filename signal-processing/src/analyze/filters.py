@@ -1,8 +1,8 @@
-import peakutils #peak detection
 import numpy as np #to handle datas
-import math #to handle mathematical stuff (example power of 2)
-import scipy
-from scipy.signal import butter, lfilter, welch, square  #for signal filtering
+import functools #cache of the filter designs
+
+#scipy.signal is imported by the functions that use it, so that importing the
+#package does not pay for it (see benchmarks/bench_import.py)
 
 ###############################################################################
 #                                                                             #
@@ -10,6 +10,100 @@ from scipy.signal import butter, lfilter, welch, square  #for signal filtering
 #                                                                             #
 ###############################################################################
     
+#Filter design cache
+@functools.lru_cache(maxsize=64)
+def _design_filter(kind, order, cutoffs, fs, Q):
+    from scipy.signal import butter, iirnotch, tf2sos
+    if(kind == 'notch'):
+        b, a = iirnotch(cutoffs[0], Q, fs)
+        sos = tf2sos(b, a)
+    else:
+        cutoff = cutoffs[0] if len(cutoffs) == 1 else list(cutoffs)
+        sos = butter(order, cutoff, btype=kind, fs=fs, output='sos')
+    return(sos)
+
+def design_filter(kind, order, cutoffs, fs, Q=30):
+    """ This functions returns the second-order sections of a filter, designed once per set of parameters
+    
+        :param kind: 'lowpass', 'highpass', 'bandpass', 'bandstop' (Butterworth) or 'notch'
+        :type kind: str
+        :param order: order of the Butter Filter (ignored for the notch)
+        :type order: int
+        :param cutoffs: cutoff frequency, or (low, high) for band filters, or the notch frequency
+        :type cutoffs: float
+        :param fs: samplerate of the signal
+        :type fs: float
+        :param Q: quality factor of the notch (ignored for the Butterworth filters)
+        :type Q: float
+        :return: second-order sections (shared between callers, do not modify them)
+        :rtype: numpy.ndarray
+    """
+    cutoffs = tuple(float(c) for c in np.atleast_1d(cutoffs))
+    if(kind == 'notch'):
+        order = None
+    else:
+        Q = None
+    return(_design_filter(kind, order, cutoffs, float(fs), Q))
+
+@functools.lru_cache(maxsize=64)
+def cascade_sos(fs, highpass=None, lowpass=None, notch=None, order=2, Q=30):
+    """ This functions stacks highpass, lowpass and notch filters into one set of second-order sections
+    
+        :param fs: samplerate of the signal
+        :type fs: float
+        :param highpass: highpass cutoff in Hz, None to skip it
+        :type highpass: float
+        :param lowpass: lowpass cutoff in Hz, None to skip it
+        :type lowpass: float
+        :param notch: notch frequency in Hz, None to skip it
+        :type notch: float
+        :param order: order of the Butter Filters
+        :type order: int
+        :param Q: quality factor of the notch
+        :type Q: float
+        :return: second-order sections of the cascade
+        :rtype: numpy.ndarray
+    """
+    sections = []
+    if(highpass is not None):
+        sections.append(design_filter('highpass', order, highpass, fs))
+    if(lowpass is not None):
+        sections.append(design_filter('lowpass', order, lowpass, fs))
+    if(notch is not None):
+        sections.append(design_filter('notch', order, notch, fs, Q))
+    if(not sections):
+        raise ValueError("the cascade needs at least one filter")
+    sos = np.vstack(sections)
+    return(sos)
+
+def cascade_filter(data, fs, highpass=None, lowpass=None, notch=None, order=2, Q=30, zero_phase=False):
+    """ This functions apply highpass, lowpass and notch filters to a signal in a single pass
+    
+        :param data: EMG signal(s), samples on the last axis
+        :type data: numpy.ndarray
+        :param fs: samplerate of the signal
+        :type fs: float
+        :param highpass: highpass cutoff in Hz, None to skip it
+        :type highpass: float
+        :param lowpass: lowpass cutoff in Hz, None to skip it
+        :type lowpass: float
+        :param notch: notch frequency in Hz, None to skip it
+        :type notch: float
+        :param order: order of the Butter Filters
+        :type order: int
+        :param Q: quality factor of the notch
+        :type Q: float
+        :param zero_phase: filter forward and backward (like filtfilt) instead of causally
+        :type zero_phase: bool
+        :return: filtered signal(s)
+        :rtype: numpy.ndarray
+    """
+    from scipy.signal import sosfilt, sosfiltfilt
+    sos = cascade_sos(fs, highpass, lowpass, notch, order, Q)
+    if(zero_phase):
+        return(sosfiltfilt(sos, data, axis=-1))
+    return(sosfilt(sos, data, axis=-1))
+
 #Define the filters
 def butter_lowpass(cutoff, fs, order=5):
     """ This functions generates a lowpass butter filter
@@ -25,6 +119,7 @@ def butter_lowpass(cutoff, fs, order=5):
         :return: butter lowpass filter
         :rtype: list
     """
+    from scipy.signal import butter
     nyq = 0.5 * fs #Nyquist frequeny is half the sampling frequency
     normal_cutoff = cutoff / nyq 
     b, a = butter(order, normal_cutoff, btype='low', analog=False)
@@ -44,6 +139,7 @@ def butter_highpass(cutoff, fs, order=5):
         :return: butter highpass filter
         :rtype: list
     """
+    from scipy.signal import butter
     nyq = 0.5 * fs #Nyquist frequeny is half the sampling frequency
     normal_cutoff = cutoff / nyq 
     b, a = butter(order, normal_cutoff, btype='high', analog=False)
@@ -65,8 +161,8 @@ def butter_lowpass_filter(data, cutoff, fs, order):
         :return: lowpass filtered ECG signal
         :rtype: list
     """
-    b, a = butter_lowpass(cutoff, fs, order=order)
-    y = lfilter(b, a, data)
+    from scipy.signal import sosfilt
+    y = sosfilt(design_filter('lowpass', order, cutoff, fs), data)
     return(y)
     
 def butter_highpass_filter(data, cutoff, fs, order):
@@ -85,6 +181,125 @@ def butter_highpass_filter(data, cutoff, fs, order):
         :return: highpass filtered ECG signal
         :rtype: list
     """
-    b, a = butter_highpass(cutoff, fs, order=order)
-    y = lfilter(b, a, data)
+    from scipy.signal import sosfilt
+    y = sosfilt(design_filter('highpass', order, cutoff, fs), data)
     return(y)
+
+
+###############################################################################
+#                                                                             #
+#                          STREAMING FILTERS                                  #
+#                                                                             #
+###############################################################################
+""" Causal filters that keep their internal state (zi) between calls, so a signal can
+    be filtered chunk by chunk as it arrives from the board. Feeding the chunks of a
+    signal one after the other gives exactly the same output as filtering the whole
+    signal with a new filter object. """
+
+class StreamingFilter:
+    """ Causal IIR filter, in second-order sections, with state carried across chunks.
+    
+        The samples are on the last axis; any leading axes (e.g. channels) get their own
+        state, created on the first call.
+        
+        :param sos: second-order sections of the filter
+        :type sos: numpy.ndarray
+    """
+    
+    def __init__(self, sos):
+        self.sos = np.atleast_2d(np.asarray(sos, dtype=np.float64))
+        self.zi = None
+    
+    def reset(self):
+        """ Forget the state, as if no sample had been filtered yet. """
+        self.zi = None
+    
+    def process(self, chunk):
+        """ Filter a chunk of samples, continuing from the end of the previous chunk.
+        
+            :param chunk: new samples, on the last axis
+            :type chunk: numpy.ndarray
+            :return: filtered samples
+            :rtype: numpy.ndarray
+        """
+        x = np.asarray(chunk, dtype=np.float64)
+        if(self.zi is None):
+            self.zi = np.zeros((self.sos.shape[0],) + x.shape[:-1] + (2,))
+        elif(self.zi.shape[1:-1] != x.shape[:-1]):
+            raise ValueError("chunk shape %s does not match the filter channels %s" % (x.shape, self.zi.shape[1:-1]))
+        if(x.shape[-1] == 0): #e.g. no new sample from the board: nothing to filter, the state is kept
+            return(x.copy())
+        from scipy.signal import sosfilt
+        y, self.zi = sosfilt(self.sos, x, axis=-1, zi=self.zi)
+        return(y)
+
+class LowpassFilter(StreamingFilter):
+    """ Streaming Butterworth lowpass filter.
+    
+        :param cutoff: cutoff frequency
+        :type cutoff: float
+        :param fs: samplerate of the signal
+        :type fs: float
+        :param order: order of the Butter Filter
+        :type order: int
+    """
+    
+    def __init__(self, cutoff, fs, order=2):
+        super().__init__(design_filter('lowpass', order, cutoff, fs))
+
+class HighpassFilter(StreamingFilter):
+    """ Streaming Butterworth highpass filter.
+    
+        :param cutoff: cutoff frequency
+        :type cutoff: float
+        :param fs: samplerate of the signal
+        :type fs: float
+        :param order: order of the Butter Filter
+        :type order: int
+    """
+    
+    def __init__(self, cutoff, fs, order=2):
+        super().__init__(design_filter('highpass', order, cutoff, fs))
+
+class BandpassFilter(StreamingFilter):
+    """ Streaming Butterworth bandpass filter.
+    
+        :param lowcut: lower cutoff frequency
+        :type lowcut: float
+        :param highcut: upper cutoff frequency
+        :type highcut: float
+        :param fs: samplerate of the signal
+        :type fs: float
+        :param order: order of the Butter Filter
+        :type order: int
+    """
+    
+    def __init__(self, lowcut, highcut, fs, order=2):
+        super().__init__(design_filter('bandpass', order, (lowcut, highcut), fs))
+
+class NotchFilter(StreamingFilter):
+    """ Streaming notch filter for the power line interference.
+    
+        :param fs: samplerate of the signal
+        :type fs: float
+        :param f0: frequency to remove
+        :type f0: float
+        :param Q: quality factor of the notch
+        :type Q: float
+    """
+    
+    def __init__(self, fs, f0=60, Q=30):
+        super().__init__(design_filter('notch', None, f0, fs, Q))
+
+class FilterCascade(StreamingFilter):
+    """ Several streaming filters applied one after the other, in a single pass.
+    
+        The sections of all the filters are stacked, so the cascade keeps one state
+        and filters each chunk with one call.
+        
+        :param filters: filters to apply, in order
+        :type filters: StreamingFilter
+    """
+    
+    def __init__(self, *filters):
+        super().__init__(np.vstack([f.sos for f in filters]))
@@ -1,16 +1,15 @@
-import peakutils #peak detection
 import numpy as np #to handle datas
-import math #to handle mathematical stuff (example power of 2)
-import scipy
-from scipy.signal import butter, lfilter, welch, square  #for signal filtering
-import matplotlib.pyplot as plt  
+import heapq #sliding median
+import functools #cache of the band index tables
+import collections
     
 ###############################################################################
 #                                                                             #
 #                       FREQUENCY DOMAIN FEATURES                             #
 #                                                                             #
 ###############################################################################
-""" This section contains all the functions used in frequency analysis """ 
+""" This section contains all the functions used in frequency analysis.
+    Spectra are on the last axis, so a (n_channels, n_bins) array gives one value per channel. """ 
 
 
 def getMNF(rawEMGPowerSpectrum, frequencies):
@@ -35,11 +34,9 @@ def getMNF(rawEMGPowerSpectrum, frequencies):
         :return: mean frequency of the EMG power spectrum
         :rtype: float
     """
-    a = []
-    for i in range(0, len(frequencies)):
-        a.append(frequencies[i] * rawEMGPowerSpectrum[i])
-    b = sum(rawEMGPowerSpectrum)
-    MNF = sum(a) / b
+    a = np.asarray(rawEMGPowerSpectrum) @ np.asarray(frequencies)
+    b = np.sum(rawEMGPowerSpectrum, axis=-1)
+    MNF = a / b
     return(MNF)
     
 def getMDF(rawEMGPowerSpectrum, frequencies):
@@ -60,10 +57,8 @@ def getMDF(rawEMGPowerSpectrum, frequencies):
         :return: median frequency of the EMG power spectrum
         :rtype: float
     """
-    MDP = sum(rawEMGPowerSpectrum) * (1/2)
-    for i in range(1, len(rawEMGPowerSpectrum)):
-        if(sum(rawEMGPowerSpectrum[0:i]) >= MDP):
-            return(frequencies[i])
+    MDF = _batchMDF(_cumulativePower(np.asarray(rawEMGPowerSpectrum, dtype=np.float64)), np.asarray(frequencies))
+    return(MDF)
             
 def getPeakFrequency(rawEMGPowerSpectrum, frequencies):
     """ Obtain the frequency at which the maximum peak occur 
@@ -81,7 +76,7 @@ def getPeakFrequency(rawEMGPowerSpectrum, frequencies):
         :return: peakfrequency of the EMG Power spectrum
         :rtype: float
     """
-    peakFrequency = frequencies[np.argmax(rawEMGPowerSpectrum)]
+    peakFrequency = np.asarray(frequencies)[np.argmax(rawEMGPowerSpectrum, axis=-1)]
     return(peakFrequency)
 
 def getMNP(rawEMGPowerSpectrum):
@@ -102,7 +97,7 @@ def getMNP(rawEMGPowerSpectrum):
         :rtype: float
     """
     
-    MNP = np.mean(rawEMGPowerSpectrum)
+    MNP = np.mean(rawEMGPowerSpectrum, axis=-1)
     return(MNP)
     
 def getTTP(rawEMGPowerSpectrum):
@@ -121,7 +116,7 @@ def getTTP(rawEMGPowerSpectrum):
         :rtype: float
     """
     
-    TTP = sum(rawEMGPowerSpectrum)
+    TTP = np.sum(rawEMGPowerSpectrum, axis=-1)
     return(TTP)
         
 def getSM(rawEMGPowerSpectrum, frequencies, order):
@@ -145,10 +140,7 @@ def getSM(rawEMGPowerSpectrum, frequencies, order):
         :return: Spectral moment of order X of the EMG power spectrum
         :rtype: float
     """
-    SMo = []
-    for j in range(0, len(frequencies)):
-        SMo.append(frequencies[j]*(rawEMGPowerSpectrum[j] ** order))
-    SMo = sum(SMo)
+    SMo = np.power(rawEMGPowerSpectrum, order) @ np.asarray(frequencies)
     return(SMo)   
     
 def getFR(rawEMGPowerSpectrum, frequencies, llc=30, ulc=250, lhc=250,uhc=500):
@@ -164,7 +156,7 @@ def getFR(rawEMGPowerSpectrum, frequencies, llc=30, ulc=250, lhc=250,uhc=500):
             * lhc = lower high cutoff
             * uhc = upper high cutoff
         * Output:
-            * Frequency Ratio
+            * Frequency Ratio (NaN when a band has no bin, e.g. above Nyquist)
             
         :param rawEMGPowerSpectrum: power spectrum of the EMG signal
         :type rawEMGPowerSpectrum: list
@@ -181,15 +173,13 @@ def getFR(rawEMGPowerSpectrum, frequencies, llc=30, ulc=250, lhc=250,uhc=500):
         :return: frequencies ratio of the EMG power spectrum
         :rtype: float
     """
-    frequencies = list(frequencies)
+    rawEMGPowerSpectrum = np.asarray(rawEMGPowerSpectrum, dtype=np.float64)
     #First we check for the closest value into the frequency list to the cutoff frequencies
-    llc = min(frequencies, key=lambda x:abs(x-llc))
-    ulc = min(frequencies, key=lambda x:abs(x-ulc))
-    lhc = min(frequencies, key=lambda x:abs(x-lhc))
-    uhc = min(frequencies, key=lambda x:abs(x-uhc))
+    llc, ulc, lhc, uhc = _nearestBins(np.asarray(frequencies), [llc, ulc, lhc, uhc])
     
-    LF = sum([P for P in rawEMGPowerSpectrum[frequencies.index(llc):frequencies.index(ulc)]])
-    HF = sum([P for P in rawEMGPowerSpectrum[frequencies.index(lhc):frequencies.index(uhc)]])
+    cumulativePower = _cumulativePower(rawEMGPowerSpectrum)
+    LF = _bandPower(cumulativePower, llc, ulc)
+    HF = _bandPower(cumulativePower, lhc, uhc)
     FR = LF / HF
     return(FR)
 
@@ -203,6 +193,8 @@ def getPSR(rawEMGPowerSpectrum,frequencies,n=20,fmin=10,fmax=500):
             * n = range around f0 to evaluate P0
             * fmin = min frequency
             * fmax = max frequency
+        * Output:
+            * Power Spectrum Ratio (NaN when a band has no bin, e.g. above Nyquist)
         
         :param rawEMGPowerSpectrum: power spectrum of the EMG signal
         :type rawEMGPowerSpectrum: list
@@ -218,21 +210,20 @@ def getPSR(rawEMGPowerSpectrum,frequencies,n=20,fmin=10,fmax=500):
         :rtype: float
     """
     
-    frequencies = list(frequencies)
+    rawEMGPowerSpectrum = np.asarray(rawEMGPowerSpectrum, dtype=np.float64)
+    frequencies = np.asarray(frequencies)
     
     #The maximum peak and frequencies are evaluate using the getPeakFrequency functions
     #First we check for the closest value into the frequency list to the cutoff frequencies
     peakFrequency = getPeakFrequency(rawEMGPowerSpectrum, frequencies)
-    f0min = peakFrequency - n
-    f0max = peakFrequency + n
-    f0min = min(frequencies, key=lambda x:abs(x-f0min))
-    f0max = min(frequencies, key=lambda x:abs(x-f0max))
-    fmin = min(frequencies, key=lambda x:abs(x-fmin))
-    fmax = min(frequencies, key=lambda x:abs(x-fmax))
+    f0min = _nearestBins(frequencies, peakFrequency - n)
+    f0max = _nearestBins(frequencies, peakFrequency + n)
+    fmin, fmax = _nearestBins(frequencies, [fmin, fmax])
     
     #here we evaluate P0 and P
-    P0 = sum(rawEMGPowerSpectrum[frequencies.index(f0min):frequencies.index(f0max)])
-    P = sum(rawEMGPowerSpectrum[frequencies.index(fmin):frequencies.index(fmax)])
+    cumulativePower = _cumulativePower(rawEMGPowerSpectrum)
+    P0 = _bandPower(cumulativePower, f0min, f0max)
+    P = _bandPower(cumulativePower, fmin, fmax)
     PSR = P0 / P
     
     return(PSR)
@@ -261,46 +252,363 @@ def getVCF(SM0,SM1,SM2):
     VCF = (SM2 / SM0) - (SM1/SM0)**2
     return(VCF)
     
+###############################################################################
+#                                                                             #
+#                   BATCH FREQUENCY DOMAIN FEATURES                           #
+#                                                                             #
+###############################################################################
+""" Vectorized versions of the features above, for a matrix of power spectra
+    (windows x bins). Band limits are turned into bin indexes once per
+    (samplerate, nperseg, cutoffs) and band powers are read from a cumulative sum. """
+
+SpectralBands = collections.namedtuple("SpectralBands", ["frequencies", "lowBand", "highBand", "psrBand", "psrPeakStart", "psrPeakStop"])
+
+def _nearestBins(frequencies, targets):
+    """ Index of the frequency closest to each target; on ties the lower frequency
+        wins, as with min(frequencies, key=...) in getFR and getPSR. """
+    targets = np.asarray(targets, dtype=np.float64)
+    right = np.clip(np.searchsorted(frequencies, targets), 1, len(frequencies) - 1)
+    left = right - 1
+    useLeft = np.abs(frequencies[left] - targets) <= np.abs(frequencies[right] - targets)
+    return(np.where(useLeft, left, right))
+
+@functools.lru_cache(maxsize=32)
+def getSpectralBands(samplerate, nperseg=256, llc=30, ulc=250, lhc=250, uhc=500, n=20, fmin=10, fmax=500):
+    """ Build the bin index table used by getFrequencyFeatures.
+    
+        Cutoffs are clipped to [0, Nyquist] and mapped to the closest frequency bin.
+        The table is cached, so it is computed once per combination of arguments.
+        
+        * Input:
+            * samplerate = samplerate of the signal
+            * nperseg = length of the segments used for the PSD
+            * llc, ulc, lhc, uhc = cutoffs of the FR bands (see getFR)
+            * n, fmin, fmax = PSR parameters (see getPSR)
+        * Output:
+            * SpectralBands with the frequencies, the (start, stop) bins of the FR and PSR bands
+              and, for every possible peak bin, the (start, stop) bins of the PSR peak band
+              
+        :param samplerate: samplerate of the signal in Hz
+        :type samplerate: float
+        :param nperseg: length of the segments used for the PSD
+        :type nperseg: int
+        :return: bin index table
+        :rtype: SpectralBands
+    """
+    frequencies = np.fft.rfftfreq(nperseg, 1 / samplerate)
+    frequencies.setflags(write=False)
+    nyquist = samplerate / 2
+    cutoffs = np.clip([llc, ulc, lhc, uhc, fmin, fmax], 0, nyquist)
+    llc, ulc, lhc, uhc, fmin, fmax = _nearestBins(frequencies, cutoffs)
+    psrPeakStart = _nearestBins(frequencies, np.clip(frequencies - n, 0, nyquist))
+    psrPeakStop = _nearestBins(frequencies, np.clip(frequencies + n, 0, nyquist))
+    psrPeakStart.setflags(write=False)
+    psrPeakStop.setflags(write=False)
+    return(SpectralBands(frequencies, (llc, ulc), (lhc, uhc), (fmin, fmax), psrPeakStart, psrPeakStop))
+
+def _bandPower(cumulativePower, start, stop):
+    """ Sum of the power in the bins [start, stop), from the zero-prefixed cumulative
+        power. Empty bands (e.g. a band above Nyquist) give NaN. """
+    start = np.broadcast_to(start, cumulativePower.shape[:-1])
+    stop = np.broadcast_to(stop, cumulativePower.shape[:-1])
+    power = np.take_along_axis(cumulativePower, stop[..., None], axis=-1)[..., 0] - np.take_along_axis(cumulativePower, start[..., None], axis=-1)[..., 0]
+    return(np.where(stop > start, power, np.nan)[()])
+
+def _cumulativePower(powerSpectrum):
+    """ Cumulative sum of the spectrum with a leading zero, so that the power of bins
+        [a, b) is cumulativePower[b] - cumulativePower[a]. """
+    zeros = np.zeros(powerSpectrum.shape[:-1] + (1,))
+    return(np.concatenate([zeros, np.cumsum(powerSpectrum, axis=-1)], axis=-1))
+
+def _batchMDF(cumulativePower, frequencies):
+    """ Vectorized form of getMDF: the first bin i >= 1 whose preceding power reaches half
+        of the total. NaN when no bin qualifies (getMDF returns None). """
+    M = len(frequencies)
+    half = cumulativePower[..., -1:] * (1/2)
+    i = np.count_nonzero(cumulativePower[..., 1:M] < half, axis=-1) + 1
+    MDF = np.where(i < M, frequencies[np.minimum(i, M - 1)], np.nan)
+    return(MDF[()])
+
+def _batchFR(cumulativePower, bands):
+    """ Vectorized form of getFR. """
+    LF = _bandPower(cumulativePower, *bands.lowBand)
+    HF = _bandPower(cumulativePower, *bands.highBand)
+    return(LF / HF)
+
+def _batchPSR(cumulativePower, powerSpectrum, bands):
+    """ Vectorized form of getPSR, with the peak band read from the bin index table. """
+    peak = np.argmax(powerSpectrum, axis=-1)
+    P0 = _bandPower(cumulativePower, bands.psrPeakStart[peak], bands.psrPeakStop[peak])
+    P = _bandPower(cumulativePower, *bands.psrBand)
+    return(P0 / P)
+
+def getFrequencyFeatures(rawEMGPowerSpectrum, samplerate, nperseg=256, **cutoffs):
+    """ Compute all the frequency domain features for a matrix of power spectra.
+    
+        The spectra are on the last axis, so a (windows x bins) or
+        (channel x windows x bins) array is analyzed in one call. Cumulative sums replace
+        the per-bin loops of the scalar functions and the FR / PSR bands come from
+        getSpectralBands. Bands that fall entirely above Nyquist (e.g. the default FR high
+        band of 250-500 Hz at 250 Hz samplerate) give NaN instead of a division by zero.
+        
+        * Input:
+            * rawEMGPowerSpectrum = power spectra, bins on the last axis (see getPSD)
+            * samplerate = samplerate of the signal
+            * nperseg = length of the segments used for the PSD
+            * cutoffs = optional FR / PSR parameters (llc, ulc, lhc, uhc, n, fmin, fmax)
+        * Output:
+            * dictionary with the same keys as the FrequencyDomain results of analyzeEMG
+            
+        :param rawEMGPowerSpectrum: power spectra of the EMG signal
+        :type rawEMGPowerSpectrum: numpy.ndarray
+        :param samplerate: samplerate of the signal in Hz
+        :type samplerate: float
+        :param nperseg: length of the segments used for the PSD
+        :type nperseg: int
+        :return: frequency domain features
+        :rtype: dict
+    """
+    powerSpectrum = np.asarray(rawEMGPowerSpectrum, dtype=np.float64)
+    bands = getSpectralBands(samplerate, nperseg, **cutoffs)
+    frequencies = bands.frequencies
+    if(powerSpectrum.shape[-1] != len(frequencies)):
+        raise ValueError("expected %d frequency bins for nperseg=%d, got %d" % (len(frequencies), nperseg, powerSpectrum.shape[-1]))
+    cumulativePower = _cumulativePower(powerSpectrum)
+    
+    features = {}
+    features["TTP"] = cumulativePower[..., -1]
+    features["SM1"] = powerSpectrum @ frequencies
+    features["SM2"] = (powerSpectrum * powerSpectrum) @ frequencies
+    features["SM3"] = (powerSpectrum * powerSpectrum * powerSpectrum) @ frequencies
+    features["MNF"] = features["SM1"] / features["TTP"]
+    features["MDF"] = _batchMDF(cumulativePower, frequencies)
+    features["PeakFrequency"] = frequencies[np.argmax(powerSpectrum, axis=-1)]
+    features["MNP"] = features["TTP"] / len(frequencies)
+    features["FR"] = _batchFR(cumulativePower, bands)
+    features["PSR"] = _batchPSR(cumulativePower, powerSpectrum, bands)
+    features["VCF"] = getVCF(features["TTP"], features["SM1"], features["SM2"])
+    
+    names = ["MNF","MDF","PeakFrequency","MNP","TTP","SM1","SM2","SM3","FR","PSR","VCF"]
+    return({name: features[name] for name in names})
+    
 ###############################################################################
 #                                                                             #
 #                           PREPROCESSING                                     #
 #                                                                             #
 ###############################################################################  
 
+class _SlidingMedian:
+    """ Running median of a multiset of values, kept in two heaps.
+    
+        The lower half is a max-heap (stored negated) and the upper half a min-heap.
+        Removed values are deleted lazily, when they reach the top of a heap, so
+        add, remove and median are O(log W) for a window of W values.
+    """
+    
+    def __init__(self):
+        self.low = []
+        self.high = []
+        self.lowSize = 0
+        self.highSize = 0
+        self.delayed = {}
+    
+    def _prune(self, heap, sign):
+        while(heap and self.delayed.get(sign * heap[0], 0)):
+            value = sign * heap[0]
+            self.delayed[value] -= 1
+            if(self.delayed[value] == 0):
+                del self.delayed[value]
+            heapq.heappop(heap)
+    
+    def _balance(self):
+        if(self.lowSize > self.highSize + 1):
+            heapq.heappush(self.high, -heapq.heappop(self.low))
+            self.lowSize -= 1
+            self.highSize += 1
+            self._prune(self.low, -1)
+        elif(self.lowSize < self.highSize):
+            heapq.heappush(self.low, -heapq.heappop(self.high))
+            self.lowSize += 1
+            self.highSize -= 1
+            self._prune(self.high, 1)
+    
+    def add(self, value):
+        if(not self.low or value <= -self.low[0]):
+            heapq.heappush(self.low, -value)
+            self.lowSize += 1
+        else:
+            heapq.heappush(self.high, value)
+            self.highSize += 1
+        self._balance()
+    
+    def remove(self, value):
+        self.delayed[value] = self.delayed.get(value, 0) + 1
+        if(value <= -self.low[0]):
+            self.lowSize -= 1
+            if(value == -self.low[0]):
+                self._prune(self.low, -1)
+        else:
+            self.highSize -= 1
+            if(value == self.high[0]):
+                self._prune(self.high, 1)
+        self._balance()
+    
+    def median(self):
+        if(self.lowSize > self.highSize):
+            return(-self.low[0])
+        return((-self.low[0] + self.high[0]) / 2)
+
+class _PhasicChannel:
+    """ State of the streaming phasic filter for one channel (see PhasicFilter). """
+    
+    def __init__(self, samplerate, seconds=4):
+        self.W = int(seconds * samplerate)
+        self.count = 0
+        self.history = [0.0] * (2 * self.W) #ring buffer with the last 2W samples
+        self.shortMedian = _SlidingMedian() #median of the last W samples
+        self.longMedian = _SlidingMedian() #median of the last 2W samples
+    
+    def process(self, chunk):
+        """ Feed a chunk of samples and get the samples that can be filtered so far.
+        
+            :param chunk: new samples of the EMG signal
+            :type chunk: list
+            :return: phasic filtered samples
+            :rtype: numpy.ndarray
+        """
+        W = self.W
+        history = self.history
+        output = []
+        for x in np.asarray(chunk, dtype=np.float64).tolist():
+            n = self.count
+            if(n >= 2 * W):
+                self.longMedian.remove(history[n % (2 * W)])
+            history[n % (2 * W)] = x
+            self.longMedian.add(x)
+            if(n < 2 * W): #the W long windows are only needed at the beginning
+                if(n >= W):
+                    self.shortMedian.remove(history[(n - W) % (2 * W)])
+                self.shortMedian.add(x)
+            self.count = n + 1
+            
+            i = self.count - W #sample whose window is now complete
+            if(i >= 0):
+                if(i < W):
+                    output.append(history[i % (2 * W)] - self.shortMedian.median())
+                else:
+                    output.append(history[i % (2 * W)] - self.longMedian.median())
+        return(np.array(output))
+    
+    def flush(self):
+        """ Filter the last samples of the recording, using the W samples before each of them.
+        
+            :return: phasic filtered samples
+            :rtype: numpy.ndarray
+        """
+        W = self.W
+        N = self.count
+        output = []
+        tailMedian = _SlidingMedian()
+        for i in range(max(N - W + 1, 0), N):
+            if(i < W): #no complete window on any side
+                output.append(np.nan)
+                continue
+            if(not output or np.isnan(output[-1])):
+                for k in range(i - W, i):
+                    tailMedian.add(self.history[k % (2 * W)])
+            else:
+                tailMedian.remove(self.history[(i - W - 1) % (2 * W)])
+                tailMedian.add(self.history[(i - 1) % (2 * W)])
+            output.append(self.history[i % (2 * W)] - tailMedian.median())
+        return(np.array(output))
+
+class PhasicFilter:
+    """ Streaming version of phasicFilter.
+    
+        Chunks of samples are fed with process(), which returns the filtered samples
+        whose median window is complete. The filter is non causal, so the output lags
+        the input by seconds * samplerate samples; flush() returns the remaining tail
+        once the recording is over. Concatenating all the outputs gives the same
+        signal as phasicFilter over the whole recording. Chunks can be
+        (n_channels, n_samples) arrays; every channel keeps its own state.
+        
+        * Input:
+            * samplerate = samplerate of the signal
+            * seconds = half length of the median window in seconds
+            
+        :param samplerate: samplerate of the signal in Hz
+        :type samplerate: int 
+        :param seconds: half length of the median window in seconds
+        :type seconds: float
+    """
+    
+    def __init__(self, samplerate, seconds=4):
+        self.samplerate = samplerate
+        self.seconds = seconds
+        self.shape = None
+        self.channels = None
+    
+    def _stack(self, outputs):
+        return(np.stack(outputs).reshape(self.shape + (-1,)))
+    
+    def process(self, chunk):
+        """ Feed a chunk of samples and get the samples that can be filtered so far.
+        
+            :param chunk: new samples of the EMG signal, on the last axis
+            :type chunk: numpy.ndarray
+            :return: phasic filtered samples
+            :rtype: numpy.ndarray
+        """
+        x = np.asarray(chunk, dtype=np.float64)
+        if(self.channels is None):
+            self.shape = x.shape[:-1]
+            self.channels = [_PhasicChannel(self.samplerate, self.seconds) for _ in range(int(np.prod(self.shape)))]
+        elif(x.shape[:-1] != self.shape):
+            raise ValueError("chunk shape %s does not match the filter channels %s" % (x.shape, self.shape))
+        rows = x.reshape(len(self.channels), x.shape[-1])
+        return(self._stack([channel.process(row) for channel, row in zip(self.channels, rows)]))
+    
+    def flush(self):
+        """ Filter the last samples of the recording, using the W samples before each of them.
+        
+            :return: phasic filtered samples
+            :rtype: numpy.ndarray
+        """
+        if(self.channels is None):
+            return(np.array([]))
+        return(self._stack([channel.flush() for channel in self.channels]))
+
 def phasicFilter(rawEMGSignal,samplerate, seconds=4):
-    """ Apply a phasic filter to the signal, with +-4 seconds from each sample
+    """ Apply a phasic filter to the signal, with +-seconds from each sample.
+    
+        Each sample is subtracted the median of [i - seconds, i + seconds). Close to the
+        beginning of the signal the window is [i, i + seconds), close to the end it is
+        [i - seconds, i). The medians are updated with a sliding window in O(N log W).
         
         * Input:
-            * rawEMGSignal = emg signal as list
-            * samplerate = samplerate of the signal    
+            * rawEMGSignal = emg signal as list, or (n_channels, n_samples) array
+            * samplerate = samplerate of the signal
+            * seconds = half length of the median window in seconds
         * Output:
-            * phasic filtered signal   
+            * phasic filtered signal, with the shape of the input
         
         :param rawEMGSignal: the raw EMG signal
         :type rawEMGSignal: list
         :param samplerate: samplerate of the signal in Hz
         :type samplerate: int 
+        :param seconds: half length of the median window in seconds
+        :type seconds: float
         :return: the phasic filtered signal
-        :rtype: list
+        :rtype: numpy.ndarray
     """
-    phasicSignal = []    
-    for sample in range(0,len(rawEMGSignal)):
-        smin = sample - 4 * samplerate #min sample index
-        smax = sample + 4 * samplerate #max sample index
-        #is smin is < 0 or smax > signal length, fix it to the closest real sample
-        if(smin < 0): 
-            smin = sample
-        if(smax > len(rawEMGSignal)):
-            smax = sample
-        #substract the mean of the segment
-        newsample = rawEMGSignal[sample] - np.median(rawEMGSignal[smin:smax])
-        #move to th
-        phasicSignal.append(newsample)
+    phasic = PhasicFilter(samplerate, seconds)
+    phasicSignal = np.concatenate([phasic.process(rawEMGSignal), phasic.flush()], axis=-1)
     return(phasicSignal)
     
-def getPSD(rawEMGSignal, samplerate):
-    frequencies, psd = welch(rawEMGSignal, fs=samplerate,
+def getPSD(rawEMGSignal, samplerate, nperseg=256):
+    from scipy.signal import welch
+    frequencies, psd = welch(np.asarray(rawEMGSignal), fs=samplerate,
                window='hann',   # apply a Hanning window before taking the DFT
-               nperseg=256,        # compute periodograms of 256-long segments of x
+               nperseg=min(nperseg, np.shape(rawEMGSignal)[-1]),        # compute periodograms of 256-long segments of x
                detrend='constant',scaling="spectrum") # detrend x by subtracting the mean
     return([psd,frequencies])  
@@ -0,0 +1,139 @@
+import csv
+import logging
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import numpy as np
+
+###############################################################################
+#                                                                             #
+#                              PROFILING                                      #
+#                                                                             #
+###############################################################################
+""" Opt-in instrumentation of analyzeEMG and of the realtime processing.
+    A Profiler records the wall time (and, optionally, the memory allocated) of
+    every stage; stages can be nested, the time spent in the inner stages is
+    removed from the `self_seconds` of the outer one. finish() returns the report
+    of the run and hands it to the sink: a function of the report, e.g. log_sink,
+    a CSVSink or a StageStats that aggregates the runs into percentiles.
+    Without a profiler, the instrumented code only checks for None. """
+
+class Profiler:
+    """ Record the stages of a run.
+
+        :param sink: function called with the report of every run, None to only return it
+        :param memory: also record the bytes allocated by each stage (tracemalloc, slower);
+                       the peak of a stage with inner stages only covers its code after the last of them
+        :type memory: bool
+    """
+
+    def __init__(self, sink=None, memory=False):
+        self.sink = sink
+        self.memory = memory
+        self.last_report = None
+        self._records = []
+        self._stack = []
+
+    @contextmanager
+    def stage(self, name):
+        """ Context manager recording the stage `name` """
+        if(self.memory and not tracemalloc.is_tracing()):
+            tracemalloc.start()
+        if(self.memory):
+            tracemalloc.reset_peak()
+            startMemory = tracemalloc.get_traced_memory()[0]
+        frame = [0.0]  #time of the inner stages
+        self._stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            self._stack.pop()
+            if(self._stack):
+                self._stack[-1][0] += seconds
+            record = {"stage": name, "seconds": seconds, "self_seconds": seconds - frame[0]}
+            if(self.memory):
+                current, peak = tracemalloc.get_traced_memory()
+                record["bytes"] = current - startMemory
+                record["peak_bytes"] = peak - startMemory
+            self._records.append(record)
+
+    def finish(self, **context):
+        """ End the run: return its report and send it to the sink.
+
+            :param context: values added to the report (e.g. file, channels)
+            :return: the context and the list of stages, in the order they finished
+            :rtype: dict
+        """
+        report = dict(context, stages=self._records)
+        self._records = []
+        self.last_report = report
+        if(self.sink is not None):
+            self.sink(report)
+        return(report)
+
+def log_sink(logger=None, level=logging.INFO):
+    """ Sink writing one line per stage to a logger """
+    logger = logger or logging.getLogger("emg.profiling")
+    def sink(report):
+        context = ", ".join("%s=%s" % (key, value) for key, value in report.items() if key != "stages")
+        for record in report["stages"]:
+            logger.log(level, "%s %s: %.3f ms (self %.3f ms)", context, record["stage"],
+                       record["seconds"] * 1000, record["self_seconds"] * 1000)
+    return(sink)
+
+class CSVSink:
+    """ Sink appending one row per stage to a csv file, with the context of the run in the first columns """
+
+    def __init__(self, path):
+        self.path = path
+
+    def __call__(self, report):
+        context = {key: value for key, value in report.items() if key != "stages"}
+        rows = [dict(context, **record) for record in report["stages"]]
+        if(not rows):
+            return
+        exists = os.path.exists(self.path) and os.path.getsize(self.path) > 0
+        with open(self.path, "a", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()), extrasaction="ignore")
+            if(not exists):
+                writer.writeheader()
+            writer.writerows(rows)
+
+class StageStats:
+    """ Sink aggregating the reports of many runs, stage by stage. """
+
+    def __init__(self):
+        self.values = {}
+
+    def __call__(self, report):
+        self.add(report)
+
+    def add(self, report):
+        for record in report["stages"]:
+            self.values.setdefault(record["stage"], []).append(record["self_seconds"])
+
+    def summary(self, percentiles=(50, 90, 99)):
+        """ Count, total and percentiles of the self time (s) of every stage, slowest total first
+
+            :rtype: dict
+        """
+        summary = {}
+        for stage, values in self.values.items():
+            row = {"count": len(values), "total": float(np.sum(values))}
+            for p, value in zip(percentiles, np.percentile(values, percentiles)):
+                row["p%g" % p] = float(value)
+            summary[stage] = row
+        return(dict(sorted(summary.items(), key=lambda item: -item[1]["total"])))
+
+    def format(self, percentiles=(50, 90, 99)):
+        """ The summary as a text table, times in ms """
+        names = ["p%g" % p for p in percentiles]
+        lines = ["%-24s %7s %10s " % ("stage", "count", "total") + " ".join("%9s" % name for name in names)]
+        for stage, row in self.summary(percentiles).items():
+            lines.append("%-24s %7d %10.1f " % (stage, row["count"], row["total"] * 1000)
+                         + " ".join("%9.3f" % (row[name] * 1000) for name in names))
+        return("\n".join(lines))
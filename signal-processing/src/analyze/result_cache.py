@@ -0,0 +1,154 @@
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import tempfile
+
+import numpy as np
+
+from .emg_processing import analyzeEMG
+
+"""
+    On-disk cache of the analyzeEMG results. An entry is keyed by a hash of the signal samples,
+    the analysis parameters and ANALYSIS_VERSION, so the same samples analyzed with the same
+    parameters are computed once, whatever the file or notebook cell they come from.
+    ANALYSIS_VERSION is a hash of the sources of the modules used by analyzeEMG: any change to
+    them, even one that does not change the results, starts a new set of entries.
+    The cache is bounded in size: the least recently used entries are evicted first.
+"""
+
+# modules imported by analyzeEMG, whose code computes the cached results
+ANALYSIS_MODULES = ('emg_processing', 'feature_graph', 'time_descriptors', 'freq_descriptors', 'filters', 'bursts',
+                    'rolling_descriptors')
+
+
+def _analysis_version():
+    """ Short hex digest of the sources of ANALYSIS_MODULES """
+    digest = hashlib.sha256()
+    folder = os.path.dirname(os.path.abspath(__file__))
+    for name in ANALYSIS_MODULES:
+        with open(os.path.join(folder, name + '.py'), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+ANALYSIS_VERSION = _analysis_version()
+
+_SUFFIX = '.pkl'
+_ANALYZE_DEFAULTS = {name: parameter.default for name, parameter in inspect.signature(analyzeEMG).parameters.items()
+                     if parameter.default is not inspect.Parameter.empty}
+
+
+def cache_key(rawEMGSignal, **parameters):
+    """ Hex digest of the signal samples (as float64), their shape, the parameters and ANALYSIS_VERSION """
+    signal = np.ascontiguousarray(rawEMGSignal, dtype=np.float64)
+    digest = hashlib.sha256()
+    digest.update(ANALYSIS_VERSION.encode())
+    digest.update(json.dumps(signal.shape).encode())
+    digest.update(json.dumps(parameters, sort_keys=True, default=repr).encode())
+    digest.update(signal.tobytes())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """ Size-bounded LRU cache of analysis results, one pickle file per entry
+
+        The access time of an entry is its modification time, so several processes
+        (e.g. the workers of batch_analysis) can share the same folder.
+
+        :param directory: folder of the cache
+        :type directory: str
+        :param max_bytes: size of the cache above which the least recently used entries are evicted
+        :type max_bytes: int
+    """
+
+    def __init__(self, directory, max_bytes=256 * 2**20):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + _SUFFIX)
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(_SUFFIX):
+                try:
+                    stat = os.stat(os.path.join(self.directory, name))
+                except FileNotFoundError:  # evicted by another process
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, name))
+        return entries
+
+    def get(self, key):
+        """ Cached value of key, None on a miss """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+            os.utime(path)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """ Store value under key, then evict the least recently used entries above max_bytes """
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self._path(key))
+        self._evict()
+
+    def _evict(self):
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+                self.evictions += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        for _, _, name in self._entries():
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+
+    def stats(self):
+        """ Hits, misses and evictions of this instance, entries and bytes of the folder """
+        entries = self._entries()
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'entries': len(entries), 'bytes': sum(size for _, size, _ in entries)}
+
+    def analyzeEMG(self, rawEMGSignal, samplerate, **kwargs):
+        """ analyzeEMG, read from the cache when the same samples were analyzed with the same parameters
+
+            Takes the same arguments as analyzeEMG; the defaults are part of the key, so
+            analyzeEMG(x, fs) and analyzeEMG(x, fs, lowpass=50) share the same entry.
+            The profiler is not part of the key; it only records the calls that are computed.
+        """
+        unknown = set(kwargs).difference(_ANALYZE_DEFAULTS)
+        if unknown:
+            raise TypeError('unknown analyzeEMG arguments: %s' % ', '.join(sorted(unknown)))
+        parameters = dict(_ANALYZE_DEFAULTS, **kwargs)
+        parameters.pop('profiler')
+        if parameters['features'] is not None:
+            parameters['features'] = sorted(parameters['features'])
+        key = cache_key(rawEMGSignal, samplerate=samplerate, **parameters)
+        result = self.get(key)
+        if result is None:
+            result = analyzeEMG(rawEMGSignal, samplerate, **kwargs)
+            self.put(key, result)
+        return result
@@ -0,0 +1,207 @@
+import numpy as np #to handle datas
+
+###############################################################################
+#                                                                             #
+#                      ROLLING TIME DOMAIN FEATURES                           #
+#                                                                             #
+###############################################################################
+""" Time domain features over sliding windows of a whole recording.
+    Each feature is turned into a per-sample quantity (|x|, x**2, |x[i+1] - x[i]|,
+    threshold indicators) whose cumulative sum gives the value of every window
+    with one subtraction, so the cost is O(N) whatever the window length. """
+
+ROLLING_FEATURES = ["MAV","RMS","WL","AAC","ZC","SSC","WAMP","MYOP"]
+_MIN_WINDOW = {"WL": 2, "AAC": 2, "WAMP": 2, "SSC": 3} #samples for one difference, or one triplet for SSC
+
+def _windowSums(values, starts, length):
+    """ Sum of values[s:s+length] for every start s, along the last axis.
+        Boolean values are counted with an integer cumulative sum, so counts are exact. """
+    dtype = np.int64 if values.dtype == bool else np.float64
+    cumulative = np.zeros(values.shape[:-1] + (values.shape[-1] + 1,), dtype=dtype)
+    np.cumsum(values, axis=-1, dtype=dtype, out=cumulative[..., 1:])
+    return(cumulative[..., starts + length] - cumulative[..., starts])
+
+def _rollingZC(signal, starts, windowLength, threshold):
+    """ ZC of every window, with the same state machine as getZC.
+
+        The state of a window starts as positive only if its first sample is above the
+        threshold; after that, only the samples outside the dead band change the state.
+        The crossings inside a window are the changes between consecutive samples outside
+        the dead band, plus one if the first of them disagrees with the initial state.
+    """
+    N = signal.shape[-1]
+    if(len(starts) == 0):
+        return(np.zeros(signal.shape[:-1] + (0,), dtype=np.int64))
+    index = np.arange(N)
+    state = np.where(signal > threshold, 1, np.where(signal < -threshold, -1, 0)).astype(np.int8)
+    isSet = state != 0
+
+    #state of the previous sample outside the dead band, to flag the changes
+    lastSet = np.maximum.accumulate(np.where(isSet, index, -1), axis=-1)
+    previousSet = np.concatenate([np.full(lastSet.shape[:-1] + (1,), -1), lastSet[..., :-1]], axis=-1)
+    previousState = np.take_along_axis(state, np.maximum(previousSet, 0), axis=-1)
+    change = isSet & (previousSet >= 0) & (previousState != state)
+
+    #first sample outside the dead band after the first sample of each window
+    nextSet = np.minimum.accumulate(np.where(isSet, index, N)[..., ::-1], axis=-1)[..., ::-1]
+    nextSet = np.concatenate([nextSet, np.full(nextSet.shape[:-1] + (1,), N)], axis=-1)
+    first = nextSet[..., starts + 1]
+
+    ends = starts + windowLength
+    inWindow = first < ends
+    firstClipped = np.minimum(first, N - 1)
+    initialState = np.where(signal[..., starts] > threshold, 1, -1)
+    firstChange = initialState != np.take_along_axis(state, firstClipped, axis=-1)
+
+    cumulative = np.zeros(change.shape[:-1] + (N + 1,), dtype=np.int64)
+    np.cumsum(change, axis=-1, out=cumulative[..., 1:])
+    innerChanges = cumulative[..., ends] - np.take_along_axis(cumulative, np.minimum(firstClipped + 1, N), axis=-1)
+    ZC = np.where(inWindow, innerChanges + firstChange, 0)
+    return(ZC)
+
+def getRollingFeatures(rawEMGSignal, windowLength, hop=1, threshold=0.01, features=None):
+    """ Compute time domain features over sliding windows, in O(N) for the whole signal.
+
+        Windows start at 0, hop, 2*hop, ... and only complete windows are returned. Each
+        value is the same as the scalar feature (getMAV, getRMS, getWL, getAAC, getZC,
+        getSSC, getWAMP, getMYOP) applied to the window. Sums of floats are read from a
+        cumulative sum, so for very long recordings they can differ from the scalar
+        functions in the last digits.
+
+        * Input:
+            * rawEMGSignal = EMG signal(s), samples on the last axis
+            * windowLength = number of samples in each window (at least 2 for WL, AAC and WAMP, 3 for SSC)
+            * hop = number of samples between the start of two windows
+            * threshold for the evaluation of ZC,MYOP,WAMP,SSC
+            * features = names of the features to compute, None for all of them
+        * Output:
+            * dictionary feature name --> array with one value per window on the last axis
+
+        :param rawEMGSignal: the raw EMG signal
+        :type rawEMGSignal: list
+        :param windowLength: number of samples in each window
+        :type windowLength: int
+        :param hop: number of samples between two windows
+        :type hop: int
+        :param threshold: value to sum / substract to the zero when evaluating the crossing.
+        :type threshold: float
+        :param features: names of the features to compute
+        :type features: list
+        :return: features of every window
+        :rtype: dict
+    """
+    if(features is None):
+        features = ROLLING_FEATURES
+    unknown = set(features).difference(ROLLING_FEATURES)
+    if(unknown):
+        raise ValueError("unknown rolling features: %s" % ", ".join(sorted(unknown)))
+
+    signal = np.asarray(rawEMGSignal, dtype=np.float64)
+    N = signal.shape[-1]
+    W = int(windowLength)
+    if(W < 1 or hop < 1):
+        raise ValueError("windowLength and hop must be positive")
+    tooShort = [name for name in features if W < _MIN_WINDOW.get(name, 1)]
+    if(tooShort):
+        raise ValueError("windowLength %d is too short for %s (WL, AAC and WAMP need 2 samples, SSC needs 3)" % (W, ", ".join(tooShort)))
+    starts = np.arange(0, max(N - W + 1, 0), hop)
+
+    results = {}
+    if("MAV" in features):
+        results["MAV"] = _windowSums(np.abs(signal), starts, W) / W
+    if("RMS" in features):
+        results["RMS"] = np.sqrt(np.maximum(_windowSums(signal * signal, starts, W), 0) / W)
+    if(set(features) & {"WL","AAC","WAMP"}):
+        diffSignal = np.diff(signal, axis=-1)
+        if(set(features) & {"WL","AAC"}):
+            WL = _windowSums(np.abs(diffSignal), starts, W - 1)
+            if("WL" in features):
+                results["WL"] = WL
+            if("AAC" in features):
+                results["AAC"] = WL / W
+        if("WAMP" in features):
+            results["WAMP"] = _windowSums(-diffSignal >= threshold, starts, W - 1)
+    if("ZC" in features):
+        results["ZC"] = _rollingZC(signal, starts, W, threshold)
+    if("SSC" in features):
+        slopeSign = np.sign(np.diff(signal, axis=-1))
+        isSSC = ((signal[..., :-2] + signal[..., 1:-1] + signal[..., 2:]) >= threshold * 3) & ((slopeSign[..., :-1] * slopeSign[..., 1:]) < 0)
+        results["SSC"] = _windowSums(isSSC, starts, max(W - 2, 0))
+    if("MYOP" in features):
+        results["MYOP"] = _windowSums(np.abs(signal) >= threshold, starts, W) / W
+    return({name: results[name] for name in ROLLING_FEATURES if name in results})
+
+###############################################################################
+#                                                                             #
+#                      STREAMING TIME DOMAIN FEATURES                         #
+#                                                                             #
+###############################################################################
+
+class IncrementalMAV:
+    """ MAV over a sliding window of a stream, updated with the new samples only.
+
+        A running sum of |x| gains the new samples and loses the ones that leave the
+        window, so each chunk costs O(new samples) whatever the window length. The
+        windows and their values are the same as getRollingFeatures(signal, windowLength,
+        hop)["MAV"] on the concatenated stream; the running sum is recomputed from the
+        window every windowLength samples, so rounding errors do not accumulate.
+        The samples are on the last axis; leading axes (e.g. channels) are kept.
+
+        :param windowLength: number of samples in each window
+        :type windowLength: int
+        :param hop: number of samples between the start of two windows
+        :type hop: int
+    """
+
+    def __init__(self, windowLength, hop=1):
+        if(windowLength < 1 or hop < 1):
+            raise ValueError("windowLength and hop must be positive")
+        self.windowLength = int(windowLength)
+        self.hop = int(hop)
+        self.reset()
+
+    def reset(self):
+        """ Forget the stream, as if no sample had been seen yet. """
+        self.window = None #last windowLength |x|, circular, sample t at t % windowLength
+        self.total = None
+        self.count = 0
+        self.sinceResync = 0
+
+    def process(self, chunk):
+        """ Add new samples and return the MAV of the windows completed by them.
+
+            :param chunk: new samples, on the last axis
+            :type chunk: numpy.ndarray
+            :return: one MAV per completed window (per hop), on the last axis
+            :rtype: numpy.ndarray
+        """
+        rectified = np.abs(np.asarray(chunk, dtype=np.float64))
+        W = self.windowLength
+        n = rectified.shape[-1]
+        if(self.window is None):
+            self.window = np.zeros(rectified.shape[:-1] + (W,))
+            self.total = np.zeros(rectified.shape[:-1])
+        elif(self.window.shape[:-1] != rectified.shape[:-1]):
+            raise ValueError("chunk shape %s does not match the stream channels %s" % (rectified.shape, self.window.shape[:-1]))
+
+        #|x| of the samples leaving the window, t - W for every new sample t (zeros before the stream)
+        positions = np.arange(self.count, self.count + n)
+        fromWindow = positions[:W] % W
+        leaving = np.concatenate([self.window[..., fromWindow], rectified[..., :max(n - W, 0)]], axis=-1)
+        sums = self.total[..., None] + np.cumsum(rectified - leaving, axis=-1)
+
+        #completed windows end at positions + 1, and start every hop samples from 0
+        starts = positions + 1 - W
+        emitted = (starts >= 0) & (starts % self.hop == 0)
+        values = sums[..., emitted] / W
+
+        tail = min(n, W)
+        self.window[..., positions[-tail:] % W] = rectified[..., -tail:]
+        self.count += n
+        self.sinceResync += n
+        if(self.sinceResync >= W):
+            self.total = self.window.sum(axis=-1)
+            self.sinceResync = 0
+        elif(n):
+            self.total = sums[..., -1]
+        return(values)
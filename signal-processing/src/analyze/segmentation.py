@@ -0,0 +1,97 @@
+import numpy as np #to handle datas
+import collections
+
+from .bursts import _runs
+from .rolling_descriptors import getRollingFeatures
+
+###############################################################################
+#                                                                             #
+#                      STEADY CONTRACTION SEGMENTATION                        #
+#                                                                             #
+###############################################################################
+""" Plateau of a sustained contraction, found on a rolling MAV or RMS envelope.
+    The contraction level of the trial (the level held at its MVC percentage) is a
+    high percentile of the envelope of each channel, or is given by the caller (e.g.
+    from the MVC trial of the subject). Windows whose envelope stays within
+    tolerance * level of it are stable; excursions shorter than maxGap are bridged, and
+    the longest stable run is the steady segment. The ramps at the start and at the
+    end of the trial, and the rest before or after it, fall outside the band. """
+
+SteadySegments = collections.namedtuple("SteadySegments", ["start", "stop", "level", "found"])
+
+def getSteadySegments(rawEMGSignal, samplerate, envelope="RMS", windowSeconds=0.25, hopSeconds=0.05,
+                      tolerance=0.2, levelPercentile=75, minSeconds=1.0, maxGapSeconds=0.25, level=None):
+    """ Steady contraction segment of every channel of a recording.
+
+        * Input:
+            * rawEMGSignal = filtered EMG signal(s) (no DC offset), samples on the last axis
+            * samplerate = samplerate of the signal
+            * envelope = "RMS" or "MAV", rolling feature used as the envelope
+            * windowSeconds, hopSeconds = window and hop of the envelope in seconds
+            * tolerance = largest relative distance |envelope - level| / level of a stable window
+            * levelPercentile = percentile of the envelope taken as the contraction level
+            * minSeconds = shorter plateaus are not reported
+            * maxGapSeconds = unstable excursions shorter than this do not split a plateau
+            * level = contraction level (in the units of the envelope) of every channel, instead of the percentile
+        * Output:
+            * SteadySegments with the leading shape of the input: start and stop sample of the
+              longest stable run (stop excluded), contraction level, and found (False when no
+              run lasts minSeconds, or when the level is not positive, e.g. a flat channel;
+              start and stop are then 0)
+
+        :param rawEMGSignal: the EMG signal
+        :type rawEMGSignal: numpy.ndarray
+        :param samplerate: samplerate of the signal in Hz
+        :type samplerate: int
+        :param envelope: "RMS" or "MAV"
+        :type envelope: str
+        :param tolerance: relative half width of the stability band
+        :type tolerance: float
+        :param minSeconds: minimum duration of a plateau in seconds
+        :type minSeconds: float
+        :return: the steady segments
+        :rtype: SteadySegments
+    """
+    if(envelope not in ("RMS", "MAV")):
+        raise ValueError("envelope must be 'RMS' or 'MAV'")
+    signal = np.asarray(rawEMGSignal, dtype=np.float64)
+    shape = signal.shape[:-1]
+    W = max(int(round(windowSeconds * samplerate)), 1)
+    hop = max(int(round(hopSeconds * samplerate)), 1)
+    values = getRollingFeatures(signal, W, hop, features=[envelope])[envelope]
+    values = values.reshape(int(np.prod(shape)), values.shape[-1])
+    if(level is None):
+        level = np.percentile(values, levelPercentile, axis=-1) if values.shape[-1] else np.zeros(len(values))
+    else:
+        level = np.broadcast_to(np.asarray(level, dtype=np.float64), shape).ravel()
+
+    #a flat channel (e.g. a loose electrode) has level 0: no window of it is stable
+    active = (np.isfinite(level) & (level > 0))[:, None]
+    stable = active & (np.abs(values - level[:, None]) <= tolerance * level[:, None])
+    channel, first, last = _runs(stable, maxGapSeconds * samplerate / hop)
+    starts, stops = first * hop, (last - 1) * hop + W #samples covered by the stable windows
+
+    #longest run of every channel: sort by channel, then by decreasing length
+    longest = np.lexsort((starts - stops, channel))
+    isFirst = np.ones(len(longest), dtype=bool)
+    isFirst[1:] = channel[longest[1:]] != channel[longest[:-1]]
+    longest = longest[isFirst]
+    keep = longest[(stops[longest] - starts[longest]) >= minSeconds * samplerate]
+
+    start = np.zeros(len(values), dtype=np.int64)
+    stop = np.zeros(len(values), dtype=np.int64)
+    found = np.zeros(len(values), dtype=bool)
+    start[channel[keep]] = starts[keep]
+    stop[channel[keep]] = stops[keep]
+    found[channel[keep]] = True
+    return(SteadySegments(start.reshape(shape)[()], stop.reshape(shape)[()], level.reshape(shape)[()], found.reshape(shape)[()]))
+
+def centeredWindow(start, stop, length):
+    """ Window of at most `length` samples centered in [start, stop).
+
+        :return: first sample and sample after the window
+        :rtype: tuple
+    """
+    length = min(length, stop - start)
+    first = start + (stop - start - length) // 2
+    return(first, first + length)
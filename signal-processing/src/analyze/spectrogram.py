@@ -0,0 +1,145 @@
+import numpy as np #to handle datas
+from functools import lru_cache
+
+###############################################################################
+#                                                                             #
+#                      SHORT-TIME POWER SPECTRAL DENSITY                      #
+#                                                                             #
+###############################################################################
+""" Welch PSD of many overlapping windows of a recording at once. The periodogram
+    of every segment (nperseg samples, every nperseg - noverlap samples) is computed
+    once, with a batched rfft over a strided view of the signal; the PSD of a window
+    is the mean of the periodograms of the segments inside it, read from a cumulative
+    sum over the segments. Each window gives the same PSD as getPSD / scipy welch on
+    the samples of the window, and the output (..., n_windows, n_frequencies) can be
+    passed to the frequency descriptors (getMDF, getMNF, getFrequencyFeatures, ...). """
+
+_BLOCK_SEGMENTS = 4096
+
+@lru_cache(maxsize=32)
+def _window(name, nperseg):
+    from scipy.signal import get_window #imported on first use, see filters.py
+    window = get_window(name, nperseg)
+    window.setflags(write=False)
+    return(window)
+
+def getSegmentSpectra(rawEMGSignal, samplerate, nperseg=256, noverlap=None, window="hann", scaling="density", detrend="constant"):
+    """ Periodogram of every segment of a signal, as computed inside scipy welch.
+
+        * Input:
+            * rawEMGSignal = EMG signal(s), samples on the last axis
+            * samplerate = samplerate of the signal
+            * nperseg = samples per segment
+            * noverlap = samples shared by two consecutive segments (nperseg // 2 by default)
+            * window, scaling ("density" or "spectrum") and detrend ("constant" or False) as for welch
+        * Output:
+            * periodograms (..., n_segments, n_frequencies), frequencies and start sample of each segment
+
+        :param rawEMGSignal: the EMG signal
+        :type rawEMGSignal: list
+        :param samplerate: samplerate of the signal in Hz
+        :type samplerate: int
+        :param nperseg: samples per segment
+        :type nperseg: int
+        :param noverlap: overlap of the segments in samples
+        :type noverlap: int
+        :return: periodograms, frequencies, segment starts
+        :rtype: tuple
+    """
+    signal = np.asarray(rawEMGSignal, dtype=np.float64)
+    if(noverlap is None):
+        noverlap = nperseg // 2
+    step = nperseg - noverlap
+    if(step < 1 or nperseg > signal.shape[-1]):
+        raise ValueError("need noverlap < nperseg <= number of samples")
+    win = _window(window, nperseg)
+    if(scaling == "density"):
+        scale = 1.0 / (samplerate * (win * win).sum())
+    elif(scaling == "spectrum"):
+        scale = 1.0 / win.sum() ** 2
+    else:
+        raise ValueError("scaling must be 'density' or 'spectrum'")
+
+    starts = np.arange(0, signal.shape[-1] - nperseg + 1, step)
+    segments = np.lib.stride_tricks.sliding_window_view(signal, nperseg, axis=-1)[..., ::step, :]
+    frequencies = np.fft.rfftfreq(nperseg, 1.0 / samplerate)
+    spectra = np.empty(segments.shape[:-1] + (len(frequencies),))
+    for first in range(0, len(starts), _BLOCK_SEGMENTS):
+        block = segments[..., first:first + _BLOCK_SEGMENTS, :]
+        if(detrend == "constant"):
+            block = block - block.mean(axis=-1, keepdims=True)
+        elif(detrend is not False):
+            raise ValueError("detrend must be 'constant' or False")
+        spectrum = np.fft.rfft(block * win, axis=-1)
+        spectra[..., first:first + _BLOCK_SEGMENTS, :] = spectrum.real ** 2 + spectrum.imag ** 2
+    spectra *= scale
+    #one-sided: the power of the negative frequencies is added, except for DC and Nyquist
+    if(nperseg % 2):
+        spectra[..., 1:] *= 2
+    else:
+        spectra[..., 1:-1] *= 2
+    return(spectra, frequencies, starts)
+
+def getWelchWindows(segmentSpectra, segmentsPerWindow, segmentHop=1):
+    """ Mean of the periodograms of consecutive segments, for windows of segments.
+
+        Window j averages the segments j*segmentHop ... j*segmentHop + segmentsPerWindow - 1,
+        with one subtraction of cumulative sums per window.
+
+        :param segmentSpectra: periodograms (..., n_segments, n_frequencies) of getSegmentSpectra
+        :type segmentSpectra: numpy.ndarray
+        :param segmentsPerWindow: segments in each window
+        :type segmentsPerWindow: int
+        :param segmentHop: segments between the first segments of two windows
+        :type segmentHop: int
+        :return: PSD (..., n_windows, n_frequencies)
+        :rtype: numpy.ndarray
+    """
+    n = segmentSpectra.shape[-2]
+    firsts = np.arange(0, n - segmentsPerWindow + 1, segmentHop)
+    cumulative = np.zeros(segmentSpectra.shape[:-2] + (n + 1, segmentSpectra.shape[-1]))
+    np.cumsum(segmentSpectra, axis=-2, out=cumulative[..., 1:, :])
+    return((cumulative[..., firsts + segmentsPerWindow, :] - cumulative[..., firsts, :]) / segmentsPerWindow)
+
+def getSpectrogram(rawEMGSignal, samplerate, windowLength, hop, nperseg=256, noverlap=None, window="hann", scaling="density", detrend="constant"):
+    """ Welch PSD of sliding windows of a recording, sharing the segment periodograms.
+
+        The PSD of the window starting at sample s is the one getPSD / welch would give for
+        rawEMGSignal[..., s:s+windowLength] with the same nperseg and noverlap. hop must be
+        a multiple of the segment step (nperseg - noverlap), so that the windows reuse the
+        same segments; samples after the last full segment of a window are ignored, as welch does.
+        Windows start at 0, hop, 2*hop, ... and only complete windows are returned.
+
+        * Input:
+            * rawEMGSignal = EMG signal(s), samples on the last axis
+            * samplerate = samplerate of the signal
+            * windowLength = samples in each window
+            * hop = samples between the start of two windows
+            * nperseg, noverlap, window, scaling, detrend as for welch
+        * Output:
+            * PSD (..., n_windows, n_frequencies), frequencies, time of the center of each window (s)
+
+        :param rawEMGSignal: the EMG signal
+        :type rawEMGSignal: list
+        :param samplerate: samplerate of the signal in Hz
+        :type samplerate: int
+        :param windowLength: samples in each window
+        :type windowLength: int
+        :param hop: samples between two windows
+        :type hop: int
+        :return: PSD, frequencies, times
+        :rtype: tuple
+    """
+    if(noverlap is None):
+        noverlap = nperseg // 2
+    step = nperseg - noverlap
+    if(hop % step):
+        raise ValueError("hop (%d) must be a multiple of nperseg - noverlap (%d)" % (hop, step))
+    if(windowLength < nperseg):
+        raise ValueError("windowLength must be at least nperseg")
+    spectra, frequencies, starts = getSegmentSpectra(rawEMGSignal, samplerate, nperseg, noverlap, window, scaling, detrend)
+    segmentsPerWindow = (windowLength - nperseg) // step + 1
+    windows = max((np.shape(rawEMGSignal)[-1] - windowLength) // hop + 1, 0) #complete windows only
+    psd = getWelchWindows(spectra, segmentsPerWindow, hop // step)[..., :windows, :]
+    times = (np.arange(psd.shape[-2]) * hop + windowLength / 2) / samplerate
+    return(psd, frequencies, times)
@@ -1,16 +1,15 @@
-import peakutils #peak detection
 import numpy as np #to handle datas
-import math #to handle mathematical stuff (example power of 2)
-import scipy
-from scipy.signal import butter, lfilter, welch, square  #for signal filtering
-import matplotlib.pyplot as plt
+
+from .bursts import getBursts
+from .rolling_descriptors import getRollingFeatures
 
 ###############################################################################
 #                                                                             #
 #                       TIME DOMAIN FEATURES                                  #
 #                                                                             #
 ###############################################################################
-""" Features have been taken from: Phinyomark, A., Phukpattaranont, P., & Limsakul, C. (2012). """
+""" Features have been taken from: Phinyomark, A., Phukpattaranont, P., & Limsakul, C. (2012). 
+    Every feature is evaluated on the last axis, so a (n_channels, n_samples) array gives one value per channel. """
 # https://www-sciencedirect-com.proxy.lib.uwaterloo.ca/science/article/pii/S0957417412001200?via%3Dihub
 
 def getIEMG(rawEMGSignal):
@@ -29,7 +28,7 @@ def getIEMG(rawEMGSignal):
         :rtype: float
     """
     
-    IEMG = np.sum([abs(x) for x in rawEMGSignal])    
+    IEMG = np.sum(np.abs(rawEMGSignal), axis=-1)
     return(IEMG)
     
 def getMAV(rawEMGSignal):
@@ -48,7 +47,7 @@ def getMAV(rawEMGSignal):
         :rtype: float
     """
     
-    MAV = 1/len(rawEMGSignal) *  np.sum([abs(x) for x in rawEMGSignal])    
+    MAV = 1/np.shape(rawEMGSignal)[-1] *  np.sum(np.abs(rawEMGSignal), axis=-1)
     return(MAV)
     
 def getMAV1(rawEMGSignal):
@@ -70,11 +69,9 @@ def getMAV1(rawEMGSignal):
         :return: the MAV (modified version n. 1)  of the EMG Signal
         :rtype: float
     """
-    wIndexMin = int(0.25 * len(rawEMGSignal))
-    wIndexMax = int(0.75 * len(rawEMGSignal))
-    absoluteSignal = [abs(x) for x in rawEMGSignal]
-    IEMG = 0.5 * np.sum([x for x in absoluteSignal[0:wIndexMin]]) + np.sum([x for x in absoluteSignal[wIndexMin:wIndexMax]]) + 0.5 * np.sum([x for x in absoluteSignal[wIndexMax:]])
-    MAV1 = IEMG / len(rawEMGSignal)
+    N = np.shape(rawEMGSignal)[-1]
+    IEMG = np.abs(rawEMGSignal) @ _mavWeights(N, 1) #0.5 outside [0.25N, 0.75N)
+    MAV1 = IEMG / N
     return(MAV1)
     
 def getMAV2(rawEMGSignal):
@@ -98,22 +95,8 @@ def getMAV2(rawEMGSignal):
         :rtype: float
     """
     
-    N = len(rawEMGSignal)
-    wIndexMin = int(0.25 * N) #get the index at 0.25N
-    wIndexMax = int(0.75 * N)#get the index at 0.75N
-
-    temp = [] #create an empty list
-    for i in range(0,wIndexMin): #case 1: i < 0.25N
-        x = abs(rawEMGSignal[i] * (4*i/N))
-        temp.append(x)
-    for i in range(wIndexMin,wIndexMax+1): #case2: 0.25 <= i <= 0.75N
-        x = abs(rawEMGSignal[i])
-        temp.append(x)
-    for i in range(wIndexMax+1,N): #case3; i > 0.75N
-        x = abs(rawEMGSignal[i]) * (4*(i - N) / N)
-        temp.append(x)
-        
-    MAV2 = np.sum(temp) / N
+    N = np.shape(rawEMGSignal)[-1]
+    MAV2 = (np.abs(rawEMGSignal) @ _mavWeights(N, 2)) / N #weights of the three cases
     return(MAV2)
 
 def getSSI(rawEMGSignal):
@@ -132,7 +115,7 @@ def getSSI(rawEMGSignal):
         :rtype: float
     """
     
-    SSI = np.sum([x**2 for x in rawEMGSignal])
+    SSI = np.sum(np.square(rawEMGSignal), axis=-1)
     return(SSI)    
     
 def getVAR(rawEMGSignal):
@@ -151,8 +134,8 @@ def getVAR(rawEMGSignal):
         :rtype: float
     """
     
-    SSI = np.sum([x**2 for x in rawEMGSignal])
-    N = len(rawEMGSignal)
+    SSI = np.sum(np.square(rawEMGSignal), axis=-1)
+    N = np.shape(rawEMGSignal)[-1]
     VAR = SSI* (1 / (N - 1))
     return(VAR)    
     
@@ -174,8 +157,8 @@ def getTM(rawEMGSignal, order):
         :return: Temporal Moment of order X of the EMG signal
         :rtype: float
     """
-    N = len(rawEMGSignal)
-    TM = abs((1/N) * np.sum([x**order for x in rawEMGSignal]))
+    N = np.shape(rawEMGSignal)[-1]
+    TM = np.abs((1/N) * np.sum(np.power(rawEMGSignal, order), axis=-1))
     
     return(TM)    
     
@@ -196,8 +179,8 @@ def getRMS(rawEMGSignal):
         
         
     """
-    N = len(rawEMGSignal)
-    RMS = np.sqrt((1/N) * np.sum([x**2 for x in rawEMGSignal]))
+    N = np.shape(rawEMGSignal)[-1]
+    RMS = np.sqrt((1/N) * np.sum(np.square(rawEMGSignal), axis=-1))
     
     return(RMS)   
 def getLOG(rawEMGSignal):
@@ -214,7 +197,7 @@ def getLOG(rawEMGSignal):
         :return: LOG feature of the EMG Signal
         :rtype: float
     """
-    LOG = math.exp( (1/len(rawEMGSignal)) * sum([abs(x) for x in rawEMGSignal]))    
+    LOG = np.exp( (1/np.shape(rawEMGSignal)[-1]) * np.sum(np.abs(rawEMGSignal), axis=-1))
     
     return(LOG)
 
@@ -233,11 +216,7 @@ def getWL(rawEMGSignal):
         :return: Waveform length of the signal
         :rtype: float
     """
-    N = len(rawEMGSignal)
-    temp = []    
-    for i in range(0,N-1):
-        temp.append(abs(rawEMGSignal[i+1] - rawEMGSignal[i]))
-    WL = sum(temp)
+    WL = np.sum(np.abs(np.diff(rawEMGSignal, axis=-1)), axis=-1)
     return(WL)   
     
 def getAAC(rawEMGSignal):
@@ -255,7 +234,7 @@ def getAAC(rawEMGSignal):
         :return: Average Amplitude Change of the signal
         :rtype: float
     """
-    N = len(rawEMGSignal)
+    N = np.shape(rawEMGSignal)[-1]
     WL = getWL(rawEMGSignal)
     AAC = 1/N * WL
     return(AAC)
@@ -277,11 +256,8 @@ def getDASDV(rawEMGSignal):
         :rtype: float
     """
     
-    N = len(rawEMGSignal)
-    temp = []    
-    for i in range(0,N-1):
-        temp.append((rawEMGSignal[i+1] - rawEMGSignal[i])**2)
-    DASDV = (1 / (N - 1)) * sum(temp)
+    N = np.shape(rawEMGSignal)[-1]
+    DASDV = (1 / (N - 1)) * np.sum(np.square(np.diff(rawEMGSignal, axis=-1)), axis=-1)
     return(DASDV)
 
 def getAFB(rawEMGSignal,samplerate, windowSize=32):
@@ -294,7 +270,8 @@ def getAFB(rawEMGSignal,samplerate, windowSize=32):
             * samplerate of the signal in Hz (sample / s)
             * windowSize = window size in ms
         * Output: 
-            * amplitude at first burst
+            * amplitude at first burst: maximum of the energy envelope (x**2 smoothed over
+              windowSize ms) in the first burst found by getBursts, NaN without burst
             
         :param rawEMGSignal: the raw EMG signal
         :type rawEMGSignal: list
@@ -305,16 +282,9 @@ def getAFB(rawEMGSignal,samplerate, windowSize=32):
         :return: Amplitute ad first Burst
         :rtype: float
     """
-    squaredSignal = square(rawEMGSignal) #squaring the signal
-    windowSample = int((windowSize * 1000) / samplerate) #get the number of samples for each window
-    w = np.hamming(windowSample)
-    #From: http://scipy-cookbook.readthedocs.io/items/SignalSmooth.html
-    filteredSignal = np.convolve(w/w.sum(),squaredSignal,mode='valid')
-    peak = peakutils.indexes(filteredSignal)[0]
-    AFB = filteredSignal[peak]
+    AFB = getBursts(rawEMGSignal, samplerate, windowSize).AFB
     return(AFB)
-              
-    
+
 def getZC(rawEMGSignal, threshold):
     """ How many times does the signal crosses the 0 (+-threshold).::
         
@@ -337,17 +307,7 @@ def getZC(rawEMGSignal, threshold):
         :return: Number of times the signal crosses the 0 (+- threshold)
         :rtype: float
     """
-    positive = (rawEMGSignal[0] > threshold)
-    ZC = 0
-    for x in rawEMGSignal[1:]:
-        if(positive):
-            if(x < 0 -threshold):
-                positive = False
-                ZC += 1
-        else:
-            if(x > 0 + threshold):
-                positive = True
-                ZC += 1
+    ZC = _batchZC(np.asarray(rawEMGSignal, dtype=np.float64), threshold)
     return(ZC)
     
 def getMYOP(rawEMGSignal, threshold):
@@ -373,8 +333,8 @@ def getMYOP(rawEMGSignal, threshold):
         :return: Myopulse percentage rate of the signal
         :rtype: float
     """
-    N = len(rawEMGSignal)
-    MYOP = len([1 for x in rawEMGSignal if abs(x) >= threshold]) / N
+    N = np.shape(rawEMGSignal)[-1]
+    MYOP = np.count_nonzero(np.abs(rawEMGSignal) >= threshold, axis=-1) / N
     return(MYOP)
     
 def getWAMP(rawEMGSignal, threshold):
@@ -401,12 +361,7 @@ def getWAMP(rawEMGSignal, threshold):
         :rtype: float
     """
     
-    N = len(rawEMGSignal)
-    WAMP = 0
-    for i in range(0,N-1):
-        x = rawEMGSignal[i] - rawEMGSignal[i+1]
-        if(x >= threshold):
-            WAMP += 1
+    WAMP = np.count_nonzero(-np.diff(rawEMGSignal, axis=-1) >= threshold, axis=-1)
     return(WAMP)
     
 def getSSC(rawEMGSignal,threshold):
@@ -432,13 +387,8 @@ def getSSC(rawEMGSignal,threshold):
         :rtype: int
     """
     
-    N = len(rawEMGSignal)
-    SSC = 0
-    for i in range(1,N-1):
-        a,b,c = [rawEMGSignal[i-1],rawEMGSignal[i],rawEMGSignal[i+1]]
-        if(a + b + c >= threshold *3 ): #computed only if the 3 values are above the threshold
-            if(a < b > c or a > b < c ): #if there's change in the slope
-                SSC += 1
+    signal = np.asarray(rawEMGSignal, dtype=np.float64)
+    SSC = _batchSSC(signal, np.sign(np.diff(signal, axis=-1)), threshold)
     return(SSC)
     
 def getMAVSLPk(rawEMGSignal, nseg):
@@ -464,9 +414,9 @@ def getMAVSLPk(rawEMGSignal, nseg):
     """
     N = len(rawEMGSignal)
     lenK = int(N / nseg) #length of each segment to compute
-    MAVSLPk = []
-    for s in range(0,N,lenK):
-        MAVSLPk.append(getMAV(rawEMGSignal[s:s+lenK]))
+    MAVSLPk = list(getRollingFeatures(rawEMGSignal, lenK, hop=lenK, features=["MAV"])["MAV"])
+    if(N % lenK): #the last segment is shorter
+        MAVSLPk.append(getMAV(rawEMGSignal[N - N % lenK:]))
     return(MAVSLPk)    
 
 
@@ -491,10 +441,90 @@ def getHIST(rawEMGSignal,nseg=9,threshold=50):
         :rtype: float
     """
     segmentLength = int(len(rawEMGSignal) / nseg)
+    segments = getRollingFeatures(rawEMGSignal, segmentLength, hop=segmentLength, threshold=threshold, features=["ZC","WAMP"])
     HIST = {}
     for seg in range(0,nseg):
         HIST[seg+1] = {}
-        thisSegment = rawEMGSignal[seg * segmentLength: (seg+1) * segmentLength]
-        HIST[seg+1]["ZC"] = getZC(thisSegment,threshold)
-        HIST[seg+1]["WAMP"] = getWAMP(thisSegment,threshold)
-    return(HIST)
\ No newline at end of file
+        HIST[seg+1]["ZC"] = int(segments["ZC"][seg])
+        HIST[seg+1]["WAMP"] = int(segments["WAMP"][seg])
+    return(HIST)
+
+###############################################################################
+#                                                                             #
+#                    BATCH TIME DOMAIN FEATURES                               #
+#                                                                             #
+###############################################################################
+""" Helpers of the vectorized features, and getTimeFeatures to compute all of them
+    at once on a (channel x window x sample) array. The shared intermediates
+    (|x|, x**2, first difference, slope signs) are computed once and passed to
+    each feature. """
+
+def _mavWeights(N, version):
+    """ Build the weight vector used by MAV1 (version=1) and MAV2 (version=2),
+        following the same index ranges as getMAV1 and getMAV2. """
+    wIndexMin = int(0.25 * N)
+    wIndexMax = int(0.75 * N)
+    i = np.arange(N)
+    if(version == 1):
+        w = np.full(N, 0.5)
+        w[wIndexMin:wIndexMax] = 1.0
+    else:
+        w = np.ones(N)
+        w[:wIndexMin] = 4 * i[:wIndexMin] / N
+        w[wIndexMax+1:] = 4 * (i[wIndexMax+1:] - N) / N
+    return(w)
+
+def _batchZC(signal, threshold):
+    """ Vectorized form of the getZC state machine.
+    
+        Each sample is classified as positive (x > threshold), negative (x < -threshold)
+        or inside the dead band. The state of the first sample is positive only if
+        x[0] > threshold. The dead band samples keep the last state (forward fill), and ZC
+        is the number of state changes.
+    """
+    if(signal.shape[-1] == 0):
+        return(np.zeros(signal.shape[:-1], dtype=np.int64))
+    state = np.where(signal > threshold, 1, np.where(signal < -threshold, -1, 0)).astype(np.int8)
+    state[..., 0] = np.where(signal[..., 0] > threshold, 1, -1)
+    lastSet = np.where(state != 0, np.arange(state.shape[-1]), 0)
+    lastSet = np.maximum.accumulate(lastSet, axis=-1)
+    filled = np.take_along_axis(state, lastSet, axis=-1)
+    ZC = np.count_nonzero(filled[..., 1:] != filled[..., :-1], axis=-1)
+    return(ZC)
+
+def _batchSSC(signal, slopeSign, threshold):
+    """ Vectorized form of getSSC, using the sign of the first difference. """
+    aboveThreshold = (signal[..., :-2] + signal[..., 1:-1] + signal[..., 2:]) >= threshold * 3
+    slopeChange = (slopeSign[..., :-1] * slopeSign[..., 1:]) < 0
+    SSC = np.count_nonzero(aboveThreshold & slopeChange, axis=-1)
+    return(SSC)
+
+def getTimeFeatures(rawEMGSignal, samplerate, threshold=0.01):
+    """ Compute all the time domain features at once over the last axis of an array.
+    
+        The input can be a single signal, a (channel x sample) array or a
+        (channel x window x sample) array. |x|, x**2, the first difference and the
+        slope signs are evaluated once and shared between the features.
+        
+        * Input:
+            * rawEMGSignal = EMG signal(s) as NumPy array, samples on the last axis
+            * samplerate = samplerate of the signal in Hz
+            * threshold for the evaluation of ZC,MYOP,WAMP,SSC
+        * Output:
+            * dictionary with the same keys as the TimeDomain results of analyzeEMG,
+              each value being an array with the shape of the input without the last axis
+              
+        :param rawEMGSignal: the raw EMG signal(s)
+        :type rawEMGSignal: numpy.ndarray
+        :param samplerate: samplerate of the signal in Hz
+        :type samplerate: int
+        :param threshold: value to sum / substract to the zero when evaluating the crossing.
+        :type threshold: float
+        :return: time domain features
+        :rtype: dict
+    """
+    from .feature_graph import FeatureGraph, TIME_FEATURES #imported here to avoid a circular import
+    
+    graph = FeatureGraph(rawEMGSignal, samplerate, threshold)
+    features = graph.computeFeatures(TIME_FEATURES)["TimeDomain"]
+    return(features)
@@ -0,0 +1,74 @@
+import os
+import re
+
+"""
+    Discovery of the recordings in the openbci-data tree.
+    Recordings are stored as <group>/<group>_<subject>/<file>, e.g. g20/g20_U4/, where
+    the group is the grip (g20 / g50) and the subject is U1..U8. BrainFlow-RAW files
+    end with the MVC level and the trial, e.g. ..._4_50_1.csv is the first trial at 50% MVC
+    (letters before the MVC level, as in _T100_1 or _KL_10_2, are initials of the operator).
+    OpenBCI-RAW files have no MVC level or trial in their name.
+"""
+
+BRAINFLOW_PREFIX = 'BrainFlow-RAW'
+OPENBCI_PREFIX = 'OpenBCI-RAW'
+
+_FOLDER = re.compile(r'^(g\d+)_(U\d+)$')
+_MVC_TRIAL = re.compile(r'_\d{2}-\d{2}-\d{2}_.*?(\d+)[_-](\d+)(?:csv)?\.csv$')  # after the time of the recording
+
+
+def parse_recording_name(path):
+    """ Get the metadata of a recording from its path
+
+        :param path: path of the recording
+        :type path: str
+        :return: dict with path, format ('brainflow' / 'openbci'), group, subject, mvc and trial
+                 (None when the information is not in the path)
+        :rtype: dict
+    """
+    name = os.path.basename(path)
+    folder = os.path.basename(os.path.dirname(os.path.abspath(path)))
+    info = {'path': path, 'file': name, 'format': None, 'group': None, 'subject': None, 'mvc': None, 'trial': None}
+
+    if name.startswith(BRAINFLOW_PREFIX) and name.endswith('.csv'):
+        info['format'] = 'brainflow'
+        match = _MVC_TRIAL.search(name)
+        if match:
+            info['mvc'] = int(match.group(1))
+            info['trial'] = int(match.group(2))
+    elif name.startswith(OPENBCI_PREFIX) and name.endswith('.txt'):
+        info['format'] = 'openbci'
+
+    match = _FOLDER.match(folder)
+    if match:
+        info['group'], info['subject'] = match.groups()
+    return info
+
+
+def discover_recordings(roots, formats=('brainflow', 'openbci')):
+    """ Find all the BrainFlow-RAW / OpenBCI-RAW recordings under the given folders
+
+        :param roots: folders to search, e.g. ['openbci-data/g20', 'openbci-data/g50']
+        :type roots: list
+        :param formats: formats to keep
+        :type formats: tuple
+        :return: metadata of every recording (see parse_recording_name), sorted by group, subject, mvc, trial
+        :rtype: list
+    """
+    if isinstance(roots, str):
+        roots = [roots]
+    recordings = []
+    for root in roots:
+        for subdir, dirs, files in os.walk(root):
+            dirs.sort()
+            for file in sorted(files):
+                info = parse_recording_name(os.path.join(subdir, file))
+                if info['format'] in formats:
+                    recordings.append(info)
+
+    def sort_key(info):
+        return (info['group'] or '', info['subject'] or '', info['format'],
+                info['mvc'] if info['mvc'] is not None else -1,
+                info['trial'] if info['trial'] is not None else -1, info['file'])
+    recordings.sort(key=sort_key)
+    return recordings
@@ -0,0 +1,132 @@
+import re
+import warnings
+from collections import namedtuple
+
+import numpy as np
+
+"""
+    Column-selective loaders for the two recording formats of the Cyton board.
+    Both formats have 24 columns with the same layout (sample index, 8 EXG channels, 3 accelerometer
+    channels, ..., timestamp); the OpenBCI-RAW txt adds `%` comment lines with the board metadata,
+    a line with the column names and a 25th column with the formatted timestamp.
+    Only the requested columns are converted, and the files can be read in chunks of rows.
+"""
+
+SAMPLE_INDEX_COLUMN = 0
+EXG_COLUMNS = list(range(1, 9))
+TIMESTAMP_COLUMN = 22
+
+Recording = namedtuple('Recording', ['exg', 'timestamps', 'sample_index', 'metadata'])
+
+_HEADER_FIELDS = {
+    'Number of channels': ('n_channels', int),
+    'Sample Rate': ('sample_rate', float),
+    'Board': ('board', str),
+}
+
+
+def _recording_format(path):
+    return 'openbci' if path.endswith('.txt') else 'brainflow'
+
+
+def _read_header(f, fmt):
+    """ Read the `%` lines and the column names line, leaving the file at the first data row """
+    metadata = {'format': fmt, 'n_channels': None, 'sample_rate': None, 'board': None, 'columns': None}
+    if fmt != 'openbci':
+        return metadata
+    while True:
+        position = f.tell()
+        line = f.readline()
+        if not line:
+            break
+        if line.startswith('%'):
+            match = re.match(r'%\s*([^=]+?)\s*=\s*(.*?)\s*$', line)
+            if match and match.group(1) in _HEADER_FIELDS:
+                key, convert = _HEADER_FIELDS[match.group(1)]
+                value = match.group(2)
+                if convert is not str:
+                    value = convert(value.split()[0])
+                metadata[key] = value
+        elif line[:1].isalpha():
+            metadata['columns'] = [name.strip() for name in line.split(',')]
+        else:
+            f.seek(position)
+            break
+    return metadata
+
+
+def read_metadata(path):
+    """ Read the metadata of a recording without loading the samples
+
+        :param path: path of a BrainFlow-RAW csv or OpenBCI-RAW txt file
+        :type path: str
+        :return: format, n_channels, sample_rate, board and column names
+                 (None when the file does not contain them, as for BrainFlow-RAW csv)
+        :rtype: dict
+    """
+    with open(path) as f:
+        return _read_header(f, _recording_format(path))
+
+
+def iter_columns(path, columns, chunk_rows=65536, dtype=np.float64):
+    """ Read some columns of a recording, in chunks of rows
+
+        :param path: path of a BrainFlow-RAW csv or OpenBCI-RAW txt file
+        :type path: str
+        :param columns: indexes of the columns to read
+        :type columns: list
+        :param chunk_rows: number of rows per chunk
+        :type chunk_rows: int
+        :param dtype: type of the returned arrays, the text is parsed directly into it by np.loadtxt
+        :return: iterator over (rows, len(columns)) arrays
+    """
+    fmt = _recording_format(path)
+    delimiter = ',' if fmt == 'openbci' else '\t'
+    with open(path) as f:
+        _read_header(f, fmt)
+        while True:
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', UserWarning)  # empty chunk at the end of the file
+                chunk = np.loadtxt(f, delimiter=delimiter, usecols=columns, max_rows=chunk_rows,
+                                   dtype=dtype, ndmin=2, comments='%')
+            if len(chunk) == 0:
+                break
+            yield chunk
+
+
+def load_recording(path, channels=(0,), timestamps=True, sample_index=False, dtype=np.float64, chunk_rows=65536):
+    """ Load EXG channels and, optionally, timestamps and sample indexes of a recording
+
+        :param path: path of a BrainFlow-RAW csv or OpenBCI-RAW txt file
+        :type path: str
+        :param channels: EXG channels to load, 0 to 7
+        :type channels: list
+        :param timestamps: load the timestamp column
+        :type timestamps: bool
+        :param sample_index: load the sample index column
+        :type sample_index: bool
+        :param dtype: type of the EXG samples (timestamps are always float64); the rows are parsed
+                      as float64 and the EXG columns converted chunk by chunk, so only one chunk
+                      is ever held as float64
+        :param chunk_rows: number of rows parsed at a time
+        :type chunk_rows: int
+        :return: Recording with exg as (n_channels, n_samples) array, timestamps and sample_index
+                 (None when not requested) and the metadata of read_metadata
+        :rtype: Recording
+    """
+    columns = [EXG_COLUMNS[c] for c in channels]
+    if timestamps:
+        columns.append(TIMESTAMP_COLUMN)
+    if sample_index:
+        columns.append(SAMPLE_INDEX_COLUMN)
+
+    n = len(channels)
+    exg_chunks, other_chunks = [np.zeros((0, n), dtype=dtype)], [np.zeros((0, len(columns) - n))]
+    for chunk in iter_columns(path, columns, chunk_rows=chunk_rows):
+        exg_chunks.append(chunk[:, :n].astype(dtype))
+        other_chunks.append(chunk[:, n:].copy())  # not a view, which would keep the whole chunk
+    exg = np.ascontiguousarray(np.concatenate(exg_chunks).T)
+    other = np.concatenate(other_chunks)
+    ts = other[:, 0].copy() if timestamps else None
+    index = other[:, -1].copy() if sample_index else None
+    return Recording(exg, ts, index, read_metadata(path))
@@ -0,0 +1,152 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from .catalog import discover_recordings
+from .loaders import load_recording
+
+"""
+    Binary store of the recordings: each recording is parsed once and written as a float32
+    (n_channels, n_samples) array, one channel after the other, that is opened with np.memmap.
+    index.json lists the recordings with their subject, group, MVC level, trial, sample rate,
+    start timestamp and sample count, so queries do not open any recording.
+    Build it from the signal-processing folder with: python -m src.recordings.store --store openbci-data/store
+"""
+
+INDEX_FILE = 'index.json'
+DEFAULT_SAMPLE_RATE = 250
+
+
+def record_id(info):
+    """ Name of a recording in the store, e.g. g20_U4_BrainFlow-RAW_2023-02-27_11-33-13_4_50_1 """
+    stem = os.path.splitext(info['file'])[0]
+    return '_'.join(part for part in (info['group'], info['subject'], stem) if part)
+
+
+def convert_recording(info, store_dir, channels=range(8)):
+    """ Write one recording to the store
+
+        :param info: metadata of the recording (see discover_recordings)
+        :type info: dict
+        :param store_dir: folder of the store
+        :type store_dir: str
+        :param channels: EXG channels to keep
+        :type channels: list
+        :return: index entry of the recording
+        :rtype: dict
+    """
+    recording = load_recording(info['path'], channels=list(channels), timestamps=True, dtype=np.float32)
+    entry = {key: info[key] for key in ('group', 'subject', 'mvc', 'trial', 'format', 'file')}
+    entry['id'] = record_id(info)
+    entry['source'] = info['path']
+    entry['data'] = entry['id'] + '.f32'
+    entry['channels'] = list(channels)
+    entry['sample_rate'] = recording.metadata['sample_rate'] or DEFAULT_SAMPLE_RATE
+    entry['sample_count'] = int(recording.exg.shape[1])
+    entry['start_timestamp'] = float(recording.timestamps[0]) if len(recording.timestamps) else None
+    recording.exg.tofile(os.path.join(store_dir, entry['data']))
+    return entry
+
+
+def build_store(roots, store_dir, formats=('brainflow', 'openbci'), channels=range(8)):
+    """ Convert all the recordings found under roots, skipping those already up to date.
+        Recordings that cannot be parsed are reported and left out of the index.
+
+        :return: the index of the store
+        :rtype: list
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    previous = {}
+    index_path = os.path.join(store_dir, INDEX_FILE)
+    if os.path.exists(index_path):
+        with open(index_path) as f:
+            previous = {entry['id']: entry for entry in json.load(f)}
+
+    index = []
+    for info in discover_recordings(roots, formats=formats):
+        entry = previous.get(record_id(info))
+        data_path = entry and os.path.join(store_dir, entry['data'])
+        if entry is None or not os.path.exists(data_path) or os.path.getmtime(data_path) < os.path.getmtime(info['path']):
+            start = time.perf_counter()
+            try:
+                entry = convert_recording(info, store_dir, channels)
+            except ValueError as e:
+                print('%s FAILED: %s' % (info['path'], e))
+                continue
+            print('%s (%.3f s)' % (info['path'], time.perf_counter() - start))
+        index.append(entry)
+
+    with open(index_path, 'w') as f:
+        json.dump(index, f, indent=1)
+    return index
+
+
+class RecordingStore:
+    """ Read access to a store written by build_store
+
+        :param store_dir: folder of the store
+        :type store_dir: str
+    """
+
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        with open(os.path.join(store_dir, INDEX_FILE)) as f:
+            self.entries = json.load(f)
+        self._by_id = {entry['id']: entry for entry in self.entries}
+
+    def query(self, **criteria):
+        """ Entries matching all the criteria, e.g. query(subject='U6', mvc=80) """
+        return [entry for entry in self.entries
+                if all(entry.get(key) == value for key, value in criteria.items())]
+
+    def entry(self, recording):
+        return self._by_id[recording] if isinstance(recording, str) else recording
+
+    def open(self, recording):
+        """ Memory-mapped (n_channels, n_samples) float32 array of a recording (read only)
+
+            A recording without samples (e.g. only the header was written) has an empty data file,
+            which cannot be mapped: it gives an empty (n_channels, 0) array.
+        """
+        entry = self.entry(recording)
+        if entry['sample_count'] == 0:
+            return np.zeros((len(entry['channels']), 0), dtype=np.float32)
+        return np.memmap(os.path.join(self.store_dir, entry['data']), dtype=np.float32, mode='r',
+                         shape=(len(entry['channels']), entry['sample_count']))
+
+    def window(self, recording, start, duration, channels=None):
+        """ Samples between start and start + duration seconds, as a view of the memory map
+
+            :param recording: id or index entry of the recording
+            :param start: start of the window in seconds
+            :type start: float
+            :param duration: length of the window in seconds
+            :type duration: float
+            :param channels: positions of the channels to keep (a slice keeps the result a view)
+            :return: (n_channels, n_samples) float32 array
+        """
+        entry = self.entry(recording)
+        fs = entry['sample_rate']
+        first = int(round(start * fs))
+        data = self.open(entry)[:, first:first + int(round(duration * fs))]
+        return data if channels is None else data[channels]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert the openbci-data recordings to the binary store')
+    parser.add_argument('roots', nargs='*', default=['openbci-data/g20', 'openbci-data/g50'],
+                        help='folders to search for recordings')
+    parser.add_argument('--store', type=str, default='openbci-data/store', help='folder of the store')
+    parser.add_argument('--formats', type=str, nargs='+', default=['brainflow', 'openbci'],
+                        choices=['brainflow', 'openbci'], help='recording formats to convert')
+    args = parser.parse_args()
+
+    index = build_store(args.roots, args.store, formats=tuple(args.formats))
+    print('%d recordings in %s' % (len(index), args.store))
+
+
+if __name__ == '__main__':
+    main()
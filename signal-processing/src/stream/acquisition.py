@@ -0,0 +1,201 @@
+import logging
+import threading
+import time
+
+import numpy as np
+
+"""
+    Acquisition and processing threads for the realtime scripts.
+    The acquisition thread drains the board with get_board_data into a preallocated ring buffer,
+    the processing thread hands every new block of samples to a processing function and keeps its
+    latest result. The GUI (or any other consumer) only reads that result, so a slow step of the
+    processing never stalls the rendering, and a slow GUI never loses samples.
+    An exception in a step stops its thread: it is logged, kept in `error` and raised again by stop().
+    Only get_board_data is used, so any object with the BoardShim interface can be the board.
+"""
+
+
+class RingBuffer:
+    """ Preallocated (n_rows, capacity) ring buffer of samples, safe to share between threads
+
+        Samples are addressed by their absolute position, the number of samples written before them,
+        so a reader can ask for everything written since its last read.
+
+        :param n_rows: number of rows (channels) of the samples
+        :type n_rows: int
+        :param capacity: number of samples kept
+        :type capacity: int
+    """
+
+    def __init__(self, n_rows, capacity, dtype=np.float64):
+        self.capacity = int(capacity)
+        self._data = np.zeros((n_rows, self.capacity), dtype=dtype)
+        self._lock = threading.Lock()
+        self.written = 0
+
+    def write(self, chunk):
+        """ Append a (n_rows, n) block of samples, overwriting the oldest ones """
+        chunk = np.asarray(chunk)
+        n = chunk.shape[1]
+        if n > self.capacity:
+            chunk = chunk[:, -self.capacity:]
+        with self._lock:
+            start = (self.written + n - chunk.shape[1]) % self.capacity
+            first = min(chunk.shape[1], self.capacity - start)
+            self._data[:, start:start + first] = chunk[:, :first]
+            self._data[:, :chunk.shape[1] - first] = chunk[:, first:]
+            self.written += n
+
+    def _read(self, start, stop):
+        index = np.arange(start, stop) % self.capacity
+        return self._data[:, index]
+
+    def latest(self, n):
+        """ Copy of the last n samples (fewer at the beginning of the stream), oldest first """
+        with self._lock:
+            n = min(n, self.written, self.capacity)
+            return self._read(self.written - n, self.written)
+
+    def read_since(self, position):
+        """ Copy of the samples written since the absolute position
+
+            :return: the samples, the position to pass to the next call and the number of samples
+                     that were overwritten before they could be read
+            :rtype: tuple
+        """
+        with self._lock:
+            first = max(position, self.written - self.capacity)
+            return self._read(first, self.written), self.written, first - position
+
+
+class _StoppableThread(threading.Thread):
+
+    def __init__(self, interval, name):
+        super().__init__(name=name, daemon=True)
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self.error = None
+
+    def stop(self, timeout=None):
+        """ Stop after a last step, raising the exception that stopped the thread, if any """
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout)
+        if self.error is not None:
+            raise self.error
+
+    def run(self):
+        try:
+            while not self._stop_event.is_set():
+                start = time.perf_counter()
+                self.step()
+                self._stop_event.wait(max(self.interval - (time.perf_counter() - start), 0))
+            self.step()  # last samples arrived after the previous step
+        except Exception as e:
+            logging.exception('%s thread stopped', self.name)
+            self.error = e
+
+    def step(self):
+        raise NotImplementedError
+
+
+class AcquisitionThread(_StoppableThread):
+    """ Move the samples of the board into a ring buffer every `interval` seconds
+
+        Listeners are called with every new (n_rows, n) block, in the acquisition thread
+        (e.g. the recording writer); they must not block.
+
+        :param board_shim: a prepared and streaming BoardShim (or an object with get_board_data)
+        :param ring: buffer with one row per row of the board data
+        :type ring: RingBuffer
+        :param interval: seconds between two reads of the board
+        :type interval: float
+        :param telemetry: Telemetry receiving samples_per_read and, with buffer_size, board_occupancy
+        :param buffer_size: size of the board buffer (num_samples of start_stream)
+        :type buffer_size: int
+    """
+
+    def __init__(self, board_shim, ring, interval=0.01, telemetry=None, buffer_size=None):
+        super().__init__(interval, 'acquisition')
+        self.board_shim = board_shim
+        self.ring = ring
+        self.listeners = []
+        self.telemetry = telemetry
+        self.buffer_size = buffer_size
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def step(self):
+        if self.telemetry is not None and self.buffer_size:
+            self.telemetry.record('board_occupancy', self.board_shim.get_board_data_count() / self.buffer_size)
+        data = self.board_shim.get_board_data()
+        if self.telemetry is not None:
+            self.telemetry.record('samples_per_read', data.shape[1])
+        if data.shape[1]:
+            self.ring.write(data)
+            for listener in self.listeners:
+                listener(data)
+
+
+class ProcessingThread(_StoppableThread):
+    """ Call `process` with the samples added to the ring buffer since the previous call
+
+        :param ring: buffer filled by the acquisition thread
+        :type ring: RingBuffer
+        :param process: function of a (n_rows, n) block of new samples, returning the result to publish
+        :param interval: seconds between two calls
+        :type interval: float
+        :param profiler: Profiler recording every call as a run with a 'process' stage (see
+                         src.analyze.profiling); `process` can add its own stages to it
+        :param telemetry: Telemetry receiving processing, samples_per_step and lost_samples
+        :param timestamp_row: row of the board timestamps, to keep the timestamp of the newest
+                              sample behind the latest result (see latest_with_timestamp)
+        :type timestamp_row: int
+    """
+
+    def __init__(self, ring, process, interval=0.05, profiler=None, telemetry=None, timestamp_row=None):
+        super().__init__(interval, 'processing')
+        self.ring = ring
+        self.process = process
+        self.profiler = profiler
+        self.telemetry = telemetry
+        self.timestamp_row = timestamp_row
+        self.position = 0
+        self.lost_samples = 0
+        self._result = None
+        self._timestamp = None
+        self._lock = threading.Lock()
+
+    def step(self):
+        chunk, self.position, lost = self.ring.read_since(self.position)
+        self.lost_samples += lost
+        if self.telemetry is not None and lost:
+            self.telemetry.count('lost_samples', lost)
+        if chunk.shape[1]:
+            start = time.perf_counter()
+            if self.profiler is None:
+                result = self.process(chunk)
+            else:
+                with self.profiler.stage('process'):
+                    result = self.process(chunk)
+                self.profiler.finish(samples=chunk.shape[1])
+            if self.telemetry is not None:
+                self.telemetry.record('processing', time.perf_counter() - start)
+                self.telemetry.record('samples_per_step', chunk.shape[1])
+            with self._lock:
+                self._result = result
+                if self.timestamp_row is not None:
+                    self._timestamp = float(chunk[self.timestamp_row, -1])
+
+    def latest(self):
+        """ Result of the last call of `process`, None before the first one """
+        with self._lock:
+            return self._result
+
+    def latest_with_timestamp(self):
+        """ Result of the last call of `process` and board timestamp of its newest sample (needs timestamp_row),
+            read together so that the timestamp belongs to the result
+        """
+        with self._lock:
+            return self._result, self._timestamp
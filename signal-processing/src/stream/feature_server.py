@@ -0,0 +1,232 @@
+import argparse
+import asyncio
+import json
+import logging
+import time
+
+import numpy as np
+
+from src.analyze.filters import FilterCascade, HighpassFilter, NotchFilter
+from src.analyze.freq_descriptors import getPSD, getMDF
+from src.analyze.rolling_descriptors import IncrementalMAV
+from src.stream.acquisition import RingBuffer, AcquisitionThread, ProcessingThread
+from src.stream.replay_board import ReplayBoard
+
+"""
+    Headless feature server: the board is read by the acquisition thread, the processing thread computes
+    MAV, RMS and median frequency of every EXG channel, and an asyncio TCP server pushes them to all the
+    connected clients (the Electrodes app, a plot, ...) as JSON lines, `rate` times per second:
+
+        {"seq": 12, "time": 1677617493.8, "samples": 25, "lost_samples": 0, "channels": [1, 2, ...],
+         "MAV": [...], "RMS": [...], "MDF": [...]}
+
+    Each client has its own bounded queue: a client that does not keep up loses its oldest messages
+    instead of slowing down the others. One session is processed once, whatever the number of clients.
+    Run from the signal-processing folder with: python -m src.stream.feature_server (synthetic board)
+    and watch it with: python -m src.stream.feature_server --client
+"""
+
+
+def _json_values(values):
+    # NaN (e.g. MAV before the first full window) is not valid JSON, send null instead
+    return [float(v) if np.isfinite(v) else None for v in np.atleast_1d(values)]
+
+
+class FeatureProcessor:
+    """ MAV, RMS and MDF of the last `window_seconds` of some rows of the board data
+
+        Called by the processing thread with the new samples: they are filtered by causal
+        streaming filters (highpass and notch), the MAV is updated incrementally and the RMS
+        and MDF are computed on the last window.
+    """
+
+    def __init__(self, channels, sampling_rate, timestamp_channel=None, window_seconds=1.0, highpass=1,
+                 notch_f0=60, Q=100):
+        self.channels = list(channels)
+        self.sampling_rate = sampling_rate
+        self.timestamp_channel = timestamp_channel
+        self.window = int(window_seconds * sampling_rate)
+        self.offset = None
+        self.filters = FilterCascade(HighpassFilter(highpass, sampling_rate, order=2),
+                                     NotchFilter(sampling_rate, notch_f0, Q))
+        self.mav = IncrementalMAV(self.window)
+        self.history = RingBuffer(len(self.channels), self.window)
+        self.last_mav = np.full(len(self.channels), np.nan)
+        self.seq = 0
+
+    def __call__(self, chunk):
+        data = chunk[self.channels]
+        if self.offset is None:
+            self.offset = data[:, :1].copy()  # dc offset of the board, to shorten the transient of the highpass
+        filtered = self.filters.process(data - self.offset)
+        mavs = self.mav.process(filtered)
+        if mavs.shape[-1]:
+            self.last_mav = mavs[:, -1]
+        self.history.write(filtered)
+
+        window = self.history.latest(self.window)
+        n = window.shape[-1]
+        psd, frequencies = getPSD(window, self.sampling_rate, nperseg=n)
+        self.seq += 1
+        return {
+            'seq': self.seq,
+            'time': float(chunk[self.timestamp_channel, -1]) if self.timestamp_channel is not None else time.time(),
+            'samples': int(chunk.shape[1]),
+            'channels': self.channels,
+            'MAV': _json_values(self.last_mav),
+            'RMS': _json_values(np.sqrt(np.mean(window * window, axis=-1))),
+            'MDF': _json_values(getMDF(psd, frequencies)),
+        }
+
+
+class FeatureServer:
+    """ Publish the results of a ProcessingThread to TCP clients, one JSON line per result
+
+        :param processing: the processing thread whose latest() results are published
+        :type processing: ProcessingThread
+        :param rate: messages per second
+        :type rate: float
+        :param client_queue: messages kept for a slow client before the oldest are dropped
+        :type client_queue: int
+    """
+
+    def __init__(self, processing, host='127.0.0.1', port=8765, rate=10, client_queue=32):
+        self.processing = processing
+        self.host = host
+        self.port = port
+        self.rate = rate
+        self.client_queue = client_queue
+        self.clients = set()
+        self.dropped_messages = 0
+        self._server = None
+
+    async def _handle_client(self, reader, writer):
+        queue = asyncio.Queue(maxsize=self.client_queue)
+        self.clients.add(queue)
+        peer = writer.get_extra_info('peername')
+        logging.info('client connected: %s', peer)
+        try:
+            while True:
+                message = await queue.get()
+                writer.write(message)
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self.clients.discard(queue)
+            writer.close()
+            logging.info('client disconnected: %s', peer)
+
+    def publish(self, result):
+        """ Queue a result for every client, dropping the oldest message of the clients that lag """
+        message = (json.dumps(result, allow_nan=False) + '\n').encode()
+        for queue in self.clients:
+            if queue.full():
+                queue.get_nowait()
+                self.dropped_messages += 1
+            queue.put_nowait(message)
+
+    async def serve(self, duration=None):
+        """ Accept clients and publish the new results until cancelled (or for `duration` seconds) """
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        logging.info('serving features on %s:%d', self.host, self.port)
+        last_seq = None
+        start = time.perf_counter()
+        async with self._server:
+            while duration is None or time.perf_counter() - start < duration:
+                result = self.processing.latest()
+                if result is not None and result['seq'] != last_seq:
+                    last_seq = result['seq']
+                    result = dict(result, lost_samples=self.processing.lost_samples)
+                    self.publish(result)
+                await asyncio.sleep(1 / self.rate)
+
+
+def run_server(board_shim, n_rows, channels, sampling_rate, timestamp_channel=None, host='127.0.0.1', port=8765,
+               rate=10, window_seconds=1.0, duration=None):
+    """ Run the acquisition, the processing and the server on a prepared and streaming board
+
+        :param n_rows: number of rows of the board data (BoardShim.get_num_rows)
+        :param channels: rows of the EXG channels to analyze
+        :param duration: seconds to serve, None to serve until interrupted
+        :return: the server, for its statistics
+        :rtype: FeatureServer
+    """
+    ring = RingBuffer(n_rows, int(60 * sampling_rate))
+    acquisition = AcquisitionThread(board_shim, ring)
+    processing = ProcessingThread(ring, FeatureProcessor(channels, sampling_rate, timestamp_channel, window_seconds),
+                                  interval=1 / rate)
+    server = FeatureServer(processing, host, port, rate)
+    acquisition.start()
+    processing.start()
+    try:
+        asyncio.run(server.serve(duration))
+    finally:
+        try:
+            acquisition.stop()
+        finally:
+            processing.stop()
+    return server
+
+
+async def read_features(host='127.0.0.1', port=8765, count=None):
+    """ Minimal client: print the messages of the server (all of them, or `count`) """
+    reader, writer = await asyncio.open_connection(host, port)
+    received = 0
+    try:
+        while count is None or received < count:
+            line = await reader.readline()
+            if not line:
+                break
+            message = json.loads(line)
+            print('seq %d: MAV %s MDF %s' % (message['seq'], message['MAV'], message['MDF']))
+            received += 1
+    finally:
+        writer.close()
+    return received
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description='Push live EMG features to local TCP clients')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='address to listen on (0.0.0.0 for the phone)')
+    parser.add_argument('--port', type=int, default=8765, help='tcp port')
+    parser.add_argument('--rate', type=float, default=10, help='messages per second')
+    parser.add_argument('--window', type=float, default=1.0, help='seconds of signal for each feature')
+    parser.add_argument('--client', action='store_true', help='connect to a running server and print its messages')
+    parser.add_argument('--serial-port', type=str, help='serial port', required=False, default='')
+    parser.add_argument('--board-id', type=int, help='board id, check docs to get a list of supported boards',
+                        required=False, default=None)
+    parser.add_argument('--replay', type=str, default=None,
+                        help='recording of openbci-data to replay instead of a board (see replay_board.py)')
+    parser.add_argument('--replay-speed', type=float, default=1.0, help='speed of the replay, 0 for as fast as possible')
+    args = parser.parse_args()
+
+    if args.client:
+        asyncio.run(read_features(args.host, args.port))
+        return
+
+    if args.replay:
+        board_shim = ReplayBoard(args.replay, speed=args.replay_speed, loop=True)
+    else:
+        from brainflow.board_shim import BoardShim, BrainFlowInputParams, BoardIds
+
+        params = BrainFlowInputParams()
+        params.serial_port = args.serial_port
+        board_shim = BoardShim(BoardIds.SYNTHETIC_BOARD if args.board_id is None else args.board_id, params)
+    board_id = board_shim.get_board_id()
+    try:
+        board_shim.prepare_session()
+        board_shim.start_stream()
+        run_server(board_shim, board_shim.get_num_rows(board_id), board_shim.get_exg_channels(board_id),
+                   board_shim.get_sampling_rate(board_id), board_shim.get_timestamp_channel(board_id),
+                   args.host, args.port, args.rate, args.window)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if board_shim.is_prepared():
+            board_shim.release_session()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,58 +1,86 @@
 import argparse
 import logging
+import time
 
 import pyqtgraph as pg
 from brainflow.board_shim import BoardShim, BrainFlowInputParams, BoardIds
-from brainflow.data_filter import DataFilter, FilterTypes, DetrendOperations, NoiseTypes
-from pyqtgraph.Qt import QtGui, QtCore, QtWidgets
+from pyqtgraph.Qt import QtCore, QtWidgets
 import numpy as np
-from scipy.signal import butter, filtfilt, iirnotch
+
+from src.analyze.filters import FilterCascade, HighpassFilter, NotchFilter
+from src.analyze.profiling import Profiler, StageStats
+from src.analyze.rolling_descriptors import IncrementalMAV
+from src.stream.acquisition import RingBuffer, AcquisitionThread, ProcessingThread
+from src.stream.recorder import RecordingWriter
+from src.stream.replay_board import ReplayBoard
+from src.stream.telemetry import Telemetry
 
 """
     Plug in Bluetooth to first (closer to user) USB slot. 
     Switch board on to 'BLE' side. 
     Script adapted from the BrainFlow example 
+    The board is read by an acquisition thread and the MAV is computed incrementally by a processing
+    thread (see acquisition.py); the Qt timer only draws the latest MAV.
+    All the board data and the MAV trace are saved by a writer thread in --output-dir (see recorder.py).
+    Latency, tick jitter, processing time and buffer health can be exported with --telemetry-file
+    and --telemetry-port (see telemetry.py); --profile prints the percentiles of the processing time at the end.
+    Run from the signal-processing folder with: python -m src.stream.plot_realtime
 """
 
-def filter_data(data, fs=250, notch_f0 = 60, Q = 100):
-  nyq = 0.5*fs
-  # remove dc offset 
-  b,a = butter(2, 1/nyq, 'highpass')
-  y = filtfilt(b,a,data)
+class MAVProcessor:
+    """ MAV of one channel, called by the processing thread with the new samples.
 
-  b_notch, a_notch = iirnotch(notch_f0, Q, fs)
-  y = filtfilt(b_notch, a_notch, y)
+        The samples go through causal streaming filters (highpass 1 Hz and notch)
+        and an IncrementalMAV, so each call costs O(new samples); the last num_mavs values are kept
+        for the plot. The new MAVs are also sent to the writer, when there is one.
+    """
+    def __init__(self, channel, sampling_rate, num_mavs, mav_window_data_size=500, notch_f0=60, Q=100, writer=None):
+        self.channel = channel
+        self.writer = writer
+        self.offset = None
+        self.filters = FilterCascade(HighpassFilter(1, sampling_rate, order=2), NotchFilter(sampling_rate, notch_f0, Q))
+        self.mav = IncrementalMAV(mav_window_data_size)
+        self.mavs = RingBuffer(1, num_mavs)
 
-  return y
+    def __call__(self, chunk):
+        target_data = chunk[self.channel]
+        if self.offset is None:
+            self.offset = target_data[0] # remove the dc offset of the board before the highpass, to shorten its transient
+        new_mavs = self.mav.process(self.filters.process(target_data - self.offset))
 
-def getMAV(rawEMGSignal):
-    """ Thif functions compute the  average of EMG signal Amplitude.::
-        
-            MAV = 1/N * sum(|xi|) for i = 1 --> N
-        
-        * Input: 
-            * raw EMG Signal as list
-        * Output: 
-            * Mean Absolute Value    
-            
-        :param rawEMGSignal: the raw EMG signal
-        :type rawEMGSignal: list
-        :return: the MAV of the EMG Signal
-        :rtype: float
-    """
-    
-    MAV = 1/len(rawEMGSignal) *  np.sum([abs(x) for x in rawEMGSignal])    
-    return(MAV)
+        if self.writer is not None and len(new_mavs):
+            self.writer.write('mav', new_mavs)
+
+        self.mavs.write(new_mavs[None])
+        return self.mavs.latest(self.mavs.capacity)[0]
+
+BOARD_BUFFER_SIZE = 450000
 
 class Graph:
-    def __init__(self, board_shim):
+    def __init__(self, board_shim, writer=None, telemetry=None, profiler=None):
         self.board_id = board_shim.get_board_id()
         self.board_shim = board_shim
-        self.exg_channels = BoardShim.get_emg_channels(self.board_id)
-        self.sampling_rate = BoardShim.get_sampling_rate(self.board_id)
+        self.exg_channels = board_shim.get_emg_channels(self.board_id)
+        self.sampling_rate = board_shim.get_sampling_rate(self.board_id)
         self.update_speed_ms = 50 ##(0.05 s = 50)
         self.window_size = 4 ## (showing past 4s data in window)
         self.num_points = self.window_size * self.sampling_rate
+        self.mav_window_data_size = 500
+        self.telemetry = telemetry
+        self.last_mavs = None
+
+        ## acquisition and processing run in their own threads, the GUI only reads the result
+        self.ring = RingBuffer(board_shim.get_num_rows(self.board_id), 60 * self.sampling_rate)
+        self.acquisition = AcquisitionThread(board_shim, self.ring, telemetry=telemetry, buffer_size=BOARD_BUFFER_SIZE)
+        if writer is not None:
+            self.acquisition.add_listener(lambda data: writer.write('raw', data))
+        self.processing = ProcessingThread(self.ring, MAVProcessor(self.exg_channels[0], self.sampling_rate,
+                                                                   self.num_points - self.mav_window_data_size + 1,
+                                                                   self.mav_window_data_size, writer=writer),
+                                           interval=self.update_speed_ms / 1000, profiler=profiler, telemetry=telemetry,
+                                           timestamp_row=board_shim.get_timestamp_channel(self.board_id))
+        self.acquisition.start()
+        self.processing.start()
 
         self.app = QtWidgets.QApplication([])
         self.win = pg.GraphicsLayoutWidget(title='Real Time Plot - Mean Absolute Value', size=(800, 600))
@@ -62,7 +90,13 @@ class Graph:
         timer = QtCore.QTimer()
         timer.timeout.connect(self.update)
         timer.start(self.update_speed_ms)
-        QtWidgets.QApplication.instance().exec_()
+        try:
+            QtWidgets.QApplication.instance().exec_()
+        finally:
+            try:
+                self.acquisition.stop()
+            finally:
+                self.processing.stop()
 
     def _init_timeseries(self):
         self.plots = list()
@@ -86,43 +120,27 @@ class Graph:
         self.curves.append(curve_hori)
         self.curves.append(curve_hori_2)
 
-    def update(self):
-        data = self.board_shim.get_current_board_data(self.num_points)
-        target_channel = self.exg_channels[0]
-        target_data = data[target_channel]
-
-        DataFilter.detrend(target_data, DetrendOperations.CONSTANT.value)
-        # DataFilter.perform_highpass(target_data, self.sampling_rate, 1/125, 2,
-        #                                 FilterTypes.BUTTERWORTH.value, 0)
-        # DataFilter.remove_environmental_noise(target_data, self.sampling_rate, NoiseTypes.SIXTY.value)
-
-        target_data = filter_data(target_data)
-        
-        ## compute metric 
-        mavs = []
-        mav_window_data_size = 500
-        for i in range(len(target_data) - mav_window_data_size + 1):
-            mavs.append(getMAV(target_data[i: i + mav_window_data_size]))
-        
-        print(len(mavs))
-        ## save to csv 
-        save_data = data[:target_channel, :1] ## write_file takes 2D arrays, here is 1 number 2D array (1,1)
-        DataFilter.write_file(save_data, '/Users/jessysong/Documents/Github-Projects/CTS-early-detection/signal-processing/src/stream/sample_data.csv', 'a')  # use 'a' for append mode
-        save_mav = np.zeros((1, 1))
-        
-        if len(mavs)>mav_window_data_size: 
-            save_mav.fill(mavs[0])
-            DataFilter.write_file(save_mav, '/Users/jessysong/Documents/Github-Projects/CTS-early-detection/signal-processing/src/stream/sample_mav.csv', 'a')  # use 'a' for append mode
+        ## set line to hold force at, drawn once
+        num_mavs = self.num_points - self.mav_window_data_size + 1
+        curve_hori.setData(np.full(num_mavs, 150))
+        curve_hori_2.setData(np.full(num_mavs, 200))
 
+    def update(self):
+        if self.telemetry is not None:
+            self.telemetry.tick(self.update_speed_ms / 1000)
+        mavs, timestamp = self.processing.latest_with_timestamp()
+        if mavs is None or mavs is self.last_mavs:
+            if self.telemetry is not None:
+                self.telemetry.count('stale_ticks')
+            return
+        self.last_mavs = mavs
+
+        if len(mavs) == self.processing.process.mavs.capacity: 
             self.curves[0].setData(mavs)
-        
-        ## set line to hold force at 
-        target_mav = [150]*len(mavs)
-        target_mav_2 = [200]*len(mavs)
-        self.curves[1].setData(target_mav)
-        self.curves[2].setData(target_mav_2)
         self.win.show() # you need to add this  
         self.app.processEvents()
+        if self.telemetry is not None:
+            self.telemetry.record('latency', time.time() - timestamp)
 
 
 def main():
@@ -147,6 +165,23 @@ def main():
     parser.add_argument('--streamer-params', type=str, help='streamer params', required=False, default='')
     parser.add_argument('--master-board', type=int, help='master board id for streaming and playback boards',
                         required=False, default=BoardIds.NO_BOARD)
+    parser.add_argument('--replay', type=str, help='recording of openbci-data to replay instead of the board',
+                        required=False, default=None)
+    parser.add_argument('--replay-speed', type=float, help='speed of the replay, 0 for as fast as possible',
+                        required=False, default=1.0)
+    parser.add_argument('--telemetry-file', type=str, help='json file updated every second with the telemetry',
+                        required=False, default=None)
+    parser.add_argument('--telemetry-port', type=int, help='serve the telemetry on http://127.0.0.1:PORT/telemetry',
+                        required=False, default=None)
+    parser.add_argument('--output-dir', type=str, help='folder of the recorded sessions', required=False,
+                        default='openbci-data/sessions')
+    parser.add_argument('--output-format', type=str, help='format of the recorded data', required=False,
+                        default='csv', choices=['csv', 'bin'])
+    parser.add_argument('--flush-interval', type=float, help='seconds between two writes of the recorded data',
+                        required=False, default=1.0)
+    parser.add_argument('--rotate-mb', type=float, help='size in MB of the recorded files before a new one is started',
+                        required=False, default=64)
+    parser.add_argument('--profile', action='store_true', help='print the percentiles of the processing time at the end')
     args = parser.parse_args()
 
     params = BrainFlowInputParams()
@@ -161,21 +196,41 @@ def main():
     params.file = args.file
     params.master_board = args.master_board
 
+    writer = RecordingWriter(args.output_dir, fmt=args.output_format, flush_interval=args.flush_interval,
+                             rotate_bytes=int(args.rotate_mb * 2**20))
+    writer.start()
+    telemetry = None
+    board_shim = None
+    profiler = Profiler(sink=StageStats()) if args.profile else None
     try:
-        board_shim = BoardShim(args.board_id, params)
+        if args.replay:
+            board_shim = ReplayBoard(args.replay, speed=args.replay_speed, loop=True)
+        else:
+            board_shim = BoardShim(args.board_id, params)
         board_shim.prepare_session()
-        board_shim.start_stream(450000, args.streamer_params)
+        board_shim.start_stream(BOARD_BUFFER_SIZE, args.streamer_params)
 
         ## Try dummy board - only 1 data point or sth 
         # params = BrainFlowInputParams()
         # board_shim = BoardShim(BoardIds.SYNTHETIC_BOARD, params)
         # board_shim.prepare_session()
-        Graph(board_shim)
+        telemetry = Telemetry()
+        if args.telemetry_file:
+            telemetry.export_file(args.telemetry_file)
+        if args.telemetry_port:
+            telemetry.serve_http(args.telemetry_port)
+        Graph(board_shim, writer, telemetry, profiler)
     except BaseException:
         logging.warning('Exception', exc_info=True)
     finally:
         logging.info('End')
-        if board_shim.is_prepared():
+        writer.stop()
+        if telemetry is not None:
+            telemetry.stop()
+        logging.info('Session saved in %s (%d blocks dropped)', writer.session_dir, writer.dropped_blocks)
+        if profiler is not None:
+            logging.info('Processing times (ms):\n%s', profiler.sink.format())
+        if board_shim is not None and board_shim.is_prepared():
             logging.info('Releasing session')
             board_shim.release_session()
 
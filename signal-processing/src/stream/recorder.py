@@ -0,0 +1,110 @@
+import json
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+"""
+    Background writer for the realtime scripts. Blocks of samples (raw board data, feature traces)
+    are put in a bounded queue from any thread and written by a writer thread in batches, every
+    `flush_interval` seconds, so the acquisition never waits for the disk.
+    Each stream goes to its own files in the session folder, <stream>_000.csv, <stream>_001.csv, ...
+    with one sample per row; a new file is started when the current one reaches `rotate_bytes`.
+    Raw board data written as csv has the layout of the BrainFlow-RAW files (tab separated),
+    so it can be read back with src.recordings.loaders.
+"""
+
+
+class RecordingWriter(threading.Thread):
+    """ Writer thread of one recording session
+
+        :param output_dir: folder in which the session folder is created
+        :type output_dir: str
+        :param fmt: 'csv' (tab separated text) or 'bin' (float64, one row of columns per sample,
+                    the number of columns is in <stream>.json)
+        :type fmt: str
+        :param flush_interval: seconds between two writes
+        :type flush_interval: float
+        :param rotate_bytes: size above which the next block goes to a new file
+        :type rotate_bytes: int
+        :param max_blocks: size of the queue; blocks written when it is full are dropped and counted
+        :type max_blocks: int
+    """
+
+    def __init__(self, output_dir, fmt='csv', flush_interval=1.0, rotate_bytes=64 * 2**20, max_blocks=4096,
+                 session=None):
+        super().__init__(name='recorder', daemon=True)
+        if fmt not in ('csv', 'bin'):
+            raise ValueError("fmt must be 'csv' or 'bin'")
+        self.session_dir = os.path.join(output_dir, session or time.strftime('session_%Y-%m-%d_%H-%M-%S'))
+        os.makedirs(self.session_dir, exist_ok=True)
+        self.fmt = fmt
+        self.flush_interval = flush_interval
+        self.rotate_bytes = rotate_bytes
+        self.queue = queue.Queue(maxsize=max_blocks)
+        self.dropped_blocks = 0
+        self.written_bytes = 0
+        self._files = {}  # stream -> [file index, file size]
+        self._stop_event = threading.Event()
+
+    def write(self, stream, block):
+        """ Queue a block of samples, without blocking
+
+            :param stream: name of the stream, e.g. 'raw' or 'mav'
+            :type stream: str
+            :param block: (n_columns, n_samples) array, or (n_samples,) for a single trace
+        """
+        block = np.array(block, dtype=np.float64, ndmin=2)
+        try:
+            self.queue.put_nowait((stream, block))
+        except queue.Full:
+            self.dropped_blocks += 1
+
+    def stop(self, timeout=None):
+        """ Write the queued blocks and stop the thread """
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout)
+
+    def run(self):
+        while not self._stop_event.wait(self.flush_interval):
+            self.flush()
+        self.flush()
+
+    def flush(self):
+        """ Write all the queued blocks, one write per stream """
+        blocks = {}
+        while True:
+            try:
+                stream, block = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            blocks.setdefault(stream, []).append(block)
+        for stream, stream_blocks in blocks.items():
+            self._write_stream(stream, np.concatenate(stream_blocks, axis=1))
+
+    def _path(self, stream, index):
+        return os.path.join(self.session_dir, '%s_%03d.%s' % (stream, index, self.fmt))
+
+    def _write_stream(self, stream, data):
+        if stream not in self._files:
+            self._files[stream] = [0, 0]
+            if self.fmt == 'bin':
+                with open(os.path.join(self.session_dir, stream + '.json'), 'w') as f:
+                    json.dump({'n_columns': data.shape[0], 'dtype': 'float64'}, f)
+        state = self._files[stream]
+        if state[1] >= self.rotate_bytes:
+            state[0] += 1
+            state[1] = 0
+        path = self._path(stream, state[0])
+        if self.fmt == 'csv':
+            with open(path, 'a') as f:
+                np.savetxt(f, data.T, fmt='%.6f', delimiter='\t')
+        else:
+            with open(path, 'ab') as f:
+                np.ascontiguousarray(data.T).tofile(f)
+        size = os.path.getsize(path)
+        self.written_bytes += size - state[1]
+        state[1] = size
@@ -0,0 +1,207 @@
+import argparse
+import threading
+import time
+
+import numpy as np
+
+from src.recordings.loaders import iter_columns, read_metadata, EXG_COLUMNS, TIMESTAMP_COLUMN
+
+"""
+    Replay of a recorded session with the interface of BoardShim, to run the realtime scripts
+    without a board: a BrainFlow-RAW csv or OpenBCI-RAW txt of openbci-data is streamed at its
+    sampling rate, N times faster, or as fast as it is read, optionally in a loop.
+    The recordings are from the Cyton board, so the board data has its 24 rows.
+    Measure the throughput of the realtime pipeline on a recording with:
+    python -m src.stream.replay_board openbci-data/g20/g20_U1/<file>.csv --speed 0 --instances 4
+"""
+
+CYTON_BOARD = 0  # BoardIds.CYTON_BOARD
+NUM_ROWS = 24
+
+
+class ReplayBoard:
+    """ BoardShim-like board streaming a recording
+
+        :param path: path of a BrainFlow-RAW csv or OpenBCI-RAW txt file
+        :type path: str
+        :param speed: 1 for real time, N for N times faster, 0 for as fast as possible
+        :type speed: float
+        :param loop: start again from the beginning at the end of the recording
+        :type loop: bool
+        :param restamp: replace the recorded timestamps with the time at which the samples are replayed
+        :type restamp: bool
+        :param chunk: samples returned per get_board_data call when speed is 0
+        :type chunk: int
+        :param sampling_rate: sampling rate of the recording (read from the file when it has it)
+        :type sampling_rate: int
+    """
+
+    def __init__(self, path, speed=1.0, loop=False, restamp=True, chunk=250, sampling_rate=250):
+        self.path = path
+        self.speed = speed
+        self.loop = loop
+        self.restamp = restamp
+        self.chunk = chunk
+        self.sampling_rate = int(read_metadata(path)['sample_rate'] or sampling_rate)
+        self._data = None
+        self._lock = threading.Lock()
+        self._streaming = False
+        self.buffer_size = 0
+        self._produced = 0  # samples replayed so far
+        self._consumed = 0  # samples returned by get_board_data (or dropped)
+
+    # BoardShim class methods, here for the single board that is replayed
+
+    def get_board_id(self):
+        return CYTON_BOARD
+
+    def get_sampling_rate(self, board_id=None):
+        return self.sampling_rate
+
+    def get_exg_channels(self, board_id=None):
+        return list(EXG_COLUMNS)
+
+    def get_emg_channels(self, board_id=None):
+        return list(EXG_COLUMNS)
+
+    def get_timestamp_channel(self, board_id=None):
+        return TIMESTAMP_COLUMN
+
+    def get_num_rows(self, board_id=None):
+        return NUM_ROWS
+
+    # session
+
+    def prepare_session(self):
+        chunks = list(iter_columns(self.path, list(range(NUM_ROWS))))
+        if not chunks:
+            raise ValueError('%s has no samples' % self.path)
+        self._data = np.ascontiguousarray(np.concatenate(chunks).T)
+        self._start = time.perf_counter()
+        self._wall_start = time.time()
+        self._produced = self._consumed = 0
+
+    def is_prepared(self):
+        return self._data is not None
+
+    def release_session(self):
+        self.stop_stream()
+        self._data = None
+
+    def start_stream(self, num_samples=450000, streamer_params=''):
+        """ Start the replay; the board keeps at most num_samples samples that were not read """
+        if self._data is None:
+            raise RuntimeError('prepare_session must be called before start_stream')
+        self.buffer_size = num_samples
+        self._start = time.perf_counter()
+        self._wall_start = time.time()
+        self._produced = self._consumed = 0
+        self._streaming = True
+
+    def stop_stream(self):
+        self._streaming = False
+
+    def _update(self):
+        n = self._data.shape[1]
+        if self.speed:
+            target = int((time.perf_counter() - self._start) * self.sampling_rate * self.speed)
+        else:
+            target = self._consumed + self.chunk
+        if not self.loop:
+            target = min(target, n)
+        self._produced = max(self._produced, target)
+        self._consumed = max(self._consumed, self._produced - self.buffer_size)
+
+    def _samples(self, start, stop):
+        index = np.arange(start, stop)
+        data = self._data[:, index % self._data.shape[1]]
+        if self.restamp:
+            if self.speed:
+                data[TIMESTAMP_COLUMN] = self._wall_start + index / (self.sampling_rate * self.speed)
+            else:
+                data[TIMESTAMP_COLUMN] = time.time()
+        elif self.loop:
+            duration = self._data.shape[1] / self.sampling_rate
+            data[TIMESTAMP_COLUMN] += (index // self._data.shape[1]) * duration
+        return data
+
+    def get_board_data_count(self):
+        with self._lock:
+            if self._streaming:
+                self._update()
+            return self._produced - self._consumed
+
+    def get_board_data(self, num_samples=None):
+        """ Samples replayed since the last call (or the oldest num_samples of them), removed from the board """
+        with self._lock:
+            if self._streaming:
+                self._update()
+            stop = self._produced if num_samples is None else min(self._produced, self._consumed + num_samples)
+            data = self._samples(self._consumed, stop)
+            self._consumed = stop
+            return data
+
+    def get_current_board_data(self, num_samples):
+        """ Last num_samples replayed samples, left on the board """
+        with self._lock:
+            if self._streaming:
+                self._update()
+            return self._samples(max(self._produced - num_samples, 0), self._produced)
+
+    def finished(self):
+        """ True when a replay without loop has returned all the samples of the recording """
+        with self._lock:
+            return not self.loop and self._consumed >= self._data.shape[1]
+
+
+def measure_throughput(path, speed=0, seconds=5.0, window_seconds=1.0):
+    """ Run the feature pipeline of the feature server on a replay, in the calling thread
+
+        :return: samples processed per second and mean latency (s) between replay and end of processing
+        :rtype: tuple
+    """
+    from src.stream.feature_server import FeatureProcessor
+
+    board = ReplayBoard(path, speed=speed, loop=True)
+    board.prepare_session()
+    board.start_stream()
+    processor = FeatureProcessor(board.get_exg_channels(), board.sampling_rate, TIMESTAMP_COLUMN, window_seconds)
+    samples = 0
+    latencies = []
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        data = board.get_board_data()
+        if data.shape[1]:
+            result = processor(data)
+            samples += data.shape[1]
+            latencies.append(time.time() - result['time'])
+        elif speed:
+            time.sleep(0.005)
+    board.release_session()
+    return samples / (time.perf_counter() - start), float(np.mean(latencies)) if latencies else float('nan')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay a recording through the realtime feature pipeline')
+    parser.add_argument('path', type=str, help='BrainFlow-RAW csv or OpenBCI-RAW txt file')
+    parser.add_argument('--speed', type=float, default=0, help='1 for real time, N for N times faster, 0 for as fast as possible')
+    parser.add_argument('--instances', type=int, default=1, help='replays run in parallel threads')
+    parser.add_argument('--seconds', type=float, default=5.0, help='duration of the measure')
+    args = parser.parse_args()
+
+    results = [None] * args.instances
+
+    def run(i):
+        results[i] = measure_throughput(args.path, args.speed, args.seconds)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(args.instances)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for i, (rate, latency) in enumerate(results):
+        print('replay %d: %.0f samples/s, latency %.1f ms' % (i, rate, latency * 1000))
+
+
+if __name__ == '__main__':
+    main()
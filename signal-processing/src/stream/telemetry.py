@@ -0,0 +1,160 @@
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+"""
+    Telemetry of the realtime loop: latency from the board timestamp of a sample to its display,
+    GUI tick interval and jitter, processing time and samples per step, late and stale ticks,
+    samples lost by the ring buffer and occupancy of the board buffer.
+    Every measure keeps its last values in a RollingStat (count, mean, percentiles, histogram);
+    a snapshot of all of them can be written to a json file periodically or served over http:
+
+        python -m src.stream.plot_realtime --telemetry-file telemetry.json --telemetry-port 8766
+        curl http://127.0.0.1:8766/telemetry
+"""
+
+PERCENTILES = (50, 90, 99)
+
+
+class RollingStat:
+    """ Last `capacity` values of a measure, in a circular buffer
+
+        :param capacity: number of values kept
+        :type capacity: int
+    """
+
+    def __init__(self, capacity=2048):
+        self._values = np.full(capacity, np.nan)
+        self.count = 0  # values added since the start, kept or not
+
+    def add(self, value):
+        self._values[self.count % len(self._values)] = value
+        self.count += 1
+
+    def values(self):
+        return self._values[:min(self.count, len(self._values))]
+
+    def histogram(self, bins=10):
+        """ Counts and bin edges of the kept values """
+        values = self.values()
+        if not len(values):
+            return [], []
+        counts, edges = np.histogram(values, bins=bins)
+        return counts.tolist(), edges.tolist()
+
+    def summary(self, percentiles=PERCENTILES, bins=10):
+        values = self.values()
+        summary = {'count': self.count}
+        if len(values):
+            summary.update(mean=float(values.mean()), max=float(values.max()))
+            summary.update(('p%g' % p, float(v)) for p, v in zip(percentiles, np.percentile(values, percentiles)))
+            summary['histogram'], summary['edges'] = self.histogram(bins)
+        return summary
+
+
+class Telemetry:
+    """ Rolling statistics and counters of the realtime loop, safe to update from several threads
+
+        Measures used by the realtime scripts (seconds unless stated otherwise):
+        latency (board timestamp of the newest displayed sample to display), tick_interval,
+        tick_jitter (interval minus the nominal interval), processing, samples_per_step,
+        samples_per_read and board_occupancy (fraction of the board buffer in use).
+        Counters: late_ticks (interval above 1.5 times the nominal one), stale_ticks (no new
+        result to display) and lost_samples (overwritten in the ring buffer before processing).
+
+        :param capacity: values kept by each measure
+        :type capacity: int
+    """
+
+    def __init__(self, capacity=2048):
+        self.capacity = capacity
+        self.stats = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+        self._last_tick = None
+        self._start = time.time()
+        self._exporters = []
+
+    def record(self, name, value):
+        with self._lock:
+            if name not in self.stats:
+                self.stats[name] = RollingStat(self.capacity)
+            self.stats[name].add(value)
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def tick(self, nominal_interval, now=None):
+        """ Record the interval since the previous tick of the GUI timer and its jitter """
+        now = time.perf_counter() if now is None else now
+        if self._last_tick is not None:
+            interval = now - self._last_tick
+            self.record('tick_interval', interval)
+            self.record('tick_jitter', interval - nominal_interval)
+            if interval > 1.5 * nominal_interval:
+                self.count('late_ticks')
+        self._last_tick = now
+
+    def snapshot(self):
+        """ Summary of every measure and the counters, as a json-serializable dict """
+        with self._lock:
+            return {'time': time.time(), 'uptime': time.time() - self._start,
+                    'counters': dict(self.counters),
+                    'stats': {name: stat.summary() for name, stat in self.stats.items()}}
+
+    def write(self, path):
+        """ Write the snapshot as json, replacing the file atomically """
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.snapshot(), f, indent=1)
+        os.replace(tmp, path)
+
+    def export_file(self, path, interval=1.0):
+        """ Write the snapshot to path every interval seconds, in a daemon thread """
+        stop = threading.Event()
+
+        def run():
+            while not stop.wait(interval):
+                self.write(path)
+            self.write(path)
+
+        thread = threading.Thread(target=run, name='telemetry-file', daemon=True)
+        thread.start()
+        self._exporters.append((stop.set, thread))
+
+    def serve_http(self, port=8766, host='127.0.0.1'):
+        """ Serve the snapshot as json on http://host:port/telemetry, in a daemon thread """
+        telemetry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip('/') not in ('', '/telemetry'):
+                    self.send_error(404)
+                    return
+                body = json.dumps(telemetry.snapshot()).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        thread = threading.Thread(target=server.serve_forever, name='telemetry-http', daemon=True)
+        thread.start()
+        self._exporters.append((server.shutdown, thread))
+        return server
+
+    def stop(self):
+        """ Stop the exporters (the file is written one last time) """
+        for stop, thread in self._exporters:
+            stop()
+            thread.join()
+        self._exporters = []
@@ -0,0 +1,157 @@
+import numpy as np
+
+"""
+    Direct, loop-based definitions of the features and of the phasic filter, as they were
+    written before the descriptors were vectorized. The tests compare the optimized
+    implementations of src.analyze against them.
+"""
+
+
+def IEMG(x):
+    return sum(abs(v) for v in x)
+
+
+def MAV(x):
+    return IEMG(x) / len(x)
+
+
+def MAV1(x):
+    N = len(x)
+    low, high = int(0.25 * N), int(0.75 * N)
+    return (0.5 * sum(abs(v) for v in x[:low]) + sum(abs(v) for v in x[low:high])
+            + 0.5 * sum(abs(v) for v in x[high:])) / N
+
+
+def MAV2(x):
+    N = len(x)
+    low, high = int(0.25 * N), int(0.75 * N)
+    total = 0
+    for i in range(N):
+        if i < low:
+            total += abs(x[i] * (4 * i / N))
+        elif i <= high:
+            total += abs(x[i])
+        else:
+            total += abs(x[i]) * (4 * (i - N) / N)
+    return total / N
+
+
+def SSI(x):
+    return sum(v ** 2 for v in x)
+
+
+def VAR(x):
+    return SSI(x) / (len(x) - 1)
+
+
+def TM(x, order):
+    return abs(sum(v ** order for v in x) / len(x))
+
+
+def RMS(x):
+    return np.sqrt(SSI(x) / len(x))
+
+
+def LOG(x):
+    return np.exp(MAV(x))
+
+
+def WL(x):
+    return sum(abs(x[i + 1] - x[i]) for i in range(len(x) - 1))
+
+
+def AAC(x):
+    return WL(x) / len(x)
+
+
+def DASDV(x):
+    return sum((x[i + 1] - x[i]) ** 2 for i in range(len(x) - 1)) / (len(x) - 1)
+
+
+def ZC(x, threshold):
+    positive = x[0] > threshold
+    count = 0
+    for v in x[1:]:
+        if positive and v < -threshold:
+            positive = False
+            count += 1
+        elif not positive and v > threshold:
+            positive = True
+            count += 1
+    return count
+
+
+def MYOP(x, threshold):
+    return len([1 for v in x if abs(v) >= threshold]) / len(x)
+
+
+def WAMP(x, threshold):
+    return sum(1 for i in range(len(x) - 1) if x[i] - x[i + 1] >= threshold)
+
+
+def SSC(x, threshold):
+    count = 0
+    for i in range(1, len(x) - 1):
+        a, b, c = x[i - 1], x[i], x[i + 1]
+        if a + b + c >= threshold * 3 and (a < b > c or a > b < c):
+            count += 1
+    return count
+
+
+TIME = {
+    'IEMG': IEMG, 'MAV': MAV, 'MAV1': MAV1, 'MAV2': MAV2, 'SSI': SSI, 'VAR': VAR,
+    'TM3': lambda x: TM(x, 3), 'TM4': lambda x: TM(x, 4), 'TM5': lambda x: TM(x, 5),
+    'LOG': LOG, 'RMS': RMS, 'WL': WL, 'AAC': AAC, 'DASDV': DASDV,
+}
+THRESHOLDED = {'ZC': ZC, 'MYOP': MYOP, 'WAMP': WAMP, 'SSC': SSC}
+
+
+def _nearest(frequencies, target):
+    return frequencies.index(min(frequencies, key=lambda f: abs(f - target)))
+
+
+def MNF(P, f):
+    return sum(f[i] * P[i] for i in range(len(f))) / sum(P)
+
+
+def MDF(P, f):
+    half = sum(P) / 2
+    for i in range(1, len(P)):
+        if sum(P[0:i]) >= half:
+            return f[i]
+    return np.nan
+
+
+def SM(P, f, order):
+    return sum(f[j] * P[j] ** order for j in range(len(f)))
+
+
+def _band(P, f, low, high):
+    """ Power of the bins between the bins nearest to low and high, NaN for an empty band """
+    start, stop = _nearest(f, low), _nearest(f, high)
+    return sum(P[start:stop]) if stop > start else np.nan
+
+
+def FR(P, f, llc=30, ulc=250, lhc=250, uhc=500):
+    f = list(f)
+    return _band(P, f, llc, ulc) / _band(P, f, lhc, uhc)
+
+
+def PSR(P, f, n=20, fmin=10, fmax=500):
+    f = list(f)
+    peak = f[int(np.argmax(P))]
+    return _band(P, f, peak - n, peak + n) / _band(P, f, fmin, fmax)
+
+
+def phasicFilter(x, samplerate, seconds=4):
+    """ Each sample minus the median of [i - W, i + W), [i, i + W) or [i - W, i) near the ends """
+    W = int(seconds * samplerate)
+    output = []
+    for i in range(len(x)):
+        smin, smax = i - W, i + W
+        if smin < 0:
+            smin = i
+        if smax > len(x):
+            smax = i
+        output.append(x[i] - np.median(x[smin:smax]) if smax > smin else np.nan)
+    return np.array(output)
@@ -0,0 +1,118 @@
+import time
+
+import numpy as np
+import pytest
+
+from src.stream.acquisition import AcquisitionThread, ProcessingThread, RingBuffer
+
+
+class Board:
+    """ Board whose get_board_data returns the next block of a signal at each call """
+
+    def __init__(self, data, block):
+        self.data = data
+        self.block = block
+        self.read = 0
+
+    def get_board_data(self):
+        chunk = self.data[:, self.read:self.read + self.block]
+        self.read += chunk.shape[1]
+        return chunk
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        assert time.perf_counter() < deadline
+        time.sleep(0.001)
+
+
+@pytest.fixture
+def samples():
+    return np.arange(2 * 100, dtype=float).reshape(2, 100)
+
+
+def test_ring_buffer_wraps_around(samples):
+    ring = RingBuffer(2, 10)
+    assert ring.latest(5).shape == (2, 0)
+    start = 0
+    for size in [3, 0, 7, 4, 9, 1, 25, 6]:
+        ring.write(samples[:, start:start + size])
+        start += size
+        assert ring.written == start
+        for n in (1, 5, 10, 20):
+            np.testing.assert_array_equal(ring.latest(n), samples[:, max(start - min(n, 10), 0):start])
+
+
+def test_read_since_counts_the_overwritten_samples(samples):
+    ring = RingBuffer(2, 10)
+    ring.write(samples[:, :6])
+    chunk, position, lost = ring.read_since(0)
+    np.testing.assert_array_equal(chunk, samples[:, :6])
+    assert (position, lost) == (6, 0)
+    ring.write(samples[:, 6:10])
+    chunk, position, lost = ring.read_since(position)
+    np.testing.assert_array_equal(chunk, samples[:, 6:10])
+    assert (position, lost) == (10, 0)
+    # 14 new samples in a buffer of 10: the 4 oldest were lost
+    ring.write(samples[:, 10:17])
+    ring.write(samples[:, 17:24])
+    chunk, position, lost = ring.read_since(position)
+    np.testing.assert_array_equal(chunk, samples[:, 14:24])
+    assert (position, lost) == (24, 4)
+    chunk, position, lost = ring.read_since(position)
+    assert chunk.shape == (2, 0) and (position, lost) == (24, 0)
+
+
+def test_acquisition_moves_every_block_to_the_ring_and_listeners(samples):
+    ring = RingBuffer(2, 100)
+    blocks = []
+    acquisition = AcquisitionThread(Board(samples, 7), ring, interval=0.001)
+    acquisition.add_listener(blocks.append)
+    acquisition.start()
+    wait_for(lambda: ring.written == 100)
+    acquisition.stop()
+    assert not acquisition.is_alive()
+    np.testing.assert_array_equal(ring.latest(100), samples)
+    np.testing.assert_array_equal(np.concatenate(blocks, axis=1), samples)
+
+
+def test_processing_stop_processes_the_last_samples(samples):
+    ring = RingBuffer(2, 100)
+    ring.write(samples[:, :30])
+    processing = ProcessingThread(ring, lambda chunk: chunk, interval=60, timestamp_row=1)
+    assert processing.latest_with_timestamp() == (None, None)
+    processing.start()
+    wait_for(lambda: processing.latest() is not None)
+    np.testing.assert_array_equal(processing.latest(), samples[:, :30])
+    # written while the thread waits for its next step: only the final step sees them
+    ring.write(samples[:, 30:45])
+    processing.stop()
+    result, timestamp = processing.latest_with_timestamp()
+    np.testing.assert_array_equal(result, samples[:, 30:45])
+    assert timestamp == samples[1, 44]
+    assert processing.position == 45 and processing.lost_samples == 0
+
+
+def test_processing_counts_lost_samples(samples):
+    ring = RingBuffer(2, 10)
+    ring.write(samples[:, :25])
+    processing = ProcessingThread(ring, lambda chunk: chunk.shape[1])
+    processing.step()
+    assert processing.latest() == 10 and processing.lost_samples == 15
+
+
+def test_step_error_stops_the_thread_and_is_raised_by_stop(samples, caplog):
+    def process(chunk):
+        raise ZeroDivisionError('bad chunk')
+
+    ring = RingBuffer(2, 100)
+    ring.write(samples)
+    processing = ProcessingThread(ring, process, interval=0.001)
+    processing.start()
+    processing.join(5)
+    assert not processing.is_alive()
+    assert isinstance(processing.error, ZeroDivisionError)
+    assert 'processing thread stopped' in caplog.text
+    with pytest.raises(ZeroDivisionError, match='bad chunk'):
+        processing.stop()
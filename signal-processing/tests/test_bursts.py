@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from src.analyze.bursts import getBursts, getEnergyEnvelope
+from src.analyze.emg_processing import analyzeEMG
+from src.analyze.time_descriptors import getAFB, getTimeFeatures
+
+FS = 250
+
+
+def contractions(n_channels=3, seed=0):
+    """ 10 contractions of 1 s every 2.5 s over a low noise floor, with their onsets """
+    rng = np.random.default_rng(seed)
+    x = rng.normal(size=(n_channels, 25 * FS)) * 2
+    onsets = [int((1 + 2.5 * k) * FS) for k in range(10)]
+    for onset in onsets:
+        x[:, onset:onset + FS] += rng.normal(size=(n_channels, FS)) * 40
+    return x, onsets
+
+
+def test_envelope_window_is_windowsize_in_samples():
+    # 32 ms at 250 Hz is 8 samples
+    assert getEnergyEnvelope(np.ones(100), FS).shape == (93,)
+    np.testing.assert_allclose(getEnergyEnvelope(np.full(100, 3.0), FS), 9.0)
+
+
+def test_onsets_offsets_and_afb():
+    x, onsets = contractions()
+    bursts = getBursts(x, FS)
+    assert bursts.channel.tolist() == [c for c in range(3) for _ in onsets]
+    for c in range(3):
+        mask = bursts.channel == c
+        np.testing.assert_allclose(bursts.onset[mask], onsets, atol=8)  # within one envelope window
+        np.testing.assert_allclose(bursts.duration[mask], 1.0, atol=0.05)
+        first = np.flatnonzero(mask)[0]
+        assert bursts.AFB[c] == bursts.amplitude[first]
+        # AFB is the maximum of the envelope inside the first burst
+        envelope = getEnergyEnvelope(x[c], FS)
+        shift = (8 - 1) // 2
+        assert bursts.AFB[c] == envelope[bursts.onset[first] - shift:bursts.offset[first] - shift].max()
+    np.testing.assert_array_equal(getAFB(x, FS), bursts.AFB)
+    assert getAFB(x[1], FS) == bursts.AFB[1]
+
+
+@pytest.mark.parametrize('signal', [np.zeros(1000), np.ones(1000), np.full(1000, np.nan), np.zeros(5), np.zeros(0)],
+                         ids=['zeros', 'constant', 'nan', 'shorter than the window', 'empty'])
+def test_no_burst(signal):
+    bursts = getBursts(signal, FS)
+    assert len(bursts.onset) == len(bursts.offset) == len(bursts.amplitude) == 0
+    assert np.isnan(bursts.AFB)
+    assert np.isnan(getAFB(signal, FS))
+
+
+def test_no_burst_in_some_channels():
+    x, onsets = contractions(2)
+    x = np.concatenate([x, np.zeros((1, x.shape[1]))])
+    AFB = getAFB(x, FS)
+    assert np.isfinite(AFB[:2]).all() and np.isnan(AFB[2])
+    assert np.isnan(getTimeFeatures(np.zeros((2, 400)), FS)['AFB']).all()
+
+
+def test_analyze_emg_short_signal():
+    # phasicFilter gives NaN for signals shorter than its 4 s window, so there is no burst to find
+    result = analyzeEMG(np.random.default_rng(0).normal(size=500), FS)
+    assert np.isnan(result['TimeDomain']['AFB'])
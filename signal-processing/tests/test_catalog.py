@@ -0,0 +1,48 @@
+import os
+
+import pytest
+
+from src.recordings.catalog import discover_recordings, parse_recording_name
+
+
+@pytest.mark.parametrize('name, mvc, trial', [
+    ('BrainFlow-RAW_2023-02-10_11-35-44_4_50_1.csv', 50, 1),
+    ('BrainFlow-RAW_2023-02-10_11-35-44_0_T100_1.csv', 100, 1),
+    ('BrainFlow-RAW_2023-02-10_11-35-44_1_KL_80_1.csv', 80, 1),
+    ('BrainFlow-RAW_2023-02-10_11-35-44_10_J10_2.csv', 10, 2),
+    ('BrainFlow-RAW_2023-02-10_11-21-30_0._N100_2.csv', 100, 2),
+    ('BrainFlow-RAW_2023-02-28_15-56-52_20_1csv.csv', 20, 1),
+    ('BrainFlow-RAW_2023-02-28_15-56-52_100-2.csv', 100, 2),
+])
+def test_brainflow_names(name, mvc, trial):
+    info = parse_recording_name(os.path.join('openbci-data', 'g20', 'g20_U4', name))
+    assert (info['format'], info['group'], info['subject'], info['mvc'], info['trial']) == (
+        'brainflow', 'g20', 'U4', mvc, trial)
+    assert info['file'] == name
+
+
+def test_other_names():
+    info = parse_recording_name(os.path.join('g50', 'g50_U2', 'OpenBCI-RAW-2023-02-09_15-47-14.txt'))
+    assert (info['format'], info['group'], info['subject'], info['mvc'], info['trial']) == (
+        'openbci', 'g50', 'U2', None, None)
+    # no mvc and trial at the end of the name, and a folder outside of the group layout
+    info = parse_recording_name(os.path.join('sessions', 'BrainFlow-RAW_2023-02-10_11-35-44.csv'))
+    assert (info['format'], info['group'], info['subject'], info['mvc'], info['trial']) == (
+        'brainflow', None, None, None, None)
+    for name in ('BrainFlow-RAW_2023-02-10_11-35-44_4_50_1.png', 'OpenBCI-RAW-2023-02-09.csv', 'notes_4_50_1.csv'):
+        assert parse_recording_name(os.path.join('g20', 'g20_U1', name))['format'] is None
+
+
+def test_discover_recordings(tmp_path):
+    prefix = 'BrainFlow-RAW_2023-02-10_11-35-44_'
+    names = {'g20_U2': [prefix + '2_80_1.csv', prefix + '0_100_1.csv', 'plot.png'],
+             'g20_U1': ['OpenBCI-RAW-2023-02-09_15-47-14.txt', prefix + '4_50_2.csv', prefix + '3_50_1.csv']}
+    for folder, files in names.items():
+        (tmp_path / 'g20' / folder).mkdir(parents=True)
+        for name in files:
+            (tmp_path / 'g20' / folder / name).write_text('')
+    recordings = discover_recordings(str(tmp_path / 'g20'))
+    assert [(r['subject'], r['format'], r['mvc'], r['trial']) for r in recordings] == [
+        ('U1', 'brainflow', 50, 1), ('U1', 'brainflow', 50, 2), ('U1', 'openbci', None, None),
+        ('U2', 'brainflow', 80, 1), ('U2', 'brainflow', 100, 1)]
+    assert len(discover_recordings([str(tmp_path / 'g20')], formats=('openbci',))) == 1
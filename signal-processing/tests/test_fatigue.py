@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+
+from src.analyze.fatigue import FatigueTracker, trackFatigue
+from src.analyze.spectrogram import getSegmentSpectra
+
+FS = 250
+
+
+def drifting(seconds=40, start=80.0, stop=40.0, n_channels=2, seed=6):
+    """ A sine whose frequency drifts linearly from start to stop Hz, over white noise """
+    t = np.arange(int(seconds * FS)) / FS
+    frequency = start + (stop - start) * t / seconds
+    phase = 2 * np.pi * np.cumsum(frequency) / FS
+    rng = np.random.default_rng(seed)
+    return np.sin(phase) * 10 + rng.normal(size=(n_channels, len(t)))
+
+
+def test_chunks_match_one_call():
+    x = drifting()
+    expected = trackFatigue(x, FS, emitEvery=2)
+    tracker = FatigueTracker(FS, emitEvery=2)
+    outputs, start = [], 0
+    for size in [1, 100, 0, 127, 600, 3] * 100:
+        outputs.append(tracker.process(x[:, start:start + size]))
+        start += size
+    for name, values in expected.items():
+        streamed = np.concatenate([output[name] for output in outputs], axis=-1)
+        np.testing.assert_allclose(streamed, values, rtol=1e-9, atol=1e-12, equal_nan=True, err_msg=name)
+
+
+def test_values_follow_the_averaged_periodograms():
+    x = drifting(seconds=10, n_channels=1)[0]
+    tracker = FatigueTracker(FS, averaging=1.0)
+    results = tracker.process(x)
+    spectra, frequencies, starts = getSegmentSpectra(x, FS, 256)
+    average = spectra[0].copy()
+    for k in range(1, len(starts)):
+        average += tracker.alpha * (spectra[k] - average)
+    assert results['time'][-1] == (starts[-1] + 256) / FS
+    assert results['MNF'][-1] == pytest.approx((average @ frequencies) / average.sum())
+    assert results['PeakFrequency'][-1] == frequencies[np.argmax(average)]
+
+
+def test_slope_of_a_drifting_spectrum():
+    # -1 Hz/s drift of the dominant frequency
+    results = trackFatigue(drifting(), FS, horizon=10.0)
+    late = results['time'] > 20
+    np.testing.assert_allclose(results['MNFSlope'][:, late], -1.0, atol=0.3)
+    np.testing.assert_allclose(results['MDFSlope'][:, late], -1.0, atol=0.3)
+    assert np.isnan(results['MNFSlope'][:, 0]).all()  # one point: no slope yet
+
+
+def test_slopes_after_a_flat_start():
+    # a stream that starts flat (board warm-up) gives NaN MNF first; the slopes must recover
+    tracker = FatigueTracker(FS, horizon=5.0)
+    rng = np.random.default_rng(8)
+    with np.errstate(invalid='ignore'):
+        outputs = [tracker.process(np.zeros((2, 1000)))]
+    assert np.isnan(outputs[0]['MNF']).all() and np.isnan(outputs[0]['MNFSlope']).all()
+    outputs += [tracker.process(rng.normal(size=(2, 250))) for _ in range(30)]
+    t = np.concatenate([output['time'] for output in outputs])
+    for name in ('MNF', 'MDF'):
+        values = np.concatenate([output[name] for output in outputs], axis=-1)
+        slopes = np.concatenate([output[name + 'Slope'] for output in outputs], axis=-1)
+        assert np.isfinite(slopes[:, -20:]).all()
+        for k in range(len(t)):
+            window = slice(max(k + 1 - tracker.horizonPoints, 0), k + 1)
+            for c in range(2):
+                valid = np.isfinite(values[c, window])
+                if valid.sum() < 2:
+                    assert np.isnan(slopes[c, k])
+                else:
+                    expected = np.polyfit(t[window][valid], values[c, window][valid], 1)[0]
+                    assert slopes[c, k] == pytest.approx(expected, rel=1e-6, abs=1e-9)
+
+
+def test_no_complete_segment():
+    results = trackFatigue(np.zeros((3, 100)), FS)
+    assert results['time'].shape == (0,)
+    assert results['MNF'].shape == results['MDFSlope'].shape == (3, 0)
+
+
+def test_flat_signal():
+    with np.errstate(invalid='ignore'):
+        results = trackFatigue(np.zeros(2000), FS)
+    # no power: MNF is 0 / 0, and MDF is the first bin past DC, as getMDF gives
+    assert np.isnan(results['MNF']).all()
+    assert (results['MDF'] == FS / 256).all()
+
+
+def test_rejects_other_channels():
+    tracker = FatigueTracker(FS)
+    tracker.process(np.zeros((2, 10)))
+    with pytest.raises(ValueError):
+        tracker.process(np.zeros(10))
+    with pytest.raises(ValueError):
+        FatigueTracker(FS, nperseg=128, noverlap=128)
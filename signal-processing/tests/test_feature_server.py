@@ -0,0 +1,80 @@
+import asyncio
+import json
+import os
+import socket
+import threading
+import time
+
+from src.stream.feature_server import FeatureServer, read_features, run_server
+from src.stream.replay_board import ReplayBoard
+
+RECORDING = os.path.join('openbci-data', 'g20', 'g20_U1', 'BrainFlow-RAW_2023-02-10_11-35-44_0_T100_1.csv')
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+async def connect(port, timeout=5.0):
+    # the server starts listening once its thread is running
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            return await asyncio.open_connection('127.0.0.1', port)
+        except ConnectionError:
+            if time.perf_counter() > deadline:
+                raise
+            await asyncio.sleep(0.05)
+
+
+async def read_messages(port, count):
+    reader, writer = await connect(port)
+    try:
+        return [json.loads(await reader.readline()) for _ in range(count)]
+    finally:
+        writer.close()
+
+
+def test_server_publishes_features_of_a_replay(capsys):
+    board = ReplayBoard(RECORDING, speed=4, loop=True)
+    board.prepare_session()
+    board.start_stream()
+    port = free_port()
+    servers = []
+    thread = threading.Thread(target=lambda: servers.append(run_server(
+        board, board.get_num_rows(), board.get_exg_channels(), board.sampling_rate, board.get_timestamp_channel(),
+        port=port, rate=20, duration=2.0)))
+    thread.start()
+    try:
+        messages = asyncio.run(read_messages(port, 5))
+        assert asyncio.run(read_features(port=port, count=5)) == 5
+    finally:
+        thread.join()
+        board.release_session()
+
+    assert len(capsys.readouterr().out.splitlines()) == 5
+    seqs = [message['seq'] for message in messages]
+    assert seqs == sorted(set(seqs)) and seqs[0] >= 1
+    for message in messages:
+        assert set(message) == {'seq', 'time', 'samples', 'lost_samples', 'channels', 'MAV', 'RMS', 'MDF'}
+        assert message['channels'] == board.get_exg_channels()
+        assert message['lost_samples'] == 0
+        assert message['samples'] > 0
+        for name in ('MAV', 'RMS', 'MDF'):
+            assert len(message[name]) == 8
+        assert all(v is not None and v >= 0 for v in message['RMS'])
+    # restamped replay: the time of the last sample is the time it was replayed
+    assert abs(messages[-1]['time'] - time.time()) < 5
+    assert servers[0].dropped_messages == 0
+
+
+def test_slow_client_loses_the_oldest_messages():
+    server = FeatureServer(None, client_queue=3)
+    queue = asyncio.Queue(maxsize=3)
+    server.clients.add(queue)
+    for seq in range(1, 6):
+        server.publish({'seq': seq, 'MAV': [None]})
+    assert server.dropped_messages == 2
+    assert [json.loads(queue.get_nowait())['seq'] for _ in range(3)] == [3, 4, 5]
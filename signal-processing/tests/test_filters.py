@@ -0,0 +1,105 @@
+import numpy as np
+import pytest
+from scipy.signal import butter, filtfilt, iirnotch, lfilter, sosfilt, sosfiltfilt
+
+import reference
+from src.analyze.batch_analysis import filter_data
+from src.analyze.filters import (BandpassFilter, FilterCascade, HighpassFilter, LowpassFilter, NotchFilter,
+                                 StreamingFilter, butter_highpass_filter, butter_lowpass, butter_lowpass_filter,
+                                 cascade_filter, cascade_sos, design_filter)
+from src.analyze.freq_descriptors import PhasicFilter, phasicFilter
+
+FS = 250
+
+
+@pytest.fixture
+def signals():
+    return np.random.default_rng(3).normal(size=(2, 3000))
+
+
+def chunked(process, x, sizes=(1, 7, 250, 0, 33)):
+    """ Output of process() over chunks of the given sizes (cycled), concatenated """
+    outputs, start, k = [], 0, 0
+    while start < x.shape[-1]:
+        size = sizes[k % len(sizes)]
+        outputs.append(process(x[..., start:start + size]))
+        start += size
+        k += 1
+    return np.concatenate(outputs, axis=-1)
+
+
+@pytest.mark.parametrize('make', [lambda: LowpassFilter(50, FS), lambda: HighpassFilter(20, FS),
+                                  lambda: BandpassFilter(20, 100, FS, 4), lambda: NotchFilter(FS, 60)],
+                         ids=['lowpass', 'highpass', 'bandpass', 'notch'])
+def test_streaming_filter_matches_sosfilt(signals, make):
+    expected = sosfilt(make().sos, signals, axis=-1)
+    np.testing.assert_allclose(chunked(make().process, signals), expected, rtol=1e-10, atol=1e-12)
+    # one channel
+    np.testing.assert_allclose(chunked(make().process, signals[0]), expected[0], rtol=1e-10, atol=1e-12)
+
+
+def test_filter_cascade_matches_sequential_filters(signals):
+    cascade = FilterCascade(HighpassFilter(20, FS), LowpassFilter(100, FS), NotchFilter(FS, 60))
+    expected = sosfilt(design_filter('notch', None, 60, FS),
+                       sosfilt(design_filter('lowpass', 2, 100, FS),
+                               sosfilt(design_filter('highpass', 2, 20, FS), signals)))
+    np.testing.assert_allclose(chunked(cascade.process, signals), expected, rtol=1e-9, atol=1e-12)
+    cascade.reset()
+    np.testing.assert_allclose(cascade.process(signals), expected, rtol=1e-9, atol=1e-12)
+
+
+def test_streaming_filter_rejects_other_channels(signals):
+    f = StreamingFilter(design_filter('lowpass', 2, 50, FS))
+    f.process(signals[:, :10])
+    with pytest.raises(ValueError):
+        f.process(signals[0, 10:20])
+
+
+def test_cascade_filter(signals):
+    sos = cascade_sos(FS, 20, 100, 60)
+    np.testing.assert_array_equal(cascade_filter(signals, FS, 20, 100, 60), sosfilt(sos, signals))
+    np.testing.assert_array_equal(cascade_filter(signals, FS, 20, 100, 60, zero_phase=True), sosfiltfilt(sos, signals))
+    with pytest.raises(ValueError):
+        cascade_sos(FS)
+
+
+def test_butter_filters_match_transfer_function(signals):
+    # second-order sections give the output of the (b, a) filters the module used to apply with lfilter
+    b, a = butter_lowpass(50, FS, 4)
+    np.testing.assert_allclose(butter_lowpass_filter(signals[0], 50, FS, 4), lfilter(b, a, signals[0]), atol=1e-10)
+    b, a = butter(4, 20, btype='high', fs=FS)
+    np.testing.assert_allclose(butter_highpass_filter(signals[0], 20, FS, 4), lfilter(b, a, signals[0]), atol=1e-10)
+
+
+def test_batch_filter_data_matches_the_notebook():
+    # filter_data of openbci-processing_single_file.ipynb, on a window with the dc offset of the board
+    x = np.random.default_rng(7).normal(size=500) * 20 - 30000
+    b, a = butter(2, 1 / (FS / 2), 'highpass')
+    b_notch, a_notch = iirnotch(60, 100, FS)
+    expected = filtfilt(b_notch, a_notch, filtfilt(b, a, x))
+    np.testing.assert_allclose(filter_data(x), expected, rtol=1e-9, atol=1e-9)
+
+
+@pytest.mark.parametrize('length', [0, 3, 2 * FS - 1, 2 * FS, 2 * FS + 1, 3000])
+def test_phasic_filter_matches_reference(length):
+    # 1 s half window, signals shorter than one, between one and two windows, and longer
+    x = np.random.default_rng(length).normal(size=length)
+    expected = reference.phasicFilter(list(x), FS, seconds=1)
+    np.testing.assert_allclose(phasicFilter(x, FS, seconds=1), expected, equal_nan=True)
+
+
+def test_phasic_filter_channels(signals):
+    filtered = phasicFilter(signals, FS, seconds=1)
+    assert filtered.shape == signals.shape
+    for c in range(2):
+        np.testing.assert_allclose(filtered[c], reference.phasicFilter(list(signals[c]), FS, seconds=1))
+
+
+def test_phasic_filter_chunks_match_one_call(signals):
+    expected = phasicFilter(signals, FS, seconds=1)
+    phasic = PhasicFilter(FS, seconds=1)
+    streamed = np.concatenate([chunked(phasic.process, signals), phasic.flush()], axis=-1)
+    np.testing.assert_array_equal(streamed, expected)
+    with pytest.raises(ValueError):
+        phasic.process(signals[0])
+    assert len(PhasicFilter(FS).flush()) == 0
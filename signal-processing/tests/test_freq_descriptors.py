@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+import reference
+from src.analyze import freq_descriptors as fd
+from src.analyze.freq_descriptors import getFrequencyFeatures, getPSD
+
+FS = 250
+
+
+@pytest.fixture
+def spectra():
+    rng = np.random.default_rng(2)
+    x = rng.normal(size=(4, 2000)) + np.sin(2 * np.pi * 40 * np.arange(2000) / FS)
+    return getPSD(x, FS)
+
+
+def test_frequency_descriptors_match_reference(spectra):
+    P, f = spectra
+    for row in P:
+        assert fd.getMNF(row, f) == pytest.approx(reference.MNF(list(row), list(f)))
+        assert fd.getMDF(row, f) == reference.MDF(list(row), list(f))
+        assert fd.getPeakFrequency(row, f) == f[np.argmax(row)]
+        assert fd.getMNP(row) == pytest.approx(np.mean(row))
+        assert fd.getTTP(row) == pytest.approx(sum(row))
+        for order in (1, 2, 3):
+            assert fd.getSM(row, f, order) == pytest.approx(reference.SM(list(row), list(f), order))
+        assert fd.getFR(row, f, 20, 60, 60, 110) == pytest.approx(reference.FR(list(row), f, 20, 60, 60, 110))
+        assert fd.getPSR(row, f) == pytest.approx(reference.PSR(list(row), f))
+
+
+def test_frequency_features_match_reference(spectra):
+    P, f = spectra
+    cutoffs = dict(llc=20, ulc=60, lhc=60, uhc=110)
+    features = getFrequencyFeatures(P, FS, **cutoffs)
+    default = getFrequencyFeatures(P, FS)
+    for c, row in enumerate(list(map(list, P))):
+        assert features['MNF'][c] == pytest.approx(reference.MNF(row, list(f)))
+        assert features['MDF'][c] == reference.MDF(row, list(f))
+        assert features['PeakFrequency'][c] == f[np.argmax(row)]
+        for order in (1, 2, 3):
+            assert features['SM%d' % order][c] == pytest.approx(reference.SM(row, list(f), order))
+        assert features['FR'][c] == pytest.approx(reference.FR(row, f, **cutoffs))
+        assert features['PSR'][c] == pytest.approx(reference.PSR(row, f))
+        # the default FR high band (250-500 Hz) is above Nyquist at 250 Hz: NaN, not a division by zero
+        assert np.isnan(default['FR'][c])
+
+
+def test_empty_bands_are_nan(spectra):
+    # at 250 Hz, the default FR high band (250-500 Hz) and a PSR band of 200-300 Hz have no bin
+    P, f = spectra
+    features = getFrequencyFeatures(P, FS, fmin=200, fmax=300)
+    for c, row in enumerate(P):
+        assert np.isnan(fd.getFR(row, f)) and np.isnan(features['FR'][c])
+        assert np.isnan(fd.getPSR(row, f, fmin=200, fmax=300)) and np.isnan(features['PSR'][c])
+    assert np.isnan(fd.getFR(P, f)).all()
+
+
+def test_frequency_features_reject_wrong_bins(spectra):
+    with pytest.raises(ValueError):
+        getFrequencyFeatures(spectra[0][:, :-1], FS)
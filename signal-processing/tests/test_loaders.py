@@ -0,0 +1,67 @@
+import os
+
+import numpy as np
+import pytest
+
+from src.recordings.loaders import (EXG_COLUMNS, SAMPLE_INDEX_COLUMN, TIMESTAMP_COLUMN, iter_columns, load_recording,
+                                    read_metadata)
+
+OPENBCI = os.path.join('openbci-data', 'g50', 'g50_U2', 'OpenBCI-RAW-2023-02-09_15-47-14.txt')
+BRAINFLOW = os.path.join('openbci-data', 'g20', 'g20_U1', 'BrainFlow-RAW_2023-02-10_11-35-44_0_T100_1.csv')
+
+
+def parse(path):
+    """ All the numeric columns of a recording, parsed line by line """
+    rows = []
+    with open(path) as f:
+        for line in f:
+            if line.startswith('%') or line[:1].isalpha():
+                continue
+            values = line.split(',') if path.endswith('.txt') else line.split('\t')
+            rows.append([float(v) for v in values[:TIMESTAMP_COLUMN + 1]])
+    return np.array(rows).T
+
+
+def test_openbci_header():
+    metadata = read_metadata(OPENBCI)
+    assert {key: metadata[key] for key in ('format', 'n_channels', 'sample_rate', 'board')} == {
+        'format': 'openbci', 'n_channels': 8, 'sample_rate': 250.0, 'board': 'OpenBCI_GUI$BoardCytonSerial'}
+    columns = metadata['columns']
+    assert len(columns) == 25
+    assert columns[SAMPLE_INDEX_COLUMN] == 'Sample Index' and columns[TIMESTAMP_COLUMN] == 'Timestamp'
+    assert [columns[c] for c in EXG_COLUMNS] == ['EXG Channel %d' % c for c in range(8)]
+
+
+def test_brainflow_has_no_header():
+    assert read_metadata(BRAINFLOW) == {'format': 'brainflow', 'n_channels': None, 'sample_rate': None,
+                                        'board': None, 'columns': None}
+
+
+@pytest.mark.parametrize('path', [OPENBCI, BRAINFLOW], ids=['openbci', 'brainflow'])
+def test_load_recording_matches_the_file(path):
+    expected = parse(path)
+    recording = load_recording(path, channels=[0, 3, 7], sample_index=True)
+    np.testing.assert_array_equal(recording.exg, expected[[1, 4, 8]])
+    np.testing.assert_array_equal(recording.timestamps, expected[TIMESTAMP_COLUMN])
+    np.testing.assert_array_equal(recording.sample_index, expected[SAMPLE_INDEX_COLUMN])
+    assert recording.timestamps.dtype == np.float64 and np.all(np.diff(recording.timestamps) >= 0)
+    assert recording.metadata == read_metadata(path)
+
+
+@pytest.mark.parametrize('path', [OPENBCI, BRAINFLOW], ids=['openbci', 'brainflow'])
+def test_dtype_and_chunks(path):
+    expected = load_recording(path, channels=list(range(8)))
+    recording = load_recording(path, channels=list(range(8)), dtype=np.float32, chunk_rows=5)
+    assert recording.exg.dtype == np.float32 and recording.exg.flags.c_contiguous
+    np.testing.assert_array_equal(recording.exg, expected.exg.astype(np.float32))
+    # the timestamps keep the precision of float64 whatever the dtype of the samples
+    np.testing.assert_array_equal(recording.timestamps, expected.timestamps)
+    chunks = list(iter_columns(path, [TIMESTAMP_COLUMN], chunk_rows=5, dtype=np.float32))
+    assert all(chunk.dtype == np.float32 and chunk.shape[1] == 1 for chunk in chunks)
+    assert [len(chunk) for chunk in chunks[:-1]] == [5] * (len(chunks) - 1)
+
+
+def test_without_timestamps():
+    recording = load_recording(OPENBCI, channels=[1], timestamps=False)
+    assert recording.timestamps is None and recording.sample_index is None
+    assert recording.exg.shape == (1, 14)
@@ -0,0 +1,93 @@
+import csv
+import time
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from src.analyze.profiling import CSVSink, Profiler, StageStats
+from src.stream.acquisition import ProcessingThread, RingBuffer
+
+
+def run(profiler, inner_seconds=0.02, outer_seconds=0.01, **context):
+    with profiler.stage('outer'):
+        time.sleep(outer_seconds)
+        with profiler.stage('inner'):
+            time.sleep(inner_seconds)
+    return profiler.finish(**context)
+
+
+def test_nested_stages():
+    reports = []
+    profiler = Profiler(sink=reports.append)
+    report = run(profiler, file='a.csv')
+    assert reports == [report] and profiler.last_report is report
+    assert report['file'] == 'a.csv'
+    inner, outer = report['stages']  # in the order they finished
+    assert (inner['stage'], outer['stage']) == ('inner', 'outer')
+    assert inner['self_seconds'] == inner['seconds'] >= 0.02
+    assert outer['seconds'] >= inner['seconds'] + 0.01
+    assert outer['self_seconds'] == pytest.approx(outer['seconds'] - inner['seconds'])
+    # the next run starts without the stages of the previous one
+    assert len(profiler.finish()['stages']) == 0
+
+
+def test_stage_recorded_when_it_raises():
+    profiler = Profiler()
+    with pytest.raises(KeyError):
+        with profiler.stage('lookup'):
+            {}['missing']
+    assert [record['stage'] for record in profiler.finish()['stages']] == ['lookup']
+
+
+def test_memory():
+    profiler = Profiler(memory=True)
+    try:
+        with profiler.stage('allocate'):
+            x = np.ones(10 ** 6)
+    finally:
+        tracemalloc.stop()  # started by the profiler
+    record, = profiler.finish()['stages']
+    assert record['peak_bytes'] >= x.nbytes and record['bytes'] >= x.nbytes
+
+
+def test_stage_stats():
+    stats = StageStats()
+    profiler = Profiler(sink=stats)
+    for inner_seconds in (0.001, 0.002, 0.003, 0.004):
+        run(profiler, inner_seconds, outer_seconds=0)
+    run(profiler, 0.03, outer_seconds=0)
+    summary = stats.summary(percentiles=(50, 100))
+    assert list(summary) == ['inner', 'outer']  # slowest total first
+    assert summary['inner']['count'] == 5
+    values = stats.values['inner']
+    assert summary['inner']['total'] == pytest.approx(sum(values))
+    assert summary['inner']['p50'] == pytest.approx(np.median(values))
+    assert summary['inner']['p100'] == max(values) >= 0.03
+    lines = stats.format().splitlines()
+    assert lines[0].split() == ['stage', 'count', 'total', 'p50', 'p90', 'p99']
+    assert [line.split()[:2] for line in lines[1:]] == [['inner', '5'], ['outer', '5']]
+
+
+def test_csv_sink(tmp_path):
+    path = str(tmp_path / 'profile.csv')
+    profiler = Profiler(sink=CSVSink(path))
+    run(profiler, 0, 0, file='a.csv')
+    run(profiler, 0, 0, file='b.csv')
+    profiler.finish(file='empty.csv')  # a run without stages adds no row
+    with open(path, newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert [(row['file'], row['stage']) for row in rows] == [('a.csv', 'inner'), ('a.csv', 'outer'),
+                                                             ('b.csv', 'inner'), ('b.csv', 'outer')]
+    assert all(float(row['self_seconds']) <= float(row['seconds']) for row in rows)
+
+
+def test_processing_thread_profiles_every_call():
+    stats = StageStats()
+    ring = RingBuffer(1, 100)
+    processing = ProcessingThread(ring, lambda chunk: chunk.sum(), profiler=Profiler(sink=stats))
+    for n in (10, 0, 20):
+        ring.write(np.ones((1, n)))
+        processing.step()
+    assert processing.profiler.last_report['samples'] == 20
+    assert stats.summary()['process']['count'] == 2
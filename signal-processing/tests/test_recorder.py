@@ -0,0 +1,88 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from src.recordings.loaders import EXG_COLUMNS, TIMESTAMP_COLUMN, load_recording
+from src.stream.recorder import RecordingWriter
+
+
+@pytest.fixture
+def board_data():
+    # 24 rows as the Cyton board data, with timestamps in the timestamp row
+    data = np.round(np.random.default_rng(8).normal(size=(24, 300)) * 100, 3)
+    data[TIMESTAMP_COLUMN] = 1677617493.0 + np.arange(300) / 250
+    return data
+
+
+def blocks(data, sizes=(1, 50, 7, 100)):
+    start, k = 0, 0
+    while start < data.shape[1]:
+        yield data[:, start:start + sizes[k % len(sizes)]]
+        start += sizes[k % len(sizes)]
+        k += 1
+
+
+def test_csv_raw_data_reads_back_with_the_loader(tmp_path, board_data):
+    writer = RecordingWriter(str(tmp_path), session='session', flush_interval=0.01)
+    writer.start()
+    for block in blocks(board_data):
+        writer.write('raw', block)
+    writer.write('mav', board_data[1, :10])
+    writer.stop()
+    assert writer.session_dir == str(tmp_path / 'session')
+    assert sorted(os.listdir(writer.session_dir)) == ['mav_000.csv', 'raw_000.csv']
+    recording = load_recording(os.path.join(writer.session_dir, 'raw_000.csv'), channels=list(range(8)))
+    np.testing.assert_allclose(recording.exg, board_data[EXG_COLUMNS], atol=1e-6)
+    np.testing.assert_allclose(recording.timestamps, board_data[TIMESTAMP_COLUMN], atol=1e-6)
+    np.testing.assert_allclose(np.loadtxt(os.path.join(writer.session_dir, 'mav_000.csv')), board_data[1, :10])
+    assert writer.written_bytes == sum(os.path.getsize(os.path.join(writer.session_dir, name))
+                                       for name in os.listdir(writer.session_dir))
+    assert writer.dropped_blocks == 0
+
+
+def test_bin_output(tmp_path, board_data):
+    writer = RecordingWriter(str(tmp_path), fmt='bin', session='session')
+    for block in blocks(board_data):
+        writer.write('raw', block)
+    writer.flush()
+    with open(os.path.join(writer.session_dir, 'raw.json')) as f:
+        assert json.load(f) == {'n_columns': 24, 'dtype': 'float64'}
+    data = np.fromfile(os.path.join(writer.session_dir, 'raw_000.bin'), dtype=np.float64).reshape(-1, 24).T
+    np.testing.assert_array_equal(data, board_data)
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'bin'])
+def test_rotation(tmp_path, board_data, fmt):
+    writer = RecordingWriter(str(tmp_path), fmt=fmt, session='session', rotate_bytes=1000)
+    for block in blocks(board_data[:2]):
+        writer.write('trace', block)
+        writer.flush()
+    names = sorted(name for name in os.listdir(writer.session_dir) if name.startswith('trace_'))
+    assert names == ['trace_%03d.%s' % (i, fmt) for i in range(len(names))] and len(names) > 1
+    parts = []
+    for name in names:
+        path = os.path.join(writer.session_dir, name)
+        if fmt == 'csv':
+            parts.append(np.loadtxt(path, ndmin=2).T)
+        else:
+            parts.append(np.fromfile(path, dtype=np.float64).reshape(-1, 2).T)
+    np.testing.assert_allclose(np.concatenate(parts, axis=1), board_data[:2], atol=1e-6)
+    # a new file is started once the current one has reached rotate_bytes
+    sizes = [os.path.getsize(os.path.join(writer.session_dir, name)) for name in names]
+    assert all(size >= 1000 for size in sizes[:-1])
+
+
+def test_full_queue_drops_blocks(tmp_path, board_data):
+    writer = RecordingWriter(str(tmp_path), session='session', max_blocks=2)
+    for k in range(5):
+        writer.write('trace', board_data[:2, 10 * k:10 * (k + 1)])
+    assert writer.dropped_blocks == 3
+    writer.flush()
+    np.testing.assert_allclose(np.loadtxt(os.path.join(writer.session_dir, 'trace_000.csv')).T, board_data[:2, :20])
+
+
+def test_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        RecordingWriter(str(tmp_path), fmt='h5')
@@ -0,0 +1,99 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+from src.recordings.loaders import EXG_COLUMNS, TIMESTAMP_COLUMN, load_recording
+from src.stream.replay_board import NUM_ROWS, ReplayBoard
+
+RECORDING = os.path.join('openbci-data', 'g20', 'g20_U1', 'BrainFlow-RAW_2023-02-10_11-35-44_0_T100_1.csv')
+
+
+@pytest.fixture(scope='module')
+def recording():
+    return load_recording(RECORDING, channels=list(range(8)))
+
+
+def replay(speed=0, **kwargs):
+    board = ReplayBoard(RECORDING, speed=speed, **kwargs)
+    board.prepare_session()
+    board.start_stream()
+    return board
+
+
+def read_all(board, num_samples=None):
+    chunks = []
+    while not board.finished():
+        chunks.append(board.get_board_data(num_samples))
+    return chunks
+
+
+def test_empty_board_before_start_stream():
+    board = ReplayBoard(RECORDING)
+    assert board.get_board_data_count() == 0
+    board.prepare_session()
+    assert board.get_board_data_count() == 0
+    assert board.get_board_data().shape == (NUM_ROWS, 0)
+    assert board.get_current_board_data(10).shape == (NUM_ROWS, 0)
+
+
+def test_speed_zero_replays_the_recording_in_chunks(recording):
+    chunks = read_all(replay(chunk=250, restamp=False))
+    assert [c.shape[1] for c in chunks[:-1]] == [250] * (len(chunks) - 1)
+    assert 0 < chunks[-1].shape[1] <= 250
+    data = np.concatenate(chunks, axis=1)
+    np.testing.assert_array_equal(data[EXG_COLUMNS], recording.exg)
+    np.testing.assert_array_equal(data[TIMESTAMP_COLUMN], recording.timestamps)
+
+
+def test_num_samples_limits_the_chunks(recording):
+    chunks = read_all(replay(chunk=250, restamp=False), num_samples=100)
+    assert max(c.shape[1] for c in chunks) == 100
+    np.testing.assert_array_equal(np.concatenate(chunks, axis=1)[EXG_COLUMNS], recording.exg)
+
+
+def test_loop_shifts_the_recorded_timestamps(recording):
+    n = recording.exg.shape[1]
+    board = replay(loop=True, restamp=False, chunk=1000)
+    data = np.concatenate([board.get_board_data() for _ in range(3 * n // 1000 + 1)], axis=1)
+    assert data.shape[1] > 2 * n and not board.finished()
+    np.testing.assert_array_equal(data[EXG_COLUMNS, n:2 * n], recording.exg)
+    np.testing.assert_allclose(data[TIMESTAMP_COLUMN, n:2 * n], recording.timestamps + n / board.sampling_rate)
+
+
+def test_restamp(recording):
+    before = time.time()
+    board = replay(speed=100)
+    time.sleep(0.05)
+    data = board.get_board_data()
+    assert data.shape[1] > 0
+    np.testing.assert_array_equal(data[EXG_COLUMNS], recording.exg[:, :data.shape[1]])
+    np.testing.assert_allclose(np.diff(data[TIMESTAMP_COLUMN]), 1 / (board.sampling_rate * 100), atol=1e-6)
+    assert before <= data[TIMESTAMP_COLUMN, 0] <= time.time()
+    # as fast as possible: stamped with the time at which they are read
+    before = time.time()
+    data = replay(speed=0).get_board_data()
+    assert np.all((data[TIMESTAMP_COLUMN] >= before) & (data[TIMESTAMP_COLUMN] <= time.time()))
+
+
+def test_current_board_data_and_buffer_size(recording):
+    board = replay(chunk=250, restamp=False)
+    assert board.get_board_data_count() == 250
+    np.testing.assert_array_equal(board.get_current_board_data(50)[EXG_COLUMNS], recording.exg[:, 200:250])
+    assert board.get_board_data_count() == 250
+    # the board keeps only the newest num_samples samples that were not read
+    board = ReplayBoard(RECORDING, speed=0, restamp=False, chunk=250)
+    board.prepare_session()
+    board.start_stream(num_samples=100)
+    np.testing.assert_array_equal(board.get_board_data()[EXG_COLUMNS], recording.exg[:, 150:250])
+
+
+def test_prepare_session_of_a_recording_without_samples(tmp_path):
+    path = tmp_path / os.path.basename(RECORDING)
+    path.write_text('')
+    board = ReplayBoard(str(path))
+    with pytest.raises(ValueError, match='no samples'):
+        board.prepare_session()
+    with pytest.raises(RuntimeError):
+        board.start_stream()
@@ -0,0 +1,81 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from src.analyze import result_cache
+from src.analyze.emg_processing import analyzeEMG
+from src.analyze.result_cache import ANALYSIS_MODULES, ResultCache, cache_key
+
+FS = 250
+FEATURES = ['MAV', 'MNF']
+
+
+@pytest.fixture
+def signal():
+    return np.random.default_rng(9).normal(size=2000)
+
+
+def test_hits_and_misses(tmp_path, signal):
+    cache = ResultCache(str(tmp_path))
+    expected = analyzeEMG(signal, FS, features=FEATURES)
+    assert cache.analyzeEMG(signal, FS, features=FEATURES) == expected
+    assert cache.analyzeEMG(signal, FS, features=FEATURES[::-1]) == expected
+    # the defaults are part of the key
+    assert cache.analyzeEMG(signal, FS, features=FEATURES, lowpass=50, threshold=0.01) == expected
+    assert (cache.hits, cache.misses) == (2, 1)
+    cache.analyzeEMG(signal, FS, features=FEATURES, lowpass=40)
+    cache.analyzeEMG(signal.astype(np.float32), FS, features=FEATURES)
+    assert (cache.hits, cache.misses) == (2, 3)
+    # a new instance on the same folder
+    other = ResultCache(str(tmp_path))
+    assert other.analyzeEMG(signal, FS, features=FEATURES) == expected
+    assert (other.hits, other.misses) == (1, 0)
+    with pytest.raises(TypeError):
+        cache.analyzeEMG(signal, FS, lowpas=40)
+
+
+def test_stats_and_clear(tmp_path, signal):
+    cache = ResultCache(str(tmp_path))
+    assert cache.get('missing') is None
+    cache.put('a', {'x': 1})
+    cache.put('b', signal)
+    assert cache.get('a') == {'x': 1}
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['evictions'], stats['entries']) == (1, 1, 0, 2)
+    assert stats['bytes'] == sum(os.path.getsize(tmp_path / name) for name in ('a.pkl', 'b.pkl'))
+    cache.clear()
+    assert cache.stats()['entries'] == 0 and cache.get('a') is None
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ResultCache(str(tmp_path), max_bytes=10 ** 6)
+    value = np.zeros(30000)  # 240 kB: 4 entries fit
+    for k, key in enumerate('abcd'):
+        cache.put(key, value)
+        os.utime(tmp_path / (key + '.pkl'), (k, k))  # put in this order, one second apart
+    assert cache.get('a') is not None  # a is now the most recently used
+    cache.put('e', value)
+    assert sorted(os.listdir(tmp_path)) == ['a.pkl', 'c.pkl', 'd.pkl', 'e.pkl']
+    assert cache.evictions == 1 and cache.stats()['bytes'] <= cache.max_bytes
+    # a value larger than the cache is not kept
+    cache.put('f', np.zeros(200000))
+    assert cache.get('f') is None
+
+
+def test_key_depends_on_the_analysis_version(monkeypatch, signal):
+    key = cache_key(signal, samplerate=FS)
+    assert key == cache_key(list(signal), samplerate=FS)
+    assert key != cache_key(signal[:-1], samplerate=FS) != cache_key(signal, samplerate=2 * FS)
+    monkeypatch.setattr(result_cache, 'ANALYSIS_VERSION', 'other')
+    assert cache_key(signal, samplerate=FS) != key
+
+
+def test_version_covers_the_modules_of_analyze_emg():
+    # every module loaded by analyzeEMG must be part of the version, or its changes would not invalidate the cache
+    code = ("import sys; import src.analyze.emg_processing; "
+            "print(' '.join(m for m in sys.modules if m.startswith('src.analyze.')))")
+    loaded = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout.split()
+    assert {name.split('.')[-1] for name in loaded} == set(ANALYSIS_MODULES)
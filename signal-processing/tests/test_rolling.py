@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+import reference
+from src.analyze.rolling_descriptors import ROLLING_FEATURES, IncrementalMAV, getRollingFeatures
+
+THRESHOLD = 0.3
+SCALAR = {
+    'MAV': reference.MAV, 'RMS': reference.RMS, 'WL': reference.WL, 'AAC': reference.AAC,
+    'ZC': lambda x: reference.ZC(x, THRESHOLD), 'SSC': lambda x: reference.SSC(x, THRESHOLD),
+    'WAMP': lambda x: reference.WAMP(x, THRESHOLD), 'MYOP': lambda x: reference.MYOP(x, THRESHOLD),
+}
+
+
+@pytest.fixture
+def signal():
+    # a dead band wider than the noise between the bursts, so that ZC keeps states across samples
+    rng = np.random.default_rng(4)
+    return rng.normal(size=600) * np.where(np.arange(600) % 200 < 100, 1.0, 0.2)
+
+
+@pytest.mark.parametrize('windowLength, hop', [(3, 1), (50, 1), (64, 16), (100, 7), (600, 1)])
+def test_rolling_features_match_per_window(signal, windowLength, hop):
+    features = getRollingFeatures(signal, windowLength, hop, THRESHOLD)
+    assert list(features) == ROLLING_FEATURES
+    starts = range(0, len(signal) - windowLength + 1, hop)
+    for name in ROLLING_FEATURES:
+        expected = [SCALAR[name](list(signal[s:s + windowLength])) for s in starts]
+        np.testing.assert_allclose(features[name], expected, rtol=1e-9, atol=1e-12, err_msg=name)
+
+
+def test_rolling_features_channels(signal):
+    x = np.stack([signal, -signal, signal[::-1]])
+    features = getRollingFeatures(x, 40, 5, THRESHOLD)
+    for c in range(3):
+        for name, values in getRollingFeatures(x[c], 40, 5, THRESHOLD).items():
+            np.testing.assert_allclose(features[name][c], values)
+
+
+def test_rolling_features_subset_and_unknown(signal):
+    assert list(getRollingFeatures(signal, 10, features=['RMS', 'MAV'])) == ['MAV', 'RMS']
+    with pytest.raises(ValueError):
+        getRollingFeatures(signal, 10, features=['MAV', 'AFB'])
+
+
+@pytest.mark.parametrize('windowLength, features', [(1, None), (1, ['WL']), (1, ['AAC']), (1, ['WAMP']), (2, ['SSC'])])
+def test_rolling_features_window_too_short(signal, windowLength, features):
+    with pytest.raises(ValueError, match='too short'):
+        getRollingFeatures(signal, windowLength, 1, features=features)
+
+
+def test_rolling_features_shortest_windows(signal):
+    features = getRollingFeatures(signal, 1, 1, features=['MAV', 'RMS', 'ZC', 'MYOP'])
+    np.testing.assert_allclose(features['MAV'], np.abs(signal))
+    np.testing.assert_array_equal(features['ZC'], 0)
+    WL = getRollingFeatures(signal, 2, 1, features=['WL'])['WL']
+    np.testing.assert_allclose(WL, [reference.WL(list(signal[s:s + 2])) for s in range(len(signal) - 1)])
+
+
+@pytest.mark.parametrize('length', [0, 5, 9])
+def test_rolling_features_of_a_signal_shorter_than_the_window(length):
+    features = getRollingFeatures(np.ones(length), 10, 2)
+    assert all(values.shape == (0,) for values in features.values())
+
+
+@pytest.mark.parametrize('windowLength, hop', [(1, 1), (25, 1), (64, 16), (100, 30)])
+def test_incremental_mav_matches_rolling(signal, windowLength, hop):
+    x = np.stack([signal, 2 * signal])
+    expected = getRollingFeatures(x, windowLength, hop, features=['MAV'])['MAV']
+    mav = IncrementalMAV(windowLength, hop)
+    outputs, start = [], 0
+    for size in [0, 1, 13, 2 * windowLength + 3, 64] * 20:
+        outputs.append(mav.process(x[:, start:start + size]))
+        start += size
+    np.testing.assert_allclose(np.concatenate(outputs, axis=-1), expected, rtol=1e-12, atol=1e-12)
+    mav.reset()
+    np.testing.assert_allclose(mav.process(x), expected, rtol=1e-12, atol=1e-12)
+
+
+def test_incremental_mav_rejects_other_channels(signal):
+    mav = IncrementalMAV(10)
+    mav.process(np.zeros((2, 5)))
+    with pytest.raises(ValueError):
+        mav.process(signal[:5])
+    with pytest.raises(ValueError):
+        IncrementalMAV(0)
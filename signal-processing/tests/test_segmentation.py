@@ -0,0 +1,64 @@
+import numpy as np
+
+from src.analyze.segmentation import centeredWindow, getSteadySegments
+
+FS = 250
+
+
+def ramped_trial(gains=(1, 3), seed=0):
+    """ 2 s rest, 1 s ramp, 6 s plateau (samples 750 to 2250), 1 s ramp, 2 s rest """
+    amplitude = np.concatenate([np.full(2 * FS, 2.), np.linspace(2, 50, FS), np.full(6 * FS, 50.),
+                                np.linspace(50, 2, FS), np.full(2 * FS, 2.)])
+    rng = np.random.default_rng(seed)
+    return rng.normal(size=(len(gains), len(amplitude))) * amplitude * np.asarray(gains)[:, None]
+
+
+def test_plateau_of_every_channel():
+    segments = getSteadySegments(ramped_trial(), FS)
+    assert segments.found.all()
+    # no rest inside the segment (the ends of the ramps can be within the band), and most of the plateau
+    assert (segments.start >= 2 * FS).all() and (segments.stop <= 10 * FS).all()
+    assert (segments.stop - segments.start >= 5 * FS).all()
+    np.testing.assert_allclose(segments.level / [50, 150], 1, atol=0.1)
+
+
+def test_single_channel_gives_scalars():
+    x = ramped_trial()
+    segments = getSteadySegments(x[1], FS)
+    both = getSteadySegments(x, FS)
+    assert np.ndim(segments.start) == 0
+    assert (segments.start, segments.stop) == (both.start[1], both.stop[1])
+
+
+def test_no_stable_window():
+    # the envelope of the noise is far from the given level, in every window
+    segments = getSteadySegments(np.random.default_rng(0).normal(size=(2, 5000)), FS, level=100.0)
+    assert not segments.found.any()
+    assert (segments.start == 0).all() and (segments.stop == 0).all()
+
+
+def test_flat_channel():
+    # a loose electrode: level 0, so |0 - 0| <= 0 must not make every window stable
+    assert not getSteadySegments(np.zeros(2500), FS).found
+    x = np.concatenate([ramped_trial(gains=(1,)), np.zeros((1, 12 * FS))])
+    segments = getSteadySegments(x, FS)
+    assert segments.found.tolist() == [True, False]
+    assert not getSteadySegments(x, FS, level=[50.0, 0.0]).found[1]
+    assert not getSteadySegments(np.full((1, 2500), np.nan), FS).found.any()
+
+
+def test_plateau_shorter_than_min_seconds():
+    segments = getSteadySegments(ramped_trial(), FS, minSeconds=10)
+    assert not segments.found.any()
+
+
+def test_shorter_than_the_envelope_window():
+    segments = getSteadySegments(np.ones((2, 30)), FS)
+    assert not segments.found.any()
+    segments = getSteadySegments(np.zeros(0), FS)
+    assert not segments.found
+
+
+def test_centered_window():
+    assert centeredWindow(100, 1100, 500) == (350, 850)
+    assert centeredWindow(100, 400, 500) == (100, 400)
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+from scipy.signal import welch
+
+from src.analyze.freq_descriptors import getFrequencyFeatures, getPSD
+from src.analyze.spectrogram import getSegmentSpectra, getSpectrogram
+
+FS = 250
+
+
+@pytest.fixture
+def signals():
+    rng = np.random.default_rng(5)
+    return rng.normal(size=(2, 5000)) + 3  # a DC offset, removed by the constant detrend
+
+
+@pytest.mark.parametrize('windowLength, hop, nperseg, noverlap', [(500, 128, 256, None), (1000, 250, 128, 78),
+                                                                  (300, 256, 256, 0), (256, 64, 256, 192)])
+@pytest.mark.parametrize('scaling', ['density', 'spectrum'])
+def test_spectrogram_matches_welch(signals, windowLength, hop, nperseg, noverlap, scaling):
+    psd, frequencies, times = getSpectrogram(signals, FS, windowLength, hop, nperseg, noverlap, scaling=scaling)
+    starts = range(0, signals.shape[-1] - windowLength + 1, hop)
+    assert psd.shape[:2] == (2, len(starts))
+    for k, s in enumerate(starts):
+        f, expected = welch(signals[..., s:s + windowLength], fs=FS, window='hann', nperseg=nperseg,
+                            noverlap=noverlap, detrend='constant', scaling=scaling)
+        np.testing.assert_allclose(psd[:, k], expected, rtol=1e-9, atol=1e-15)
+        assert times[k] == (s + windowLength / 2) / FS
+    np.testing.assert_array_equal(frequencies, f)
+
+
+def test_spectrogram_feeds_the_frequency_features(signals):
+    psd, frequencies, times = getSpectrogram(signals[0], FS, 1000, 512, scaling='spectrum')
+    features = getFrequencyFeatures(psd, FS)
+    assert features['MNF'].shape == (len(times),) == (8,)
+    expected = getFrequencyFeatures(getPSD(signals[0, 512:1512], FS)[0], FS)
+    for name in ('MNF', 'MDF', 'PeakFrequency', 'TTP'):
+        assert features[name][1] == pytest.approx(expected[name])
+
+
+def test_segment_spectra_without_detrend(signals):
+    spectra, frequencies, starts = getSegmentSpectra(signals[0], FS, 256, detrend=False)
+    f, expected = welch(signals[0, :256], fs=FS, nperseg=256, detrend=False)
+    np.testing.assert_allclose(spectra[0], expected, rtol=1e-9)
+
+
+def test_spectrogram_errors(signals):
+    with pytest.raises(ValueError, match='multiple'):
+        getSpectrogram(signals, FS, 512, 100)
+    with pytest.raises(ValueError):
+        getSpectrogram(signals, FS, 128, 128)
+    with pytest.raises(ValueError):
+        getSegmentSpectra(signals[:, :100], FS, 256)
+    with pytest.raises(ValueError):
+        getSegmentSpectra(signals, FS, 256, scaling='psd')
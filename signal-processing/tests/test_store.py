@@ -0,0 +1,37 @@
+import os
+
+import numpy as np
+import pytest
+
+from src.recordings.loaders import load_recording
+from src.recordings.store import RecordingStore, build_store
+
+SOURCE = os.path.join('openbci-data', 'g50', 'g50_U2', 'OpenBCI-RAW-2023-02-09_15-47-14.txt')
+
+
+@pytest.fixture
+def store(tmp_path):
+    """ A store with a copy of a short OpenBCI recording, and the same recording without its samples """
+    lines = open(SOURCE).readlines()
+    header = [line for line in lines if line.startswith('%') or line.startswith('Sample Index')]
+    for subject, content in (('U2', lines), ('U3', header)):
+        folder = tmp_path / 'g50' / ('g50_' + subject)
+        folder.mkdir(parents=True)
+        (folder / os.path.basename(SOURCE)).write_text(''.join(content))
+    build_store([str(tmp_path / 'g50')], str(tmp_path / 'store'))
+    return RecordingStore(str(tmp_path / 'store'))
+
+
+def test_open_matches_the_loader(store):
+    entry, = store.query(subject='U2')
+    expected = load_recording(SOURCE, channels=list(range(8)), timestamps=False, dtype=np.float32).exg
+    assert entry['sample_count'] == expected.shape[1] > 0
+    np.testing.assert_array_equal(store.open(entry['id']), expected)
+    np.testing.assert_array_equal(store.window(entry, 0, 0.02, channels=slice(0, 2)), expected[:2, :5])
+
+
+def test_recording_without_samples(store):
+    entry, = store.query(subject='U3')
+    assert entry['sample_count'] == 0
+    assert store.open(entry['id']).shape == (8, 0)
+    assert store.window(entry, 0, 1.0).shape == (8, 0)
@@ -0,0 +1,90 @@
+import json
+import socket
+import threading
+import urllib.error
+import urllib.request
+
+import numpy as np
+import pytest
+
+from src.stream.telemetry import RollingStat, Telemetry
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def test_rolling_stat_keeps_the_last_values():
+    stat = RollingStat(capacity=5)
+    assert stat.summary() == {'count': 0}
+    assert stat.histogram() == ([], [])
+    for value in range(12):
+        stat.add(value)
+    assert stat.count == 12
+    assert sorted(stat.values()) == [7, 8, 9, 10, 11]
+    summary = stat.summary(percentiles=(50, 100), bins=5)
+    assert (summary['mean'], summary['max'], summary['p50'], summary['p100']) == (9, 11, 9, 11)
+    assert summary['histogram'] == [1] * 5 and summary['edges'][0] == 7 and summary['edges'][-1] == 11
+
+
+def test_tick_counts_the_late_ticks():
+    telemetry = Telemetry()
+    for now in [0.0, 0.05, 0.1, 0.2, 0.26, 0.33, 0.45]:
+        telemetry.tick(0.05, now=now)
+    np.testing.assert_allclose(telemetry.stats['tick_interval'].values(), [0.05, 0.05, 0.1, 0.06, 0.07, 0.12])
+    np.testing.assert_allclose(telemetry.stats['tick_jitter'].values(), [0, 0, 0.05, 0.01, 0.02, 0.07], atol=1e-12)
+    # above 1.5 times the nominal interval
+    assert telemetry.counters == {'late_ticks': 2}
+
+
+def test_record_and_count_from_threads():
+    telemetry = Telemetry(capacity=100)
+
+    def run():
+        for i in range(1000):
+            telemetry.record('processing', i)
+            telemetry.count('lost_samples', 2)
+
+    threads = [threading.Thread(target=run) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    snapshot = telemetry.snapshot()
+    assert snapshot['counters'] == {'lost_samples': 8000}
+    assert snapshot['stats']['processing']['count'] == 4000
+    json.dumps(snapshot)
+
+
+def test_json_file(tmp_path):
+    path = str(tmp_path / 'telemetry.json')
+    telemetry = Telemetry()
+    telemetry.record('latency', 0.02)
+    telemetry.export_file(path, interval=60)
+    telemetry.count('stale_ticks')
+    telemetry.stop()  # written one last time
+    with open(path) as f:
+        snapshot = json.load(f)
+    assert snapshot['counters'] == {'stale_ticks': 1}
+    assert snapshot['stats']['latency']['p50'] == 0.02
+    assert list(tmp_path.iterdir()) == [tmp_path / 'telemetry.json']
+
+
+def test_http():
+    telemetry = Telemetry()
+    telemetry.record('latency', 0.03)
+    port = free_port()
+    telemetry.serve_http(port)
+    try:
+        for path in ('', '/telemetry', '/telemetry/'):
+            with urllib.request.urlopen('http://127.0.0.1:%d%s' % (port, path)) as response:
+                assert response.headers['Content-Type'] == 'application/json'
+                snapshot = json.load(response)
+            assert snapshot['stats']['latency']['count'] == 1
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen('http://127.0.0.1:%d/other' % port)
+        assert error.value.code == 404
+    finally:
+        telemetry.stop()
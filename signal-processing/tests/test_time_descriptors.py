@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+import reference
+from src.analyze import time_descriptors as td
+from src.analyze.time_descriptors import getTimeFeatures
+
+FS = 250
+THRESHOLD = 0.3
+
+
+@pytest.fixture
+def signals():
+    return np.random.default_rng(1).normal(size=(3, 257))
+
+
+SCALAR_TIME = {
+    'IEMG': td.getIEMG, 'MAV': td.getMAV, 'MAV1': td.getMAV1, 'MAV2': td.getMAV2, 'SSI': td.getSSI,
+    'VAR': td.getVAR, 'TM3': lambda x: td.getTM(x, 3), 'TM4': lambda x: td.getTM(x, 4),
+    'TM5': lambda x: td.getTM(x, 5), 'LOG': td.getLOG, 'RMS': td.getRMS, 'WL': td.getWL,
+    'AAC': td.getAAC, 'DASDV': td.getDASDV,
+}
+SCALAR_THRESHOLDED = {'ZC': td.getZC, 'MYOP': td.getMYOP, 'WAMP': td.getWAMP, 'SSC': td.getSSC}
+
+
+@pytest.mark.parametrize('name', sorted(reference.TIME))
+def test_time_descriptor_matches_reference(signals, name):
+    for x in signals:
+        expected = reference.TIME[name](list(x))
+        assert SCALAR_TIME[name](x) == pytest.approx(expected, rel=1e-10)
+        assert SCALAR_TIME[name](list(x)) == pytest.approx(expected, rel=1e-10)
+
+
+@pytest.mark.parametrize('name', sorted(reference.THRESHOLDED))
+def test_thresholded_descriptor_matches_reference(signals, name):
+    for x in signals:
+        assert SCALAR_THRESHOLDED[name](x, THRESHOLD) == pytest.approx(reference.THRESHOLDED[name](list(x), THRESHOLD))
+
+
+def test_time_features_match_reference(signals):
+    # one row per channel, and the same values for a (channel x window x sample) array
+    features = getTimeFeatures(signals, FS, THRESHOLD)
+    windows = getTimeFeatures(signals.reshape(3, 1, -1), FS, THRESHOLD)
+    for c, x in enumerate(signals):
+        for name, function in reference.TIME.items():
+            assert features[name][c] == pytest.approx(function(list(x)), rel=1e-10), name
+            assert windows[name][c, 0] == pytest.approx(features[name][c], rel=1e-12)
+        for name, function in reference.THRESHOLDED.items():
+            assert features[name][c] == pytest.approx(function(list(x), THRESHOLD)), name
+
+
+def test_zc_dead_band():
+    # samples inside +-threshold keep the previous state
+    x = np.array([0.0, 0.5, 0.1, -0.1, 0.2, -0.5, -0.2, 0.6])
+    assert td.getZC(x, 0.3) == reference.ZC(list(x), 0.3) == 3
+    assert getTimeFeatures(x, FS, 0.3)['ZC'] == 3
+
+
+def test_mavslpk_and_hist(signals):
+    x = signals[0]
+    segment = len(x) // 4
+    expected = [reference.MAV(list(x[s:s + segment])) for s in range(0, len(x), segment)]
+    np.testing.assert_allclose(td.getMAVSLPk(x, 4), expected)
+    HIST = td.getHIST(x, 3, THRESHOLD)
+    segment = len(x) // 3
+    for k in range(3):
+        part = list(x[k * segment:(k + 1) * segment])
+        assert HIST[k + 1] == {'ZC': reference.ZC(part, THRESHOLD), 'WAMP': reference.WAMP(part, THRESHOLD)}
+
+
+@pytest.mark.filterwarnings('ignore:Mean of empty slice')
+@pytest.mark.parametrize('length', [0, 1])
+def test_time_features_of_a_short_signal(length):
+    # no sample, or no difference between samples: empty sums and NaN ratios, no exception
+    with np.errstate(divide='ignore', invalid='ignore'):
+        features = getTimeFeatures(np.zeros((2, length)), FS)
+    assert set(features) == set(reference.TIME) | set(reference.THRESHOLDED) | {'AFB'}
+    assert np.all(features['IEMG'] == 0) and np.all(features['WL'] == 0)
+    assert np.isnan(features['AFB']).all()